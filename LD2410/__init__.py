@@ -1,6 +1,67 @@
-from .radar import Radar
 from .radar_consts import *
-from .ld2410 import LD2410
 from .ld2410_consts import *
-from .ld2450 import LD2450
 from .ld2450_consts import *
+import importlib
+
+# Classes are loaded on first access (PEP 562), so `import LD2410` only costs the
+# constants. Drivers pull in threading and, once a port is opened, pyserial, while
+# decoding recorded frames needs neither.
+_LAZY = {
+    "Radar": ".radar",
+    "LD2410": ".ld2410",
+    "LD2450": ".ld2450",
+    "Region": ".ld2450",
+    "RegionFilter": ".ld2450",
+    "AsyncRadar": ".async_radar",
+    "AsyncLD2410": ".async_radar",
+    "AsyncLD2450": ".async_radar",
+    "RadarHub": ".hub",
+    "FrameHistory": ".history",
+    "Recorder": ".recording",
+    "ReplaySerial": ".recording",
+    "RadarSimulator": ".simulator",
+    "Subscription": ".subscription",
+    "POLICY_LATEST": ".subscription",
+    "POLICY_DROP_OLDEST": ".subscription",
+    "POLICY_BLOCK": ".subscription",
+    "PresenceEngine": ".presence",
+    "PresenceEvent": ".presence",
+    "TargetTracker": ".tracker",
+    "Track": ".tracker",
+    "TrackEvent": ".tracker",
+    "RadarPipeline": ".pipeline",
+    "PipelineConsumer": ".pipeline",
+    "FrameRing": ".pipeline",
+    "FrameExporter": ".export",
+    "FrameAggregator": ".aggregate",
+    "FrameSummary": ".aggregate",
+}
+
+
+# Driver class for a model name in MODELS, e.g. model_class("LD2450")
+def model_class(model):
+    if model not in MODELS:
+        raise Exception(f"Unknown model {model}, pick one of {list(MODELS)}")
+    return globals().get(model) or __getattr__(model)
+
+
+# Left out of `from LD2410 import *` as their modules pull in asyncio, selectors,
+# multiprocessing or POSIX only modules. Import them by name
+_OPTIONAL = {"AsyncRadar", "AsyncLD2410", "AsyncLD2450", "RadarHub", "RadarSimulator",
+             "RadarPipeline", "PipelineConsumer", "FrameRing"}
+
+__all__ = [name for name in globals() if not name.startswith("_") and name != "importlib"] \
+          + [name for name in _LAZY if name not in _OPTIONAL]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
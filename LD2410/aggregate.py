@@ -0,0 +1,245 @@
+from .radar_consts import *
+from .ld2410_consts import *
+from .ld2450_consts import *
+from math import ceil
+from operator import add
+import logging
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+GATE_COUNT = GATE_MAX + 1
+
+# Packed summary: start, duration, frames, reason, flags, dominant target type, its
+# share and the presence share in percent, nearest and farthest distance, then max,
+# mean and error of the 9 moving and the 9 static gate energies. 77 bytes
+_SUMMARY_LAYOUT = struct.Struct('<dfHBBBBBHH54s')
+_HAS_ENERGIES = 0x01
+_REASON_CODES = {reason: code for code, reason in enumerate(SUMMARY_REASONS)}
+_NO_ENERGIES = bytes(GATE_COUNT)
+
+
+# Summary of the frames of one aggregation window
+#
+# The error bounds hold for every frame in the window:
+#   |energy - mean| <= error for each gate
+#   nearest_dist <= distance <= farthest_dist for every frame with a target (both 0 without one)
+#   target_type_share of the frames had the dominant target_type
+# LD2450 summaries have the number of present targets as target type and no energies.
+class FrameSummary:
+    __slots__ = ("reason", "start", "end", "count", "target_type", "target_type_share", "present_share",
+                 "nearest_dist", "farthest_dist", "move_energy_max", "move_energy_mean", "move_energy_error",
+                 "static_energy_max", "static_energy_mean", "static_energy_error")
+
+    def __init__(self, reason, start, end, count, target_type, target_type_share, present_share,
+                 nearest_dist, farthest_dist, move_energy_max=None, move_energy_mean=None, move_energy_error=None,
+                 static_energy_max=None, static_energy_mean=None, static_energy_error=None):
+        self.reason = reason # SUMMARY_CHANGE, SUMMARY_WINDOW, SUMMARY_HEARTBEAT or SUMMARY_FLUSH
+        self.start = start # Timestamps of the first and last frame
+        self.end = end
+        self.count = count
+        self.target_type = target_type # Most frequent target type
+        self.target_type_share = target_type_share # Fraction of frames with that type
+        self.present_share = present_share # Fraction of frames with a target
+        self.nearest_dist = nearest_dist
+        self.farthest_dist = farthest_dist
+        self.move_energy_max = move_energy_max # Per gate lists, None without engineering mode frames
+        self.move_energy_mean = move_energy_mean
+        self.move_energy_error = move_energy_error
+        self.static_energy_max = static_energy_max
+        self.static_energy_mean = static_energy_mean
+        self.static_energy_error = static_energy_error
+
+    def __repr__(self):
+        return (f"FrameSummary({self.reason!r}, {self.start}-{self.end}, count={self.count}, "
+                f"target_type={self.target_type}, nearest_dist={self.nearest_dist})")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    # Compact binary form for uplinks. Means are rounded to whole energies and the
+    # rounding is added to the error, so the bounds still hold after unpack()
+    def pack(self):
+        flags = _HAS_ENERGIES if self.move_energy_max is not None else 0
+        energies = []
+        for maxima, means, errors in ((self.move_energy_max, self.move_energy_mean, self.move_energy_error),
+                                      (self.static_energy_max, self.static_energy_mean, self.static_energy_error)):
+            if maxima is None:
+                energies.append(_NO_ENERGIES * 3)
+                continue
+            rounded = [round(mean) for mean in means]
+            energies.append(bytes(maxima) + bytes(rounded)
+                            + bytes(min(255, ceil(error + abs(mean - value)))
+                                    for error, mean, value in zip(errors, means, rounded)))
+        return _SUMMARY_LAYOUT.pack(self.start, self.end - self.start, min(self.count, 0xFFFF),
+                                    _REASON_CODES[self.reason], flags, self.target_type,
+                                    round(self.target_type_share * 100), round(self.present_share * 100),
+                                    round(self.nearest_dist), round(self.farthest_dist), b"".join(energies))
+
+    @classmethod
+    def unpack(cls, data):
+        (start, duration, count, reason, flags, target_type, type_share, present_share,
+         nearest, farthest, energies) = _SUMMARY_LAYOUT.unpack(data)
+        fields = ()
+        if flags & _HAS_ENERGIES:
+            fields = [list(energies[i:i + GATE_COUNT]) for i in range(0, len(energies), GATE_COUNT)]
+        return cls(SUMMARY_REASONS[reason], start, start + duration, count, target_type, type_share / 100,
+                   present_share / 100, nearest, farthest, *fields)
+
+
+# Reduces a frame stream to FrameSummary objects at an adaptive rate
+#
+# While the scene changes, a summary is emitted every `window` seconds (every frame
+# with window=0). A frame where presence appears or disappears closes its window at
+# once, and the nearest target moving by more than distance_threshold (cm on the
+# LD2410, mm on the LD2450) counts as a change too. active_hold seconds after the last
+# change the scene is static, and frames are only summarised every `heartbeat` seconds.
+#
+# update() returns the summary a frame completed, usually None, and calls
+# callback(summary) for it. flush() summarises the frames of the open window.
+#
+# Usage:
+#   aggregator = FrameAggregator(window=1, heartbeat=60, callback=uplink)
+#   radar.subscribe(aggregator.on_frame)
+# or radar.start_aggregation(uplink, window=1, heartbeat=60)
+class FrameAggregator:
+    def __init__(self, model="LD2410", window=AGGREGATE_WINDOW, heartbeat=AGGREGATE_HEARTBEAT,
+                 active_hold=AGGREGATE_ACTIVE_HOLD, distance_threshold=None, callback=None):
+        if model not in ("LD2410", "LD2450"):
+            raise Exception(f"Unknown model {model}, pick one of ['LD2410', 'LD2450']")
+        if heartbeat < window:
+            raise Exception(f"heartbeat ({heartbeat}s) must not be shorter than window ({window}s)")
+        if distance_threshold is None:
+            distance_threshold = AGGREGATE_DISTANCE_THRESHOLD if model == "LD2410" else AGGREGATE_TARGET_DISTANCE_THRESHOLD
+        self.model = model
+        self.window = window
+        self.heartbeat = heartbeat
+        self.active_hold = active_hold
+        self.distance_threshold = distance_threshold
+        self.callback = callback
+        self.frames = 0 # Frames seen so far
+        self.summaries = 0 # Summaries emitted so far
+        self.last_change = None # Timestamp of the last change, None before the first one
+        self._add = self._add_ld2410 if model == "LD2410" else self._add_ld2450
+        self._present = None
+        self._reference_dist = None # Nearest distance movement is measured from
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._start = None
+        self._end = None
+        self._count = 0
+        self._type_counts = [0] * 4
+        self._nearest = None
+        self._farthest = None
+        self._energy_count = 0
+        self._move_max = self._move_min = self._move_sum = None
+        self._static_max = self._static_min = self._static_sum = None
+
+    # Whether the scene changed within the last active_hold seconds
+    def active(self, timestamp):
+        return self.last_change is not None and timestamp - self.last_change < self.active_hold
+
+    # Adds a frame to the window, returns (present, nearest distance or None)
+    def _add_ld2410(self, frame):
+        target_type = frame.target_type
+        self._type_counts[target_type] += 1
+        dist = frame.detection_dist if target_type else None
+        move_energies = frame.move_energies
+        if move_energies is not None:
+            static_energies = frame.static_energies
+            if self._energy_count:
+                self._move_max = list(map(max, self._move_max, move_energies))
+                self._move_min = list(map(min, self._move_min, move_energies))
+                self._move_sum = list(map(add, self._move_sum, move_energies))
+                self._static_max = list(map(max, self._static_max, static_energies))
+                self._static_min = list(map(min, self._static_min, static_energies))
+                self._static_sum = list(map(add, self._static_sum, static_energies))
+            else:
+                self._move_max = self._move_min = self._move_sum = list(move_energies)
+                self._static_max = self._static_min = self._static_sum = list(static_energies)
+            self._energy_count += 1
+        return bool(target_type), dist
+
+    # LD2450 frames are 3 (x, y, speed, resolution, distance) targets, empty ones all 0
+    def _add_ld2450(self, targets):
+        distances = [target[4] for target in targets if target[4]]
+        self._type_counts[len(distances)] += 1
+        return bool(distances), min(distances) if distances else None
+
+    def update(self, timestamp, frame):
+        with self._lock:
+            self.frames += 1
+            if self._start is None:
+                self._start = timestamp
+            self._end = timestamp
+            self._count += 1
+            present, dist = self._add(frame)
+            if dist is not None:
+                if self._nearest is None:
+                    self._nearest = self._farthest = dist
+                elif dist < self._nearest:
+                    self._nearest = dist
+                elif dist > self._farthest:
+                    self._farthest = dist
+
+            changed = self._present is not None and present != self._present
+            self._present = present
+            if changed:
+                self.last_change = timestamp
+                self._reference_dist = dist
+            elif dist is None or self._reference_dist is None:
+                self._reference_dist = dist
+            elif abs(dist - self._reference_dist) > self.distance_threshold:
+                self.last_change = timestamp
+                self._reference_dist = dist
+
+            elapsed = timestamp - self._start
+            if changed:
+                summary = self._summarise(SUMMARY_CHANGE)
+            elif self.active(timestamp) and elapsed >= self.window:
+                summary = self._summarise(SUMMARY_WINDOW)
+            elif elapsed >= self.heartbeat:
+                summary = self._summarise(SUMMARY_HEARTBEAT)
+            else:
+                return None
+        if self.callback is not None:
+            self.callback(summary)
+        return summary
+
+    # Same signature as a Radar.subscribe() callback
+    def on_frame(self, seq, timestamp, frame):
+        self.update(timestamp, frame)
+
+    # Summarises the open window, e.g. before shutting down. Returns None if it is empty
+    def flush(self):
+        with self._lock:
+            if not self._count:
+                return None
+            summary = self._summarise(SUMMARY_FLUSH)
+        if self.callback is not None:
+            self.callback(summary)
+        return summary
+
+    def _summarise(self, reason):
+        count = self._count
+        target_type = max(range(4), key=self._type_counts.__getitem__)
+        present = count - self._type_counts[0]
+        energies = ()
+        if self._energy_count:
+            energies = (*self._energy_stats(self._move_max, self._move_min, self._move_sum),
+                        *self._energy_stats(self._static_max, self._static_min, self._static_sum))
+        summary = FrameSummary(reason, self._start, self._end, count, target_type,
+                               self._type_counts[target_type] / count, present / count,
+                               self._nearest or 0, self._farthest or 0, *energies)
+        self.summaries += 1
+        self._reset()
+        return summary
+
+    # (max, mean, error) per gate, the error being the largest distance of any frame from the mean
+    def _energy_stats(self, maxima, minima, sums):
+        means = [total / self._energy_count for total in sums]
+        errors = [max(high - mean, mean - low) for high, low, mean in zip(maxima, minima, means)]
+        return maxima, means, errors
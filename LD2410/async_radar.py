@@ -0,0 +1,315 @@
+from .radar import *
+from .ld2410 import LD2410
+from .ld2450 import LD2450
+from .ld2410_consts import *
+from .ld2450_consts import *
+from .frame_parser import FrameParser
+import asyncio
+
+logger = logging.getLogger(__name__)
+
+_READ_FAILED = object() # Queued for frames() consumers when polling stops on a read error
+
+
+# asyncio version of Radar
+#
+# Serial reads never block the event loop. Where the loop supports it (selector
+# loops on POSIX) the port is watched with loop.add_reader, otherwise a reader
+# task pulls data through the default executor. Frame decoding, command building
+# and ACK parsing are shared with the sync drivers.
+#
+# Usage:
+#   async with AsyncLD2410("/dev/ttyUSB0") as radar:
+#       print(await radar.read_firmware_version())
+#       async for frame in radar.frames():
+#           print(frame)
+class AsyncRadar():
+    # Sync driver class whose decode/parse helpers are reused
+    driver = Radar
+
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, frame_queue_size=FRAME_QUEUE_SIZE) -> None:
+        self.port = port
+        self.baudrate = baud_rate
+        self.timeout = timeout
+        self.cmd_timeout = CMD_TIMEOUT
+        self.cmd_retries = CMD_RETRIES
+        self.eng_mode = False
+        self.frame_queue_size = frame_queue_size
+        self.parser = None # FrameParser for the data frames, set by the device class
+        self.ack_parser = FrameParser(CMD_HEADER, CMD_MFR)
+        self.metrics = None # RadarStats while stats are enabled, see Radar.enable_stats()
+        self.trace_every = 0 # See Radar.trace_frames()
+        self._trace_countdown = 0
+
+        self._latest = (0, None, None)
+        self._queues = set()
+        self._ack_waiter = None
+        self._ack_word = None
+        self._cmd_lock = asyncio.Lock()
+        self._reader_task = None
+        self._watching_fd = False
+        self._fd = None
+        self.read_error = None # Exception that stopped polling, raised to frames() and send_frame()
+
+        # Reads return straight away with whatever is buffered
+        import serial
+        self.ser = serial.Serial(port, BAUD_LOOKUP[baud_rate], timeout=0)
+        logger.info(f"Serial port initialised at {port}, with baud rate {BAUD_LOOKUP[baud_rate]}")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+        self.ser.close()
+
+    # Attach the serial port to the running event loop
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.read_error = None
+        try:
+            self._fd = self.ser.fileno()
+            loop.add_reader(self._fd, self._on_readable)
+            self._watching_fd = True
+        except (NotImplementedError, AttributeError, OSError):
+            # Windows / proactor loops, fall back to blocking reads in a worker thread
+            self.ser.timeout = ASYNC_EXECUTOR_READ_TIMEOUT
+            self._reader_task = loop.create_task(self._executor_reader())
+        logger.info("Radar polling started")
+
+    async def stop(self):
+        if self._watching_fd:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._watching_fd = False
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        logger.info("Radar polling stopped")
+
+    def _on_readable(self):
+        try:
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+        except Exception as e:
+            self._read_failed(e)
+            return
+        self.process_bytes(chunk)
+
+    async def _executor_reader(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                chunk = await loop.run_in_executor(None, lambda: self.ser.read(self.ser.in_waiting or 1))
+            except Exception as e:
+                self._read_failed(e)
+                return
+            if chunk:
+                self.process_bytes(chunk)
+
+    # A port that fails to read is gone. Its fd stays readable, so stop watching it
+    # (as RadarHub drops a dead device) and raise the error to everyone waiting
+    def _read_failed(self, e):
+        logger.warning(f"Failed to read from {self.port}, polling stopped: {e}")
+        if self.metrics is not None:
+            self.metrics.serial_exceptions += 1
+        if self._watching_fd:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            self._watching_fd = False
+        self.read_error = e
+        if self._ack_waiter is not None and not self._ack_waiter.done():
+            self._ack_waiter.set_exception(e)
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(_READ_FAILED)
+
+    # Stats work as on the sync drivers
+    enable_stats = Radar.enable_stats
+    disable_stats = Radar.disable_stats
+    stats = Radar.stats
+    trace_frames = Radar.trace_frames
+
+    # Feed raw serial data through the data and ACK parsers
+    def process_bytes(self, chunk):
+        if self.metrics is not None:
+            self.metrics.bytes_read += len(chunk)
+        if self._ack_waiter is not None:
+            self.ack_parser.feed(chunk)
+            for body in self.ack_parser.frames():
+                ret_bytes = Radar.ack_frame(body)
+                if Radar.ack_word(ret_bytes) == self._ack_word and not self._ack_waiter.done():
+                    self._ack_waiter.set_result(ret_bytes)
+
+        self.parser.feed(chunk)
+        for ret in self.parser.frames():
+            self.publish(Radar.parse_frame(self, ret))
+
+    # Route the shared parse_frame() through the driver's frame checks and decoder
+    def check_frame(self, ret):
+        return self.driver.check_frame(self, ret)
+
+    def decode_frame(self, ret):
+        return self.driver.decode_frame(ret)
+
+    def publish(self, data):
+        timestamp = time.monotonic()
+        self._latest = (self._latest[0] + 1, timestamp, data)
+        if self.metrics is not None:
+            self.metrics.frame_published(timestamp)
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    # Latest decoded frame
+    def get_data(self):
+        return self._latest[2]
+
+    # Returns (seq, timestamp, data) for the latest frame
+    def get_frame(self):
+        return self._latest
+
+    # Async iterator over every decoded frame from now on
+    # If the consumer falls behind by more than frame_queue_size frames, the oldest are dropped
+    # Raises the read error once polling stopped on one
+    async def frames(self):
+        if self.read_error is not None:
+            raise self.read_error
+        queue = asyncio.Queue(self.frame_queue_size)
+        self._queues.add(queue)
+        try:
+            while True:
+                data = await queue.get()
+                if data is _READ_FAILED:
+                    raise self.read_error
+                yield data
+        finally:
+            self._queues.discard(queue)
+
+    # Write a command and wait for the ACK with the matching command word
+    # Same timeout and retry policy as Radar.send_frame()
+    async def send_frame(self, command):
+        if self.read_error is not None:
+            raise self.read_error
+        command_bytes = Radar.frame_wrapper(command)
+        self._ack_word = Radar.ack_word(command_bytes)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        try:
+            metrics = self.metrics
+            for attempt in range(self.cmd_retries + 1):
+                if metrics is not None:
+                    if attempt:
+                        metrics.command_retries += 1
+                    sent = time.perf_counter()
+                self._ack_waiter = asyncio.get_running_loop().create_future()
+                if debug:
+                    logger.debug(f"Sending data:  {command_bytes.hex(' ')}")
+                self.ser.write(command_bytes)
+                try:
+                    ret_bytes = await asyncio.wait_for(self._ack_waiter, self.cmd_timeout)
+                except asyncio.TimeoutError:
+                    if debug:
+                        logger.debug(f"No ACK received for {command_bytes.hex(' ')} (attempt {attempt + 1})")
+                    continue
+
+                if metrics is not None:
+                    metrics.command_round_trip.observe(time.perf_counter() - sent)
+                if debug:
+                    logger.debug(f"Received data: {ret_bytes.hex(' ')}")
+                Radar.check_ack(ret_bytes)
+                return ret_bytes
+        finally:
+            self._ack_waiter = None
+            self._ack_word = None
+
+        raise Exception(f"No ACK received for command {command} after {self.cmd_retries + 1} attempts")
+
+    async def send_command(self, command, end_config=True):
+        async with self._cmd_lock:
+            # Enable config mode
+            await self.send_frame(FRAME_CONFIG_ENABLE)
+            try:
+                # Send command
+                return await self.send_frame(command)
+            finally:
+                # Disable config mode
+                if end_config:
+                    await self.send_frame(FRAME_CONFIG_DISABLE)
+
+    async def read_firmware_version(self):
+        logger.info("Reading firmware version")
+        return self.driver.parse_firmware_version(await self.send_command(FRAME_FIRMWARE_READ))
+
+    async def bt_enable(self):
+        logger.info("Enabling Bluetooth")
+        await self.send_command(FRAME_BT_ENABLE)
+
+    async def bt_disable(self):
+        logger.info("Disabling Bluetooth")
+        await self.send_command(FRAME_BT_DISABLE)
+
+    async def bt_query_mac(self):
+        logger.info("Getting Bluetooth Address")
+        return self.driver.parse_bt_mac(await self.send_command(FRAME_BT_MAC_QUERY))
+
+
+class AsyncLD2410(AsyncRadar):
+    driver = LD2410
+
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, frame_queue_size=FRAME_QUEUE_SIZE) -> None:
+        super().__init__(port, baud_rate=baud_rate, timeout=timeout, frame_queue_size=frame_queue_size)
+        self.parser = FrameParser(REF_READ_HEADER, REF_READ_TAIL, skip=(CMD_HEADER, CMD_MFR))
+
+    async def edit_detection_params(self, moving_max_gate, static_max_gate, timeout):
+        logger.info("Editing detection parameters")
+        await self.send_command(LD2410.detection_params_command(moving_max_gate, static_max_gate, timeout))
+
+    async def read_detection_params(self):
+        logger.info("Reading detection parameters")
+        return LD2410.parse_detection_params(await self.send_command(FRAME_PARAM_READ))
+
+    async def enable_engineering_mode(self):
+        logger.info("Enabling engineering mode")
+        self.eng_mode = True
+        await self.send_command(FRAME_ENG_MODE_ENABLE)
+
+    async def disable_engineering_mode(self):
+        logger.info("Disabling engineering mode")
+        self.eng_mode = False
+        await self.send_command(FRAME_ENG_MODE_DISABLE)
+
+    async def edit_gate_sensitivity(self, gate, moving_sens, static_sens):
+        logger.info("Editing gate sensitivity")
+        await self.send_command(LD2410.gate_sensitivity_command(gate, moving_sens, static_sens))
+
+
+class AsyncLD2450(AsyncRadar):
+    driver = LD2450
+
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, frame_queue_size=FRAME_QUEUE_SIZE) -> None:
+        super().__init__(port, baud_rate=baud_rate, timeout=timeout, frame_queue_size=frame_queue_size)
+        self.parser = FrameParser(REF_DATA_HEADER, REF_DATA_CRC, payload_len=REF_DATA_PAYLOAD_LEN, skip=(CMD_HEADER, CMD_MFR))
+
+    async def set_single_target_tracking(self):
+        logger.info("Enabling single target tracking")
+        return await self.send_command(FRAME_SINGLE_TARGET_TRACKING)
+
+    async def set_multi_target_tracking(self):
+        logger.info("Enabling multi target tracking")
+        return await self.send_command(FRAME_MULTI_TARGET_TRACKING)
+
+    async def read_tracking_mode(self):
+        logger.info("Reading tracking mode")
+        return LD2450.parse_tracking_mode(await self.send_command(FRAME_TRACKING_QUERY))
+
+    async def read_region_filter(self):
+        logger.info("Reading region filter")
+        return LD2450.parse_region_filter(await self.send_command(FRAME_READ_REGION_FILTER))
+
+    async def set_region_filter(self, config:list, filter_type:int):
+        logger.info("Setting regional filter with the following config: %s and mode %d" % (str(config), filter_type))
+        return await self.send_command(LD2450.region_filter_command(config, filter_type))
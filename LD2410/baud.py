@@ -0,0 +1,86 @@
+from .radar_consts import *
+from .ld2450_consts import *
+from .frame_parser import FrameParser
+from .commands import FRAME_CONFIG_ENABLE, FRAME_CONFIG_DISABLE
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_baud_cache = {} # port -> PARAM_BAUD_* detected last
+_baud_cache_lock = threading.Lock()
+
+
+def cached_baud_rate(port):
+    return _baud_cache.get(port)
+
+
+def cache_baud_rate(port, baud_rate):
+    with _baud_cache_lock:
+        _baud_cache[port] = baud_rate
+
+
+# Parsers for everything a module may send: LD2410 data, LD2450 data and ACK frames
+def _frame_parsers():
+    return [FrameParser(REF_READ_HEADER, REF_READ_TAIL),
+            FrameParser(REF_DATA_HEADER, REF_DATA_CRC, payload_len=REF_DATA_PAYLOAD_LEN),
+            FrameParser(CMD_HEADER, CMD_MFR)]
+
+
+# Read for up to duration seconds, True as soon as one complete frame comes through
+def _heard_frame(ser, duration):
+    parsers = _frame_parsers()
+    deadline = time.monotonic() + duration
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        ser.timeout = remaining
+        chunk = ser.read(ser.in_waiting or 1)
+        for parser in parsers:
+            parser.feed(chunk)
+            if parser.next_frame() is not None:
+                return True
+
+
+# Check whether a module answers at the port's current baud rate
+#
+# A streaming module gives itself away with a valid data frame. A silent one (e.g. left
+# in config mode) is sent a config enable command and has to answer with a valid ACK,
+# after which config mode is closed again.
+def probe(ser, sniff_time=AUTOBAUD_SNIFF_TIME, ack_timeout=AUTOBAUD_ACK_TIMEOUT):
+    ser.reset_input_buffer()
+    if _heard_frame(ser, sniff_time):
+        return True
+    ser.write(FRAME_CONFIG_ENABLE)
+    if _heard_frame(ser, ack_timeout):
+        ser.write(FRAME_CONFIG_DISABLE)
+        return True
+    return False
+
+
+# Find the baud rate a module on port is running at and return it as a PARAM_BAUD_* value
+#
+# The rate last detected on the port is tried first, then the candidates (AUTOBAUD_ORDER
+# by default). Raises if the module answers at none of them.
+def detect_baud_rate(port, candidates=None, sniff_time=AUTOBAUD_SNIFF_TIME, ack_timeout=AUTOBAUD_ACK_TIMEOUT):
+    candidates = list(candidates or AUTOBAUD_ORDER)
+    cached = cached_baud_rate(port)
+    if cached in candidates:
+        candidates.remove(cached)
+        candidates.insert(0, cached)
+
+    import serial
+    ser = serial.Serial(port, BAUD_LOOKUP[candidates[0]], timeout=sniff_time)
+    try:
+        for baud_rate in candidates:
+            ser.baudrate = BAUD_LOOKUP[baud_rate]
+            if probe(ser, sniff_time, ack_timeout):
+                logger.info(f"Detected baud rate {BAUD_LOOKUP[baud_rate]} on {port}")
+                cache_baud_rate(port, baud_rate)
+                return baud_rate
+            logger.debug(f"No radar at {BAUD_LOOKUP[baud_rate]} baud on {port}")
+    finally:
+        ser.close()
+    raise Exception(f"No radar answered on {port} at any of {[BAUD_LOOKUP[b] for b in candidates]} baud")
@@ -0,0 +1,76 @@
+from .radar_consts import *
+from .ld2410_consts import *
+from .ld2450_consts import *
+import struct
+
+_CMD_HEADER = bytes.fromhex(CMD_HEADER)
+_CMD_MFR = bytes.fromhex(CMD_MFR)
+_LENGTH_AND_WORD = struct.Struct('<HH')
+
+
+# Binary encoder for one command word
+#
+# A command frame is header, length, command word, value, tail. The value layout is a
+# precompiled little endian struct format, and the length field (word + value bytes)
+# is derived from it, so encoding is one pack and two concatenations.
+#
+#   GATE_SENSITIVITY.encode(PARAM_WORD_GATE, 3, PARAM_WORD_MOVING, 50, PARAM_WORD_STATIC, 40)
+class CommandTemplate:
+    __slots__ = ("word", "layout", "_head")
+
+    def __init__(self, word, value_format=""):
+        self.word = word
+        self.layout = struct.Struct('<' + value_format)
+        self._head = _CMD_HEADER + _LENGTH_AND_WORD.pack(2 + self.layout.size, word)
+
+    # Full frame with the values packed into the value layout
+    def encode(self, *values):
+        return self._head + self.layout.pack(*values) + _CMD_MFR
+
+    # Full frame around an already packed value
+    def wrap(self, value):
+        if len(value) != self.layout.size:
+            raise Exception(f"Command 0x{self.word:04X} takes a {self.layout.size} byte value, got {len(value)}")
+        return self._head + value + _CMD_MFR
+
+
+# Commands with values
+DETECTION_PARAMS = CommandTemplate(WORD_PARAM_EDIT, 'HIHIHI')
+GATE_SENSITIVITY = CommandTemplate(WORD_GATE_SENS_EDIT, 'HIHIHI')
+BAUD_RATE_SET = CommandTemplate(WORD_BAUD_RATE_SET, 'H')
+REGION_FILTER_WRITE = CommandTemplate(WORD_WRITE_REGION_FILTER, 'H12h') # Filter type, then x1, y1, x2, y2 of 3 regions
+
+# Constant frames, encoded once
+FRAME_CONFIG_ENABLE = CommandTemplate(WORD_CONFIG_ENABLE, 'H').encode(CONFIG_PROTOCOL_VERSION)
+FRAME_CONFIG_DISABLE = CommandTemplate(WORD_CONFIG_DISABLE).encode()
+FRAME_PARAM_READ = CommandTemplate(WORD_PARAM_READ).encode()
+FRAME_ENG_MODE_ENABLE = CommandTemplate(WORD_ENG_MODE_ENABLE).encode()
+FRAME_ENG_MODE_DISABLE = CommandTemplate(WORD_ENG_MODE_DISABLE).encode()
+FRAME_FIRMWARE_READ = CommandTemplate(WORD_FIRMWARE_READ).encode()
+FRAME_FACTORY_RESET = CommandTemplate(WORD_FACTORY_RESET).encode()
+FRAME_RESTART = CommandTemplate(WORD_RESTART).encode()
+FRAME_BT_ENABLE = CommandTemplate(WORD_BT_SET, 'H').encode(BT_ON)
+FRAME_BT_DISABLE = CommandTemplate(WORD_BT_SET, 'H').encode(BT_OFF)
+FRAME_BT_MAC_QUERY = CommandTemplate(WORD_BT_MAC_QUERY, 'H').encode(1)
+FRAME_SINGLE_TARGET_TRACKING = CommandTemplate(WORD_SINGLE_TARGET_TRACKING).encode()
+FRAME_MULTI_TARGET_TRACKING = CommandTemplate(WORD_MULTI_TARGET_TRACKING).encode()
+FRAME_TRACKING_QUERY = CommandTemplate(WORD_TRACKING_QUERY).encode()
+FRAME_READ_REGION_FILTER = CommandTemplate(WORD_READ_REGION_FILTER).encode()
+
+TRACKING_FRAMES = {TRACKING_SINGLE: FRAME_SINGLE_TARGET_TRACKING,
+                   TRACKING_MULTI: FRAME_MULTI_TARGET_TRACKING}
+
+# Frames for the hex command bodies send_command() still accepts, wrapped once each
+_wrapped = {}
+
+
+# Full command frame for a command given as a frame (bytes) or a hex string body
+def command_frame(command):
+    if not isinstance(command, str):
+        return command
+    frame = _wrapped.get(command)
+    if frame is None:
+        frame = _CMD_HEADER + bytes.fromhex(command) + _CMD_MFR
+        if len(_wrapped) < 256:
+            _wrapped[command] = frame
+    return frame
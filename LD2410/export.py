@@ -0,0 +1,230 @@
+from .radar_consts import *
+from .ld2410_consts import *
+from array import array
+import csv
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+GATE_COUNT = GATE_MAX + 1
+
+# Columns of each model as (name, array typecode)
+# Gate energies are 0 for frames decoded outside engineering mode, like in FrameHistory
+LD2410_COLUMNS = [("timestamp", 'd'), ("target_type", 'B'),
+                  ("moving_target_dist", 'H'), ("moving_target_energy", 'B'),
+                  ("static_target_dist", 'H'), ("static_target_energy", 'B'),
+                  ("detection_dist", 'H')] \
+               + [(f"move_energy_{gate}", 'B') for gate in range(GATE_COUNT)] \
+               + [(f"static_energy_{gate}", 'B') for gate in range(GATE_COUNT)]
+# Empty LD2450 target slots are all 0
+LD2450_COLUMNS = [("timestamp", 'd')] + [(f"target{target}_{field}", typecode) for target in (1, 2, 3)
+                                         for field, typecode in (("x", 'h'), ("y", 'h'), ("speed", 'h'), ("resolution", 'H'))]
+EXPORT_COLUMNS = {"LD2410": LD2410_COLUMNS, "LD2450": LD2450_COLUMNS}
+
+_NUMPY_TYPES = {'d': '<f8', 'B': 'u1', 'H': '<u2', 'h': '<i2'}
+_NO_ENERGIES = bytes(GATE_COUNT)
+
+# pyarrow and NumPy are optional and slow to import, so they are only looked for when needed
+_optional = {}
+
+
+def _load_optional(name):
+    if name not in _optional:
+        try:
+            _optional[name] = __import__(name)
+        except ImportError:
+            _optional[name] = None
+    return _optional[name]
+
+
+def _require(name, format):
+    module = _load_optional(name)
+    if module is None:
+        raise Exception(f"Exporting {format} needs {name}, install it or use format={EXPORT_CSV!r}")
+    return module
+
+
+def _ld2410_row(timestamp, frame):
+    move_energies = frame.move_energies
+    static_energies = frame.static_energies
+    if move_energies is None:
+        move_energies = static_energies = _NO_ENERGIES
+    return (timestamp, frame.target_type, frame.moving_target_dist, frame.moving_target_energy,
+            frame.static_target_dist, frame.static_target_energy, frame.detection_dist,
+            *move_energies, *static_energies)
+
+
+def _ld2450_row(timestamp, targets):
+    return (timestamp, *[value for target in targets for value in target[:4]])
+
+
+_ROWS = {"LD2410": _ld2410_row, "LD2450": _ld2450_row}
+
+
+# Chunk writers, one per format. write() gets the buffered columns, close() ends the file
+class _ParquetWriter:
+    def __init__(self, path, columns):
+        pyarrow = _require("pyarrow", EXPORT_PARQUET)
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.schema = _arrow_schema(pyarrow, columns)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, columns, rows):
+        batch = _arrow_batch(self.pyarrow, self.schema, columns, rows)
+        self.writer.write_table(self.pyarrow.Table.from_batches([batch])) # One row group per chunk
+
+    def close(self):
+        self.writer.close()
+
+
+class _ArrowWriter:
+    def __init__(self, path, columns):
+        pyarrow = _require("pyarrow", EXPORT_ARROW)
+        self.pyarrow = pyarrow
+        self.schema = _arrow_schema(pyarrow, columns)
+        self.sink = pyarrow.OSFile(path, "wb")
+        self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+
+    def write(self, columns, rows):
+        self.writer.write_batch(_arrow_batch(self.pyarrow, self.schema, columns, rows))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+def _arrow_schema(pyarrow, columns):
+    types = {'d': pyarrow.float64(), 'B': pyarrow.uint8(), 'H': pyarrow.uint16(), 'h': pyarrow.int16()}
+    return pyarrow.schema([(name, types[typecode]) for name, typecode in columns])
+
+
+# The typed columns become Arrow arrays without copying
+def _arrow_batch(pyarrow, schema, columns, rows):
+    arrays = [pyarrow.Array.from_buffers(field.type, rows, [None, pyarrow.py_buffer(column)])
+              for field, column in zip(schema, columns)]
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# A directory of chunk-000000.npy, chunk-000001.npy, ... holding structured arrays
+class _NpyWriter:
+    def __init__(self, path, columns):
+        self.numpy = _require("numpy", EXPORT_NPY)
+        self.path = path
+        self.dtype = self.numpy.dtype([(name, _NUMPY_TYPES[typecode]) for name, typecode in columns])
+        os.makedirs(path, exist_ok=True)
+        self.chunks = len([name for name in os.listdir(path) if name.startswith("chunk-") and name.endswith(".npy")])
+
+    def write(self, columns, rows):
+        chunk = self.numpy.empty(rows, dtype=self.dtype)
+        for name, column in zip(self.dtype.names, columns):
+            chunk[name] = self.numpy.frombuffer(column, dtype=column.typecode)
+        self.numpy.save(os.path.join(self.path, f"chunk-{self.chunks:06d}.npy"), chunk)
+        self.chunks += 1
+
+    def close(self):
+        pass
+
+
+class _CsvWriter:
+    def __init__(self, path, columns):
+        new = not os.path.exists(path) or not os.path.getsize(path)
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if new:
+            self.writer.writerow([name for name, _ in columns])
+
+    def write(self, columns, rows):
+        self.writer.writerows(zip(*columns))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+_EXTENSIONS = {".parquet": EXPORT_PARQUET, ".arrow": EXPORT_ARROW, ".arrows": EXPORT_ARROW,
+               ".npy": EXPORT_NPY, ".csv": EXPORT_CSV}
+_WRITERS = {EXPORT_PARQUET: _ParquetWriter, EXPORT_ARROW: _ArrowWriter, EXPORT_NPY: _NpyWriter, EXPORT_CSV: _CsvWriter}
+
+
+# Buffers decoded frames in typed columns and writes them out in chunks
+#
+# Frames are appended to one array per column (see LD2410_COLUMNS and LD2450_COLUMNS)
+# and written as one chunk every chunk_rows frames or flush_interval seconds: a
+# Parquet row group, an Arrow record batch, a .npy file or CSV rows. Memory stays at
+# one chunk however long the export runs. Without a format it is picked from the
+# file extension, falling back to Parquet when pyarrow is installed and CSV otherwise.
+#
+# Usage:
+#   with FrameExporter("frames.parquet", model="LD2410") as exporter:
+#       exporter.append(timestamp, frame)
+# or from a running radar:
+#   radar.start_export("frames.parquet")
+class FrameExporter:
+    def __init__(self, path, model="LD2410", format=None, chunk_rows=EXPORT_CHUNK_ROWS,
+                 flush_interval=EXPORT_FLUSH_INTERVAL):
+        if model not in EXPORT_COLUMNS:
+            raise Exception(f"Unknown model {model}, pick one of {list(EXPORT_COLUMNS)}")
+        if format is None:
+            format = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            format = EXPORT_PARQUET if _load_optional("pyarrow") is not None else EXPORT_CSV
+        if format not in EXPORT_FORMATS:
+            raise Exception(f"Unknown export format {format}, pick one of {EXPORT_FORMATS}")
+        self.path = path
+        self.model = model
+        self.format = format
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.rows = 0 # Frames written out so far
+        self.chunks = 0
+
+        self._column_spec = EXPORT_COLUMNS[model]
+        self._row = _ROWS[model]
+        self._writer = _WRITERS[format](path, self._column_spec)
+        self._lock = threading.Lock()
+        self._reset()
+        logger.info(f"Exporting {model} frames to {path} as {format}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reset(self):
+        self._columns = [array(typecode) for _, typecode in self._column_spec]
+        self._appends = [column.append for column in self._columns]
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def append(self, timestamp, frame):
+        with self._lock:
+            for append, value in zip(self._appends, self._row(timestamp, frame)):
+                append(value)
+            self._buffered += 1
+            if self._buffered >= self.chunk_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    # Same signature as a Radar.subscribe() callback
+    def on_frame(self, seq, timestamp, frame):
+        self.append(timestamp, frame)
+
+    def _flush(self):
+        if self._buffered:
+            self._writer.write(self._columns, self._buffered)
+            self.rows += self._buffered
+            self.chunks += 1
+        self._reset()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._writer.close()
@@ -0,0 +1,169 @@
+from .radar_consts import *
+from .ld2410_consts import *
+from .ld2410 import LD2410
+from . import model_class
+from .commands import *
+from concurrent.futures import ThreadPoolExecutor, wait
+import argparse
+import glob
+import json
+import logging
+import math
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Expand glob patterns such as /dev/ttyUSB* into a sorted list of ports
+# Patterns without wildcards are kept as they are, even if they do not exist
+def expand_ports(patterns):
+    ports = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        ports.extend(port for port in matches if port not in ports)
+    return ports
+
+
+# Parameters that differ from a profile (same format as LD2410.apply_config())
+# Returns {name: {"current": ..., "target": ...}}, empty when the module matches
+def profile_diff(params, profile):
+    LD2410.check_profile(profile)
+    thresholds, move_sens, static_sens = params
+    current = {"moving_max_gate": thresholds[0], "static_max_gate": thresholds[1], "timeout": thresholds[2],
+               "moving_sens": move_sens, "static_sens": static_sens}
+    diffs = {}
+    for name, target in profile.items():
+        if name in ("moving_sens", "static_sens"):
+            target = LD2410.expand_gates(target)
+        if current[name] != target:
+            diffs[name] = {"current": current[name], "target": target}
+    return diffs
+
+
+def _result(port, model, error=None):
+    return {"port": port, "model": model, "ok": False, "error": error, "baud_rate": None, "firmware": None,
+            "mac": None, "params": None, "diffs": None, "applied": False, "elapsed": None}
+
+
+# Inventory one device and, with apply=True, push the profile to it if it differs
+#
+# Firmware, MAC and (LD2410) detection parameters are read in one config session with
+# a single batched write, so a healthy device answers in a few tens of milliseconds.
+# Errors are reported in the result instead of raised.
+def inventory_device(port, model="LD2410", baud_rate=PARAM_DEFAULT_BAUD, profile=None, apply=False):
+    start = time.monotonic()
+    result = _result(port, model)
+    radar = None
+    try:
+        radar = model_class(model)(port, baud_rate=baud_rate)
+        result["baud_rate"] = BAUD_LOOKUP[radar.baudrate]
+        commands = [FRAME_FIRMWARE_READ, FRAME_BT_MAC_QUERY]
+        if model == "LD2410":
+            commands.append(FRAME_PARAM_READ)
+        acks = radar.send_batch(commands)
+        result["firmware"] = radar.parse_firmware_version(acks[0])
+        result["mac"] = radar.parse_bt_mac(acks[1])
+
+        if model == "LD2410":
+            params = radar.parse_detection_params(acks[2])
+            radar.cache_detection_params(params) # apply_config() then writes only what differs
+            result["params"] = {"thresholds": params[0], "moving_sens": params[1], "static_sens": params[2]}
+            if profile is not None:
+                result["diffs"] = profile_diff(params, profile)
+                if apply and result["diffs"]:
+                    params = radar.apply_config(profile)
+                    result["params"] = {"thresholds": params[0], "moving_sens": params[1], "static_sens": params[2]}
+                    result["diffs"] = profile_diff(params, profile)
+                    result["applied"] = True
+        elif profile is not None:
+            raise Exception(f"Profiles only apply to the LD2410, {model} has no detection parameters")
+        result["ok"] = True
+    except Exception as e:
+        logger.warning(f"{port}: {e}")
+        result["error"] = str(e)
+    finally:
+        if radar is not None:
+            radar.ser.close()
+        result["elapsed"] = time.monotonic() - start
+    return result
+
+
+# Run inventory_device() on every port at once
+#
+# Devices run on a thread pool with one worker per device by default, so the wall
+# time is that of the slowest device. A device still busy after `timeout` seconds
+# (scaled up when there are fewer workers than devices) is reported as timed out.
+# Returns the results in port order.
+def run_fleet(ports, model="LD2410", baud_rate=PARAM_DEFAULT_BAUD, profile=None, apply=False,
+              timeout=FLEET_DEVICE_TIMEOUT, workers=None):
+    # One clear error instead of one per device
+    if profile is not None:
+        if model != "LD2410":
+            raise Exception(f"Profiles only apply to the LD2410, {model} has no detection parameters")
+        LD2410.check_profile(profile)
+    ports = expand_ports(ports)
+    if not ports:
+        return []
+    workers = workers or len(ports)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet")
+    futures = {port: executor.submit(inventory_device, port, model, baud_rate, profile, apply) for port in ports}
+    wait(futures.values(), timeout=timeout * math.ceil(len(ports) / workers))
+    # Do not wait for hung devices, their threads finish on their own
+    for future in futures.values():
+        future.cancel()
+    executor.shutdown(wait=False)
+
+    results = []
+    for port, future in futures.items():
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            results.append(_result(port, model, f"Timed out after {timeout}s"))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ld2410-fleet", description="Inventory and configure many LD2410/LD2450 modules at once")
+    parser.add_argument("action", choices=("inventory", "apply"))
+    parser.add_argument("ports", nargs="+", help="Serial ports or glob patterns, e.g. '/dev/ttyUSB*'")
+    parser.add_argument("--model", choices=MODELS, default="LD2410")
+    parser.add_argument("--baud", default=str(BAUD_LOOKUP[PARAM_DEFAULT_BAUD]),
+                        help="Baud rate, or 'auto' to detect it per port")
+    parser.add_argument("--profile", help="JSON file with the target profile, see LD2410.apply_config()")
+    parser.add_argument("--timeout", type=float, default=FLEET_DEVICE_TIMEOUT, help="Seconds per device")
+    parser.add_argument("--workers", type=int, help="Devices handled at once (default: all)")
+    args = parser.parse_args(argv)
+
+    if args.baud == BAUD_AUTO:
+        baud_rate = BAUD_AUTO
+    else:
+        baud_rate = {str(baud): param for param, baud in BAUD_LOOKUP.items()}.get(args.baud)
+        if baud_rate is None:
+            parser.error(f"--baud must be one of {sorted(BAUD_LOOKUP.values())} or auto")
+    profile = None
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+    if args.action == "apply" and not profile:
+        parser.error("apply needs --profile")
+    if profile is not None:
+        if args.model != "LD2410":
+            parser.error(f"--profile only applies to the LD2410, {args.model} has no detection parameters")
+        try:
+            LD2410.check_profile(profile)
+        except Exception as e:
+            parser.error(f"--profile {args.profile}: {e}")
+
+    start = time.monotonic()
+    results = run_fleet(args.ports, args.model, baud_rate, profile, args.action == "apply", args.timeout, args.workers)
+    report = {"elapsed": time.monotonic() - start,
+              "devices": len(results),
+              "failed": sum(not result["ok"] for result in results),
+              "results": results}
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+from .radar_consts import *
+
+
+# Incremental frame parser
+#
+# Serial data is fed in whatever chunks the port hands over and whole frames are
+# pulled out as soon as they are complete. Headers are located with bytearray.find
+# over the buffered data instead of shifting a 4 byte window one byte at a time.
+#
+# A frame is header + body + tail. When payload_len is None the body starts with a
+# 2 byte little endian length field (LD2410 data and ACK frames), otherwise the body
+# has a fixed size (LD2450 data frames). The returned frame is the body only, which
+# matches what get_data_frame() has always returned.
+#
+# skip is the (header, tail) of length prefixed frames that share the stream but belong
+# to another parser, e.g. ACKs on the data port. They are stepped over without counting
+# as a resync, so resync_count stays 0 on a clean link.
+class FrameParser:
+    def __init__(self, header, tail, payload_len=None, max_payload_len=REF_MAX_PAYLOAD_LEN, skip=None):
+        self.header = bytes.fromhex(header)
+        self.tail = bytes.fromhex(tail)
+        self.payload_len = payload_len
+        self.max_payload_len = max_payload_len
+        self.skip = None if skip is None else (bytes.fromhex(skip[0]), bytes.fromhex(skip[1]))
+
+        self._buf = bytearray()
+        self._pos = 0
+
+        # Parser level counters
+        self.resync_count = 0
+        self.tail_fail_count = 0
+
+    # Number of buffered bytes that have not been consumed yet
+    def pending(self):
+        return len(self._buf) - self._pos
+
+    def reset(self):
+        self._buf.clear()
+        self._pos = 0
+
+    # Append a chunk of raw serial data
+    def feed(self, data):
+        if self._pos:
+            # Deleting from the front of a bytearray only moves its start pointer
+            del self._buf[:self._pos]
+            self._pos = 0
+        self._buf += data
+
+    # Index just past the complete skip frames starting at pos
+    def _skip_frames(self, pos):
+        skip_header, skip_tail = self.skip
+        buf = self._buf
+        while buf.startswith(skip_header, pos):
+            body_start = pos + len(skip_header)
+            if len(buf) < body_start + 2:
+                break
+            body_end = body_start + 2 + (buf[body_start] | buf[body_start + 1] << 8)
+            if not buf.startswith(skip_tail, body_end):
+                break
+            pos = body_end + len(skip_tail)
+        return pos
+
+    # Returns the next complete frame body as bytes, or None if more data is needed
+    def next_frame(self):
+        buf = self._buf
+        header = self.header
+        tail = self.tail
+        header_len = len(header)
+
+        while True:
+            start = buf.find(header, self._pos)
+            if start < 0:
+                # Keep just enough bytes to complete a header split across chunks
+                pos = max(self._pos, len(buf) - header_len + 1)
+                if self.skip is not None:
+                    # Drop complete skip frames and keep one that is still arriving
+                    skipped = self._skip_frames(self._pos)
+                    if buf.startswith(self.skip[0], skipped) and len(buf) - skipped <= self.max_payload_len:
+                        pos = skipped
+                    else:
+                        pos = max(pos, skipped)
+                self._pos = pos
+                return None
+            if start != self._pos and (self.skip is None or self._skip_frames(self._pos) != start):
+                self.resync_count += 1
+
+            body_start = start + header_len
+            if self.payload_len is None:
+                if len(buf) < body_start + 2:
+                    self._pos = start
+                    return None
+                payload_len = buf[body_start] | buf[body_start + 1] << 8
+                if payload_len > self.max_payload_len:
+                    # Not a real header, carry on searching after it
+                    self.resync_count += 1
+                    self._pos = start + 1
+                    continue
+                body_end = body_start + 2 + payload_len
+            else:
+                body_end = body_start + self.payload_len
+
+            frame_end = body_end + len(tail)
+            if len(buf) < frame_end:
+                self._pos = start
+                return None
+
+            if not buf.startswith(tail, body_end):
+                self.tail_fail_count += 1
+                self._pos = start + 1
+                continue
+
+            self._pos = frame_end
+            with memoryview(buf) as view:
+                return view[body_start:body_end].tobytes()
+
+    # Generator over all complete frames currently buffered
+    def frames(self):
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
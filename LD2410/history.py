@@ -0,0 +1,149 @@
+from .ld2410_consts import *
+from array import array
+import threading
+import time
+
+GATE_COUNT = GATE_MAX + 1
+
+
+# Fixed size history of the last `size` LD2410 frames
+#
+# Every field lives in a preallocated array, so appending is O(1) and memory stays
+# the same no matter how long the radar runs. Gate energies are only recorded in
+# engineering mode, otherwise they read as 0.
+#
+# Windowed queries take `window`, the number of seconds back from the newest frame
+# to look at (None means the whole history).
+class FrameHistory:
+    def __init__(self, size):
+        if size < 1:
+            raise Exception(f"History size must be at least 1, got {size}")
+        self.size = size
+        self.timestamps = array('d', bytes(8 * size))
+        self.target_types = array('B', bytes(size))
+        self.moving_target_dists = array('H', bytes(2 * size))
+        self.moving_target_energies = array('B', bytes(size))
+        self.static_target_dists = array('H', bytes(2 * size))
+        self.static_target_energies = array('B', bytes(size))
+        self.detection_dists = array('H', bytes(2 * size))
+        self.move_energies = bytearray(GATE_COUNT * size)
+        self.static_energies = bytearray(GATE_COUNT * size)
+
+        self.count = 0 # Frames appended in total
+        self.last_moving_time = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, timestamp, frame):
+        with self._lock:
+            i = self._next
+            self.timestamps[i] = timestamp
+            self.target_types[i] = frame.target_type
+            self.moving_target_dists[i] = frame.moving_target_dist
+            self.moving_target_energies[i] = frame.moving_target_energy
+            self.static_target_dists[i] = frame.static_target_dist
+            self.static_target_energies[i] = frame.static_target_energy
+            self.detection_dists[i] = frame.detection_dist
+
+            gates = slice(i * GATE_COUNT, (i + 1) * GATE_COUNT)
+            if frame.move_energies is not None:
+                self.move_energies[gates] = frame.move_energies
+                self.static_energies[gates] = frame.static_energies
+            else:
+                self.move_energies[gates] = bytes(GATE_COUNT)
+                self.static_energies[gates] = bytes(GATE_COUNT)
+
+            if frame.target_type & 1: # Moving or Moving + Static
+                self.last_moving_time = timestamp
+
+            self._next = (i + 1) % self.size
+            self.count += 1
+
+    # Physical index of the oldest frame
+    def _oldest(self):
+        return self._next if self.count >= self.size else 0
+
+    # Physical index ranges (oldest first) covering the frames within the window
+    def _ranges(self, window):
+        length = len(self)
+        oldest = self._oldest()
+        first = 0
+        if window is not None and length:
+            # Frames are in time order, so binary search for the first one inside the window
+            cutoff = self.timestamps[(oldest + length - 1) % self.size] - window
+            lo, hi = 0, length
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.timestamps[(oldest + mid) % self.size] < cutoff:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            first = lo
+
+        start = (oldest + first) % self.size
+        end = start + length - first
+        if end <= self.size:
+            return [(start, end)]
+        return [(start, self.size), (0, end - self.size)]
+
+    def _gate_columns(self, window, static):
+        energies = self.static_energies if static else self.move_energies
+        with self._lock:
+            ranges = self._ranges(window)
+            return [[value for start, end in ranges
+                     for value in energies[start * GATE_COUNT + gate:end * GATE_COUNT:GATE_COUNT]]
+                    for gate in range(GATE_COUNT)]
+
+    # Mean energy of each gate, 9 floats
+    def gate_energy_mean(self, window=None, static=False):
+        columns = self._gate_columns(window, static)
+        return [sum(column) / len(column) if column else 0.0 for column in columns]
+
+    # Max energy of each gate, 9 ints
+    def gate_energy_max(self, window=None, static=False):
+        columns = self._gate_columns(window, static)
+        return [max(column) if column else 0 for column in columns]
+
+    # Seconds since a moving target was last seen, None if it never was
+    def time_since_moving(self, now=None):
+        if self.last_moving_time is None:
+            return None
+        return (time.monotonic() if now is None else now) - self.last_moving_time
+
+    # Fraction of frames in the window that detected any target
+    def occupancy_ratio(self, window=None):
+        with self._lock:
+            ranges = self._ranges(window)
+            total = sum(end - start for start, end in ranges)
+            occupied = sum(end - start - self.target_types[start:end].count(0) for start, end in ranges)
+        return occupied / total if total else 0.0
+
+    # Detection distance percentiles (nearest rank), e.g. distance_percentiles((50, 90))
+    def distance_percentiles(self, percentiles=(50, 90), window=None):
+        with self._lock:
+            dists = sorted(d for start, end in self._ranges(window) for d in self.detection_dists[start:end])
+        if not dists:
+            return [None for _ in percentiles]
+        return [dists[min(len(dists) - 1, max(0, -(-p * len(dists) // 100) - 1))] for p in percentiles]
+
+    # Copy of the whole history in time order as contiguous arrays
+    # Gate energies are bytearrays of len(self) * 9, one row of 9 gates per frame
+    def snapshot(self):
+        with self._lock:
+            ranges = self._ranges(None)
+            ret = {}
+            for name in ("timestamps", "target_types", "moving_target_dists", "moving_target_energies",
+                         "static_target_dists", "static_target_energies", "detection_dists"):
+                column = getattr(self, name)
+                ret[name] = column[0:0]
+                for start, end in ranges:
+                    ret[name] += column[start:end]
+            for name in ("move_energies", "static_energies"):
+                column = getattr(self, name)
+                ret[name] = bytearray()
+                for start, end in ranges:
+                    ret[name] += column[start * GATE_COUNT:end * GATE_COUNT]
+        return ret
@@ -0,0 +1,144 @@
+from .radar import *
+import queue
+import selectors
+
+logger = logging.getLogger(__name__)
+
+
+# A device registered with a RadarHub
+class HubDevice:
+    def __init__(self, name, radar, callback=None, frame_queue=None):
+        self.name = name
+        self.radar = radar
+        self.callback = callback
+        self.frame_queue = frame_queue
+        self.frame_count = 0
+        self.frame_rate = 0.0
+
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def dispatch(self, data):
+        self.frame_count += 1
+        if self.callback:
+            try:
+                self.callback(self.name, data)
+            except Exception:
+                # One device's callback must not stop the hub thread for every other device
+                logger.exception(f"Hub callback for {self.name} failed")
+        if self.frame_queue is not None:
+            try:
+                self.frame_queue.put_nowait((self.name, data))
+            except queue.Full:
+                # Drop the oldest frame so the queue always holds the newest data
+                try:
+                    self.frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frame_queue.put_nowait((self.name, data))
+
+    def update_rate(self, now):
+        elapsed = now - self._window_start
+        if elapsed >= HUB_RATE_WINDOW:
+            self.frame_rate = (self.frame_count - self._window_count) / elapsed
+            self._window_start = now
+            self._window_count = self.frame_count
+
+
+# Services many LD2410/LD2450 devices from one selector thread
+#
+# Registered radars must not be started with radar.start(), the hub does their reads.
+# Each decoded frame is published to the radar (so radar.get_data() keeps working)
+# and handed to the device callback as callback(name, data) and/or put on its queue
+# as (name, data).
+#
+# Usage:
+#   hub = RadarHub()
+#   hub.register(LD2410("/dev/ttyUSB0"), callback=on_frame)
+#   hub.register(LD2450("/dev/ttyUSB1"), frame_queue=queue.Queue(100))
+#   hub.start()
+class RadarHub:
+    def __init__(self):
+        self.devices = {} # Replaced, never mutated, so the hub thread can iterate without a lock
+        self._devices_lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._worker_thread = None
+        self._stop_event = threading.Event()
+
+    def register(self, radar, callback=None, frame_queue=None, name=None):
+        if radar._worker_thread and radar._worker_thread.is_alive():
+            raise Exception(f"{radar.port} is already polling on its own thread, call radar.stop() first")
+        name = name or radar.port
+        device = HubDevice(name, radar, callback, frame_queue)
+        with self._devices_lock:
+            if name in self.devices:
+                raise Exception(f"A device named {name} is already registered")
+            radar.external_reader = self.running()
+            self._selector.register(radar.ser.fileno(), selectors.EVENT_READ, device)
+            self.devices = {**self.devices, name: device}
+        logger.info(f"Registered {name} with radar hub")
+        return device
+
+    def unregister(self, name):
+        with self._devices_lock:
+            devices = dict(self.devices)
+            device = devices.pop(name)
+            self.devices = devices
+            device.radar.external_reader = False
+            self._selector.unregister(device.radar.ser.fileno())
+        logger.info(f"Unregistered {name} from radar hub")
+        return device
+
+    # Process one round of readable devices, waiting up to timeout seconds
+    # Returns the number of frames decoded
+    def run_once(self, timeout=HUB_SELECT_TIMEOUT):
+        frames = 0
+        for key, _ in self._selector.select(timeout):
+            device = key.data
+            try:
+                chunk = device.radar.read_serial()
+            except Exception as e:
+                logger.warning(f"Failed to read from {device.name}, removing it from the hub: {e}")
+                self.unregister(device.name)
+                continue
+
+            for data in device.radar.process_bytes(chunk):
+                device.dispatch(data)
+                frames += 1
+
+        now = time.monotonic()
+        for device in self.devices.values():
+            device.update_rate(now)
+        return frames
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+
+    # Frames per second of each device, measured over the last HUB_RATE_WINDOW seconds
+    def frame_rates(self):
+        return {name: device.frame_rate for name, device in self.devices.items()}
+
+    def running(self):
+        return bool(self._worker_thread and self._worker_thread.is_alive())
+
+    # While the hub thread runs, commands sent to registered radars get their ACKs through the hub
+    def start(self):
+        logger.info("Radar hub started")
+        self._stop_event.clear()
+        self._worker_thread = threading.Thread(target=self.run)
+        self._worker_thread.start()
+        for device in self.devices.values():
+            device.radar.external_reader = True
+
+    def stop(self):
+        if self.running():
+            logger.info("Radar hub stopped")
+            self._stop_event.set()
+            self._worker_thread.join()
+            for device in self.devices.values():
+                device.radar.external_reader = False
+
+    def close(self):
+        self.stop()
+        self._selector.close()
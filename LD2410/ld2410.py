@@ -1,11 +1,87 @@
 from .radar import *
 from .ld2410_consts import *
+from .frame_parser import FrameParser
+from .history import FrameHistory
+from .presence import PresenceEngine
+from contextlib import ExitStack
 import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+_PACKET_CRC = bytes.fromhex(REF_PACKET_CRC)
+
+# Parameter cache keys, see Radar.flush()
+PARAM_KEY_THRESHOLDS = "thresholds" # (moving max gate, static max gate, empty timeout)
+PARAM_KEY_GATE = "gate" # ("gate", n) -> (moving sensitivity, static sensitivity)
+_PARAM_KEYS = [PARAM_KEY_THRESHOLDS] + [(PARAM_KEY_GATE, gate) for gate in range(GATE_MIN, GATE_MAX+1)]
+
+# Length, data type and head bytes, then
+# target type, moving dist, moving energy, static dist, static energy, detection dist
+_STANDARD_LAYOUT = struct.Struct('<4xBHBHBH')
+
+
+# One decoded LD2410 data frame
+#
+# move_energies and static_energies are 9 byte bytes objects (gate 0...gate 8) in
+# engineering mode, None otherwise. Frames still unpack like the old
+# (standard, move_energies, static_energies) tuple of lists:
+#   standard, move_energies, static_energies = frame
+class LD2410Frame:
+    __slots__ = ("target_type", "moving_target_dist", "moving_target_energy",
+                 "static_target_dist", "static_target_energy", "detection_dist",
+                 "move_energies", "static_energies")
+
+    def __init__(self, target_type, moving_target_dist, moving_target_energy,
+                 static_target_dist, static_target_energy, detection_dist,
+                 move_energies=None, static_energies=None):
+        self.target_type = target_type # 0 No Target, 1 Moving, 2 Static, 3 Static + Moving
+        self.moving_target_dist = moving_target_dist
+        self.moving_target_energy = moving_target_energy
+        self.static_target_dist = static_target_dist
+        self.static_target_energy = static_target_energy
+        self.detection_dist = detection_dist
+        self.move_energies = move_energies
+        self.static_energies = static_energies
+
+    @property
+    def standard(self):
+        return [self.target_type, self.moving_target_dist, self.moving_target_energy,
+                self.static_target_dist, self.static_target_energy, self.detection_dist]
+
+    # Same shape as get_radar_data() used to return
+    def as_tuple(self):
+        move_energies = None if self.move_energies is None else list(self.move_energies)
+        static_energies = None if self.static_energies is None else list(self.static_energies)
+        return self.standard, move_energies, static_energies
+
+    def __iter__(self):
+        return iter(self.as_tuple())
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
+    def __len__(self):
+        return 3
+
+    def __eq__(self, other):
+        if isinstance(other, LD2410Frame):
+            other = other.as_tuple()
+        return self.as_tuple() == tuple(other)
+
+    def __repr__(self):
+        return f"LD2410Frame{self.as_tuple()}"
 
 
 class LD2410(Radar):
-    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=logging.DEBUG) -> None:
+    model = "LD2410"
+
+    # history_size > 0 keeps the last history_size frames in radar.history (a FrameHistory)
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=None, history_size=0) -> None:
         super().__init__(port, baud_rate=baud_rate, timeout=timeout, verbosity=verbosity)
+        self.parser = FrameParser(REF_READ_HEADER, REF_READ_TAIL, skip=(CMD_HEADER, CMD_MFR))
+        if history_size:
+            self.history = FrameHistory(history_size)
 
 
     # Validate that the input is within a valid range
@@ -19,17 +95,22 @@ class LD2410(Radar):
 
 
     # Configure Detection Gates and Detect Duration
+    # Writes nothing if the module is known to have these values already, see Radar.flush()
     def edit_detection_params(self, moving_max_gate, static_max_gate, timeout):
-        logging.info("Editing detection parameters")
-        self.validate_range(moving_max_gate, GATE_MIN, GATE_MAX+1)
-        self.validate_range(static_max_gate, GATE_MIN, GATE_MAX+1)
-        self.validate_range(timeout, TIMEOUT_MIN, TIMEOUT_MAX+1)
-
-        command = CMD_PARAM_EDIT + PARAM_MAX_MOVING_GATE + self.int_to_4b(moving_max_gate) \
-                      + PARAM_MAX_STATIC_GATE + self.int_to_4b(static_max_gate) \
-                      + PARAM_EMPTY_DURATION + self.int_to_4b(timeout)
-        
-        self.send_command(command)
+        logger.info("Editing detection parameters")
+        self.detection_params_command(moving_max_gate, static_max_gate, timeout) # Validates the values
+        self.params.set(PARAM_KEY_THRESHOLDS, (moving_max_gate, static_max_gate, timeout))
+        self.changed_params()
+
+    @classmethod
+    def detection_params_command(cls, moving_max_gate, static_max_gate, timeout):
+        cls.validate_range(moving_max_gate, GATE_MIN, GATE_MAX+1)
+        cls.validate_range(static_max_gate, GATE_MIN, GATE_MAX+1)
+        cls.validate_range(timeout, TIMEOUT_MIN, TIMEOUT_MAX+1)
+
+        return DETECTION_PARAMS.encode(PARAM_WORD_MAX_MOVING_GATE, moving_max_gate,
+                                       PARAM_WORD_MAX_STATIC_GATE, static_max_gate,
+                                       PARAM_WORD_EMPTY_DURATION, timeout)
 
     # Read the currently configured parameters 
     #
@@ -38,140 +119,232 @@ class LD2410(Radar):
     # first array: [moving gate threshold, static gate threshold, empty timeout]
     # second array: [moving gate sens 0.... moving gate sens 8]
     # third array: [static gate sens 0.... static gate sens 8]
-
-    def read_detection_params(self):
+    #
+    # Served from the parameter cache when it is complete and clean, refresh=True
+    # always asks the module (e.g. after it was configured over Bluetooth)
+    def read_detection_params(self, refresh=False):
+        if not refresh and self.params.complete(_PARAM_KEYS):
+            return self.cached_detection_params()
         # Send command to retrieve parameters
-        logging.info("Reading detection parameters")
-        ret = self.send_command(CMD_PARAM_READ)
-        
+        logger.info("Reading detection parameters")
+        ret = self.send_command(FRAME_PARAM_READ)
+        params = self.parse_detection_params(ret)
+        self.cache_detection_params(params)
+        return params
+
+    # read_detection_params() format from the parameter cache
+    def cached_detection_params(self):
+        gates = [self.params.get((PARAM_KEY_GATE, gate)) for gate in range(GATE_MIN, GATE_MAX+1)]
+        return list(self.params.get(PARAM_KEY_THRESHOLDS)), [g[0] for g in gates], [g[1] for g in gates]
+
+    # Store parameters read from the module
+    def cache_detection_params(self, params):
+        thresholds, move_sens, static_sens = params
+        values = {PARAM_KEY_THRESHOLDS: tuple(thresholds)}
+        for gate in range(GATE_MIN, GATE_MAX+1):
+            values[(PARAM_KEY_GATE, gate)] = (move_sens[gate], static_sens[gate])
+        self.params.load(values)
+
+    @staticmethod
+    def parse_detection_params(ret):
         # Process response
         # Threshold Params
-        thresholds = [ret[REF_MAX_MOVING_GATE], ret[REF_MAX_STATIC_GATE], ret[REF_EMPTY_TIMEOUT]]
+        empty_timeout = ret[REF_EMPTY_TIMEOUT] | ret[REF_EMPTY_TIMEOUT+1] << 8
+        thresholds = [ret[REF_MAX_MOVING_GATE], ret[REF_MAX_STATIC_GATE], empty_timeout]
 
 
         # Movement Gate Sensitivities
-        move_sens = [int(byte) for byte in ret[REF_MOVING_GATE_SENS_0:REF_MOVING_GATE_SENS_8]]
+        move_sens = [int(byte) for byte in ret[REF_MOVING_GATE_SENS_0:REF_MOVING_GATE_SENS_8+1]]
         # Static Gate Sensitivities
-        static_sens = [int(byte) for byte in ret[REF_STATIC_GATE_SENS_0:REF_STATIC_GATE_SENS_8]]
+        static_sens = [int(byte) for byte in ret[REF_STATIC_GATE_SENS_0:REF_STATIC_GATE_SENS_8+1]]
         
-        logging.debug(f"Thresholds:{thresholds}, Movement Sens:{move_sens}, Static Sens:{static_sens}")
+        logger.debug(f"Thresholds:{thresholds}, Movement Sens:{move_sens}, Static Sens:{static_sens}")
         return thresholds, move_sens, static_sens
         
     # Enable Engineering Mode
     # Adds energy level of each gate to the radar output
     def enable_engineering_mode(self):
-        logging.info("Enabling engineering mode")
+        logger.info("Enabling engineering mode")
         self.eng_mode = True
-        self.send_command(CMD_ENG_MODE_ENABLE)
+        self.send_command(FRAME_ENG_MODE_ENABLE)
         
     # Disable Engineering Mode
     def disable_engineering_mode(self):
-        logging.info("Disabling engineering mode")
+        logger.info("Disabling engineering mode")
         self.eng_mode = False
-        self.send_command(CMD_ENG_MODE_DISABLE)
+        self.send_command(FRAME_ENG_MODE_DISABLE)
 
     # Configure Gate Movement and Static Sensitivities
+    # Pass gate=GATE_ALL to set every gate at once. Only gates whose values change are written
     def edit_gate_sensitivity(self, gate, moving_sens, static_sens):
-        logging.info("Editing gate sensitivity")
-        self.validate_range(gate, GATE_MIN, GATE_MAX+1)
-        self.validate_range(moving_sens, SENS_MIN, SENS_MAX+1)
+        logger.info("Editing gate sensitivity")
+        self.gate_sensitivity_command(gate, moving_sens, static_sens) # Validates the values
+        gates = range(GATE_MIN, GATE_MAX+1) if gate == GATE_ALL else [gate]
+        for g in gates:
+            self.params.set((PARAM_KEY_GATE, g), (moving_sens, static_sens))
+        self.changed_params()
 
-        if gate == 1 or gate == 2:
-            logging.warning("You cannot set gate 1 or 2 static sensitivity to anything other than 0")
-            self.validate_range(static_sens, 0, 1)
+    # Commands writing dirty parameter cache entries, see Radar.flush()
+    # Raises for invalid values, so it also checks entries before they are set
+    # When several gates change and every gate ends up with the same values, a single
+    # all-gates command is sent instead
+    def param_commands(self, entries):
+        commands = []
+        if PARAM_KEY_THRESHOLDS in entries:
+            commands.append(self.detection_params_command(*entries[PARAM_KEY_THRESHOLDS]))
+        gates = {key[1]: value for key, value in entries.items() if key != PARAM_KEY_THRESHOLDS}
+        target = set(entries.get((PARAM_KEY_GATE, gate), self.params.get((PARAM_KEY_GATE, gate)))
+                     for gate in range(GATE_MIN, GATE_MAX+1))
+        if len(gates) > 1 and len(target) == 1 and None not in target:
+            commands.append(self.gate_sensitivity_command(GATE_ALL, *gates.popitem()[1]))
         else:
-            self.validate_range(static_sens, SENS_MIN, SENS_MAX+1)
+            for gate in sorted(gates):
+                commands.append(self.gate_sensitivity_command(gate, *gates[gate]))
+        return commands
 
-        command = CMD_GATE_SENS_EDIT + PARAM_GATE_SELECT + self.int_to_4b(gate) \
-                      + PARAM_MOVING_GATE_WORD + self.int_to_4b(moving_sens) \
-                      + PARAM_STATIC_GATE_WORD + self.int_to_4b(static_sens)
-        
-        self.send_command(command)
-
-    # Get Radar Frame
-    def get_data_frame(self):
-        # Keep cycling the buffer until frame starts
-        buffer = Queue(max_size=4)
-        while buffer.byte_str() != bytes.fromhex(REF_READ_HEADER):
-            try:
-                b = self.ser.read()
-            except:
-                self.read_fail_count += 1
-                logging.debug("Serial failed to read data. Trying again")
-                self.read_fail_count += 1
-                if self.read_fail_count > 32:
-                    logging.warning("Serial failed to read data many times in a row. Please check if the baud rate is correct. Hint: Check the firmware version, if it looks weird, it's probably wrong")
-                b = b""
-            buffer.add(b)
-        
-        # Different packet lengths depending on whether engineering mode is on
-        if self.eng_mode:
-            read_len = REF_ENG_MODE_PACKET_LEN
+    @classmethod
+    def gate_sensitivity_command(cls, gate, moving_sens, static_sens):
+        if gate != GATE_ALL:
+            cls.validate_range(gate, GATE_MIN, GATE_MAX+1)
+        cls.validate_range(moving_sens, SENS_MIN, SENS_MAX+1)
+
+        if gate in STATIC_FIXED_GATES:
+            logger.warning("You cannot set gate 0 or 1 static sensitivity to anything other than 0")
+            cls.validate_range(static_sens, 0, 1)
         else:
-            read_len = REF_NORMAL_PACKET_LEN
+            cls.validate_range(static_sens, SENS_MIN, SENS_MAX+1)
 
-        try:
-            ret_candidate = self.ser.read(read_len)
-        except:
-            
-            logging.debug("Serial failed to read data. Skipping this read")
-            return None
+        return GATE_SENSITIVITY.encode(PARAM_WORD_GATE, gate,
+                                       PARAM_WORD_MOVING, moving_sens,
+                                       PARAM_WORD_STATIC, static_sens)
 
-        logging.debug(f"get_data_frame() returning {ret_candidate.hex(' ')}")
+    # Push a whole tuning profile in one config session
+    #
+    # Example profile, every key is optional but the first three go together:
+    #   {"moving_max_gate": 8, "static_max_gate": 8, "timeout": 5,
+    #    "moving_sens": 40,  # or one value per gate
+    #    "static_sens": [0, 0, 40, 40, 30, 30, 20, 20, 20]}
+    #
+    # Only settings that differ from the module's current ones are written: the module
+    # enters config mode once, those writes go out in a single batch (using the
+    # all-gates shortcut when every gate changes to the same values) and, with
+    # verify=True, one read_detection_params() checks the result. Re-applying a profile
+    # the module already has writes nothing. Returns the read back parameters.
+    def apply_config(self, profile, verify=True):
+        logger.info("Applying config profile")
+        self.check_profile(profile)
+        thresholds = None
+        if "moving_max_gate" in profile:
+            thresholds = [profile["moving_max_gate"], profile["static_max_gate"], profile["timeout"]]
+        move_sens = self.expand_gates(profile.get("moving_sens"))
+        static_sens = self.expand_gates(profile.get("static_sens"))
 
-        # Catch engineering mode not set error
-        if ret_candidate[REF_ENG_CHECK_IDX] == REF_ENG_CHECK and self.eng_mode == False: # Engineering mode is on, but not set in driver
-            logging.warning("Data seems to be in engineering mode format. However, driver isn't set to use parse engineering mode. Setting it now")
-            self.eng_mode = True
-        elif ret_candidate[REF_PACKET_CRC_IDX:] != bytes.fromhex(REF_PACKET_CRC):
-            logging.warning(f'Checksum not correct received this packet {ret_candidate.hex(" ")}')
-            # raise Exception("Checksum of received data is wrong. Data may be corrupted")
+        values = {}
+        if thresholds is not None:
+            values[PARAM_KEY_THRESHOLDS] = tuple(thresholds)
+        if move_sens is not None:
+            for gate in range(GATE_MIN, GATE_MAX+1):
+                values[(PARAM_KEY_GATE, gate)] = (move_sens[gate], static_sens[gate])
 
-        if ret_candidate:
-            self.read_fail_count = 0
-        
-        return ret_candidate
+        # Config mode is only entered if the module has to be read or written
+        with ExitStack() as session:
+            if not self.params.complete(_PARAM_KEYS):
+                # Know what the module has, so unchanged settings can be skipped
+                session.enter_context(self.config_session())
+                self.read_detection_params()
+            # Only the settings that change are written, so only those are validated. A
+            # profile read back from the module can always be applied again
+            self.param_commands({key: value for key, value in values.items() if self.params.get(key) != value})
+            for key, value in values.items():
+                self.params.set(key, value)
+            written = False
+            if self.params.dirty:
+                session.enter_context(self.config_session())
+                written = bool(self.flush())
+            if not verify:
+                return None
+            read_back = self.read_detection_params(refresh=written)
 
+        expected = (thresholds, move_sens, static_sens)
+        for name, want, got in zip(("thresholds", "moving_sens", "static_sens"), expected, read_back):
+            if want is not None and list(want) != got:
+                raise Exception(f"Config verification failed, {name} is {got} instead of {want}")
+        return read_back
 
-    # Sets 3 lists (standard, move_energies, static_energies). If engineering mode is disabled, second and third list is empty
-    def get_radar_data(self):
-        logging.debug("Getting raw dataframe")
+    # Raise if a profile has unknown keys or only part of a group of settings
+    @staticmethod
+    def check_profile(profile):
+        if not isinstance(profile, dict):
+            raise Exception(f"A profile is a dict of settings, got {type(profile).__name__}")
+        unknown = sorted(set(profile) - set(PROFILE_THRESHOLD_KEYS) - set(PROFILE_SENS_KEYS))
+        if unknown:
+            raise Exception(f"Unknown profile settings {unknown}, "
+                            f"valid ones are {list(PROFILE_THRESHOLD_KEYS + PROFILE_SENS_KEYS)}")
+        for group in (PROFILE_THRESHOLD_KEYS, PROFILE_SENS_KEYS):
+            missing = [key for key in group if key not in profile]
+            if len(missing) not in (0, len(group)):
+                raise Exception(f"Profile settings {list(group)} have to be set together, {missing} missing")
 
-        # Keep trying until a successful read
-        ret = self.get_data_frame()
-        while not ret:
-            ret = self.get_data_frame()
+    # A single sensitivity applies to every gate
+    @staticmethod
+    def expand_gates(sens):
+        if sens is None:
+            return None
+        if isinstance(sens, int):
+            return [sens] * (GATE_MAX+1)
+        if len(sens) != GATE_MAX+1:
+            raise Exception(f"Expected {GATE_MAX+1} gate sensitivities, got {len(sens)}")
+        return list(sens)
 
-        move_energies = None
-        static_energies = None
-        
-        target_type = ret[REF_TARGET_TYPE] # 0 No Target, 1 Moving, 2 Static, 3 Static + Moving
-        
-        moving_target_dist = int(bytes(reversed(ret[REF_TARGET_MOVE_DIST_HEAD:REF_TARGET_MOVE_DIST_TAIL+1])).hex(), 16)
-        moving_target_energy = ret[REF_TARGET_MOVE_ENERGY]
-        
-        static_target_dist = int(bytes(reversed(ret[REF_TARGET_STATIC_DIST_HEAD:REF_TARGET_STATIC_DIST_TAIL+1])).hex(), 16)
-        static_target_energy = ret[REF_TARGET_STATIC_ENERGY]
+    # Track presence on every frame from here on, with the gate thresholds and hold time
+    # seeded from the module's detection parameters. Engineering mode gives per-gate
+    # decisions, in normal mode the module's target type is used.
+    # Extra arguments (zones, hysteresis, smoothing, hold_time) go to PresenceEngine
+    #
+    #   radar.enable_presence(callback=print, zones={"desk": range(0, 3), "door": range(3, 9)})
+    def enable_presence(self, callback=None, **kwargs):
+        self.presence = PresenceEngine.from_detection_params(self.read_detection_params(), callback=callback, **kwargs)
+        return self.presence
 
-        detection_dist = ret[REF_DETECT_DIST]
+    def disable_presence(self):
+        self.presence = None
 
-        standard_frame = [target_type, moving_target_dist, moving_target_energy, static_target_dist, static_target_energy, detection_dist]
-        
-        logging.debug(f"Returning dataframes {standard_frame}, {move_energies}, {static_energies}")
+    # Changed when the target type changes or a distance moves by more than threshold cm
+    @staticmethod
+    def frame_changed(previous, data, threshold):
+        return (previous.target_type != data.target_type
+                or abs(previous.moving_target_dist - data.moving_target_dist) > threshold
+                or abs(previous.static_target_dist - data.static_target_dist) > threshold
+                or abs(previous.detection_dist - data.detection_dist) > threshold)
 
-        if self.eng_mode:
-            # Movement Gate Sensitivities
-            move_energies = [int(byte) for byte in ret[REF_MOVING_GATE_ENERGY_0:REF_MOVING_GATE_ENERGY_8+1]]
-            # Static Gate Sensitivities
-            static_energies = [int(byte) for byte in ret[REF_STATIC_GATE_ENERGY_0:REF_STATIC_GATE_ENERGY_8+1]]
+    # Check a data frame body
+    def check_frame(self, ret_candidate):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"get_data_frame() returning {ret_candidate.hex(' ')}")
 
-        return standard_frame, move_energies, static_energies
+        # Catch engineering mode not set error
+        if ret_candidate[REF_ENG_CHECK_IDX] == REF_ENG_CHECK and self.eng_mode == False: # Engineering mode is on, but not set in driver
+            logger.warning("Data seems to be in engineering mode format. However, driver isn't set to use parse engineering mode. Setting it now")
+            self.eng_mode = True
+        elif ret_candidate[REF_PACKET_CRC_IDX:] != _PACKET_CRC:
+            logger.warning(f'Checksum not correct received this packet {ret_candidate.hex(" ")}')
+            if self.metrics is not None:
+                self.metrics.crc_failures += 1
+            # raise Exception("Checksum of received data is wrong. Data may be corrupted")
+
+        return ret_candidate
+
+
+    # Decodes a frame into an LD2410Frame
+    @staticmethod
+    def decode_frame(ret):
+        frame = LD2410Frame(*_STANDARD_LAYOUT.unpack_from(ret))
 
-    def get_data(self):
-        raise Exception("Not implemented!")
-    
-    def poll_radar(self):
-        raise Exception("Not implemented!")
+        # Engineering frames are longer and say so in their length field
+        if ret[REF_ENG_CHECK_IDX] == REF_ENG_CHECK:
+            frame.move_energies = ret[REF_MOVING_GATE_ENERGY_0:REF_MOVING_GATE_ENERGY_8+1]
+            frame.static_energies = ret[REF_STATIC_GATE_ENERGY_0:REF_STATIC_GATE_ENERGY_8+1]
 
-    def start(self):
-        raise Exception("Not implemented!")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Returning dataframe {frame}")
+        return frame
@@ -10,14 +10,25 @@ PARAM_MOVING_GATE_WORD = "0100"
 PARAM_STATIC_GATE_WORD = "0200"
 # Special case
 PARAM_SELECT_ALL_GATE = "FFFF"
+# The same parameter words as numbers, for the binary encoder (commands.py)
+PARAM_WORD_MAX_MOVING_GATE = 0
+PARAM_WORD_MAX_STATIC_GATE = 1
+PARAM_WORD_EMPTY_DURATION = 2
+PARAM_WORD_GATE = 0
+PARAM_WORD_MOVING = 1
+PARAM_WORD_STATIC = 2
 
 # Validation Constants
 GATE_MIN = 0
 GATE_MAX = 8
+GATE_ALL = 0xFFFF # PARAM_SELECT_ALL_GATE as a gate number
 TIMEOUT_MIN = 0
 TIMEOUT_MAX = 65535
 SENS_MIN = 0
 SENS_MAX = 100
+STATIC_FIXED_GATES = (0, 1) # The firmware keeps the static sensitivity of these gates at 0
+PROFILE_THRESHOLD_KEYS = ("moving_max_gate", "static_max_gate", "timeout") # apply_config() keys set together
+PROFILE_SENS_KEYS = ("moving_sens", "static_sens")
 
 # Read Parameter Indices
 REF_MAX_MOVING_GATE = 12
@@ -57,13 +68,28 @@ REF_TARGET_MOVE_ENERGY = 7
 REF_TARGET_STATIC_DIST_HEAD = 8
 REF_TARGET_STATIC_DIST_TAIL = 9
 REF_TARGET_STATIC_ENERGY = 10
-REF_DETECT_DIST = 11
+REF_DETECT_DIST = 11 # 2 bytes
+
+REF_MAX_MOVING_GATE_N = 13
+REF_MAX_STATIC_GATE_N = 14
 
 # Cut out 1-7 for brevity
-REF_MOVING_GATE_ENERGY_0 = 14
+REF_MOVING_GATE_ENERGY_0 = 15
 REF_MOVING_GATE_ENERGY_8 = 23
 
 REF_STATIC_GATE_ENERGY_0 = 24
-REF_STATIC_GATE_ENERGY_8 = 33
+REF_STATIC_GATE_ENERGY_8 = 32
 
 REF_RADAR_POLING_RATE = 10 # Radar updates at 10Hz
+
+# Presence Constants
+GATE_RESOLUTION = 75 # cm covered by each gate
+PRESENCE_SMOOTHING = 0.3 # EMA weight of the newest gate energy
+PRESENCE_HYSTERESIS = 5 # Energy a smoothed gate must fall below its threshold to go inactive
+PRESENCE_HOLD_TIME = 5 # Seconds without active gates before presence is left
+PRESENCE_ENTER = "enter"
+PRESENCE_LEAVE = "leave"
+PRESENCE_ZONE_CHANGE = "zone_change"
+
+# Aggregation constants
+AGGREGATE_DISTANCE_THRESHOLD = 30 # cm the nearest target has to move to count as a change
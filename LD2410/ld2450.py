@@ -2,111 +2,282 @@ from sys import byteorder
 from .radar import *
 from .radar_consts import *
 from .ld2450_consts import *
-from math import sqrt
+from .frame_parser import FrameParser
+from .tracker import TargetTracker
+from array import array
+from math import atan2, degrees, sqrt
+import struct
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional and slow to import, so it is only looked for by the first batch decode
+numpy = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_checked = True
+    return numpy
+
+_TARGET_LAYOUT = struct.Struct('<4H')
+_REGION_FILTER_LAYOUT = struct.Struct('<H12h') # Filter type, then x1, y1, x2, y2 of 3 regions
+
+# Parameter cache keys, see Radar.flush()
+PARAM_KEY_TRACKING = "tracking" # TRACKING_SINGLE or TRACKING_MULTI
+PARAM_KEY_REGION_FILTER = "region_filter" # Filter type and 3 regions as sent on the wire (26 bytes)
+
+
+# Rectangle given by two diagonal corners, in mm
+class Region:
+    __slots__ = ("x1", "y1", "x2", "y2")
+
+    def __init__(self, x1, y1, x2, y2):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+
+    # Unused region slots are all zero
+    def is_empty(self):
+        return not (self.x1 or self.y1 or self.x2 or self.y2)
+
+    def contains(self, x, y):
+        return min(self.x1, self.x2) <= x <= max(self.x1, self.x2) and min(self.y1, self.y2) <= y <= max(self.y1, self.y2)
+
+    # Same shape set_region_filter() takes: [(x1, y1), (x2, y2)]
+    def as_config(self):
+        return [(self.x1, self.y1), (self.x2, self.y2)]
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and self.as_config() == other.as_config()
+
+    def __repr__(self):
+        return f"Region({self.x1}, {self.y1}, {self.x2}, {self.y2})"
+
+
+# Decoded region filter: filter_type (PARAM_FILTER_*) and the configured (non-empty) regions
+class RegionFilter:
+    __slots__ = ("filter_type", "regions")
+
+    def __init__(self, filter_type, regions):
+        self.filter_type = filter_type
+        self.regions = regions
+
+    # Region filter from the 26 data bytes of a read ACK or write command
+    @classmethod
+    def from_bytes(cls, data):
+        values = _REGION_FILTER_LAYOUT.unpack_from(data)
+        regions = [Region(*values[1 + 4 * i:5 + 4 * i]) for i in range(REGION_COUNT)]
+        return cls(values[0], [region for region in regions if not region.is_empty()])
+
+    # Arguments for set_region_filter(): config, filter_type
+    def as_config(self):
+        return [region.as_config() for region in self.regions], self.filter_type
+
+    def __eq__(self, other):
+        return isinstance(other, RegionFilter) and self.filter_type == other.filter_type and self.regions == other.regions
+
+    def __repr__(self):
+        return f"RegionFilter({self.filter_type}, {self.regions})"
+
+
+# x, y and speed are sent as sign-magnitude: bit 15 set means positive, clear means negative
+def sign_magnitude(raw):
+    return raw - 0x8000 if raw & 0x8000 else -raw
+
+
+# Batch decode LD2450 target blocks, e.g. from a recording or a hub buffer
+#
+# data is a bytes-like object holding N frame bodies of 24 bytes (3 targets each) back
+# to back, or a list of such bodies. Returns a dict with the keys x, y, speed, resolution,
+# distance, angle and valid. Every value holds N*3 entries in frame order (shaped (N, 3)
+# when NumPy is used). Empty target slots are NaN and False in valid.
+# angle is in degrees, 0 straight ahead of the sensor and positive towards +x.
+def decode_targets(data, use_numpy=None):
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = b"".join(data)
+    if len(data) % REF_DATA_PAYLOAD_LEN:
+        raise Exception(f"Target data must be a multiple of {REF_DATA_PAYLOAD_LEN} bytes, got {len(data)}")
+
+    if use_numpy is None:
+        use_numpy = _load_numpy() is not None
+    elif use_numpy:
+        _load_numpy()
+    if use_numpy:
+        return _decode_targets_numpy(data)
+    return _decode_targets_struct(data)
+
+
+def _decode_targets_numpy(data):
+    raw = numpy.frombuffer(data, dtype='<u2').reshape(-1, 3, 4)
+    valid = raw.any(axis=2)
+    magnitude = (raw[..., :3] & 0x7FFF).astype(numpy.float64)
+    signed = numpy.where(raw[..., :3] & 0x8000, magnitude, -magnitude)
+    signed[~valid] = numpy.nan
+
+    x, y, speed = signed[..., 0], signed[..., 1], signed[..., 2]
+    resolution = numpy.where(valid, raw[..., 3], numpy.nan)
+    return {"x": x, "y": y, "speed": speed, "resolution": resolution,
+            "distance": numpy.hypot(x, y), "angle": numpy.degrees(numpy.arctan2(x, y)),
+            "valid": valid}
+
+
+def _decode_targets_struct(data):
+    nan = float("nan")
+    keys = ("x", "y", "speed", "resolution", "distance", "angle")
+    columns = {key: array('d') for key in keys}
+    appends = [columns[key].append for key in keys]
+    valid = array('b')
+
+    for raw_x, raw_y, raw_speed, resolution in _TARGET_LAYOUT.iter_unpack(data):
+        if raw_x or raw_y or raw_speed or resolution:
+            x = sign_magnitude(raw_x)
+            y = sign_magnitude(raw_y)
+            values = (x, y, sign_magnitude(raw_speed), resolution, sqrt(x*x + y*y), degrees(atan2(x, y)))
+            valid.append(True)
+        else:
+            values = (nan,) * len(keys)
+            valid.append(False)
+        for append, value in zip(appends, values):
+            append(value)
+
+    columns["valid"] = valid
+    return columns
+
 
 class LD2450(Radar):
-    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=logging.DEBUG) -> None:
+    model = "LD2450"
+
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=None) -> None:
         super().__init__(port, baud_rate=baud_rate, timeout=timeout, verbosity=verbosity)
+        self.parser = FrameParser(REF_DATA_HEADER, REF_DATA_CRC, payload_len=REF_DATA_PAYLOAD_LEN, skip=(CMD_HEADER, CMD_MFR))
 
 
 
-    def calc_distance(self, target_data):
-        x = int.from_bytes(target_data[0:2], byteorder='little', signed=True)
-        y = int.from_bytes(target_data[2:4], byteorder='little', signed=True)
-        speed = int.from_bytes(target_data[4:6], byteorder='little', signed=False)
-        distance_resolution = int.from_bytes(target_data[6:8], byteorder='little', signed=False)
+    # Decode one 8 byte target block into (x, y, speed, distance resolution, distance)
+    @staticmethod
+    def calc_distance(target_data):
+        raw_x, raw_y, raw_speed, distance_resolution = _TARGET_LAYOUT.unpack(target_data)
 
-        x = x if x >=0 else -2**15 - x
-        y = y if y >=0 else -2**15 - y
-        speed = speed if speed >= 0 else -2**15 - speed
+        x = sign_magnitude(raw_x)
+        y = sign_magnitude(raw_y)
+        speed = sign_magnitude(raw_speed)
         distance = sqrt(x*x + y*y)
         return x, y, speed, distance_resolution, distance
 
     # Enable single target tracking
+    # Setters return the ACK, or None if the module already had the setting (see Radar.flush())
     def set_single_target_tracking(self):
-        logging.info("Reading detection parameters")
-        ret = self.send_command(PARAM_SINGLE_TARGET_TRACKING)
-
-        return ret
+        logger.info("Enabling single target tracking")
+        self.params.set(PARAM_KEY_TRACKING, TRACKING_SINGLE)
+        return self.changed_params()
 
 
     # Enable multi target tracking
     def set_multi_target_tracking(self):
-        logging.info("Reading detection parameters")
-        ret = self.send_command(PARAM_MULTI_TARGET_TRACKING)
+        logger.info("Enabling multi target tracking")
+        self.params.set(PARAM_KEY_TRACKING, TRACKING_MULTI)
+        return self.changed_params()
+
+    # Current tracking mode, TRACKING_SINGLE or TRACKING_MULTI
+    # Reads are served from the parameter cache unless refresh=True
+    def read_tracking_mode(self, refresh=False):
+        if not refresh and self.params.complete([PARAM_KEY_TRACKING]):
+            return self.params.get(PARAM_KEY_TRACKING)
+        logger.info("Reading tracking mode")
+        mode = self.parse_tracking_mode(self.send_command(FRAME_TRACKING_QUERY))
+        self.params.load({PARAM_KEY_TRACKING: mode})
+        return mode
+
+    @staticmethod
+    def parse_tracking_mode(ret):
+        return ret[REF_TRACKING_MODE_IDX] | ret[REF_TRACKING_MODE_IDX+1] << 8
 
-        return ret
 
+    # Get the current region filter as a RegionFilter
+    def read_region_filter(self, refresh=False):
+        if not refresh and self.params.complete([PARAM_KEY_REGION_FILTER]):
+            return RegionFilter.from_bytes(self.params.get(PARAM_KEY_REGION_FILTER))
+        logger.info("Reading region filter")
+        ret = self.send_command(FRAME_READ_REGION_FILTER)
+        self.params.load({PARAM_KEY_REGION_FILTER: bytes(ret[REF_REGION_DATA_HEAD:REF_REGION_DATA_TAIL])})
 
-    # Get the current region filter
-    def read_region_filter(self):
-        logging.info("Reading detection parameters")
-        ret = self.send_command(READ_REGION_FILTER)
+        return self.parse_region_filter(ret)
 
-        return ret
+    @staticmethod
+    def parse_region_filter(ret):
+        return RegionFilter.from_bytes(ret[REF_REGION_DATA_HEAD:REF_REGION_DATA_TAIL])
 
     # Set the regional filter
     # Exclude targets in rectangular area delimited by two diaognal vertex coordinates
     # Example: [[(-100,100),(100,100)], [(100,100),(200,200)]]
     def set_region_filter(self, config:list, filter_type:int):
-        logging.info("Setting regional filter with the following config: %s and mode %d" % (str(config), filter_type))
-        command = WRITE_REGION_FILTER
-        command += REGION_FILTER_TYPE_LOOKUP[filter_type] 
-
-        for p1, p2 in config:
-            for x, y in p1, p2:
-                command += x.to_bytes(2, byteorder='little', signed=True).hex()
-                command += y.to_bytes(2, byteorder='little', signed=True).hex()
-
-        if len(command) < REGION_MSG_LENGTH:
-            command += (REGION_MSG_LENGTH - len(command))*'0'
-        ret = self.send_command(command)
-
-        return ret
-
-    def get_data_frame(self):
-        try:
-            b = self.ser.read_until(b'\x55\xCC')
-            b = b.split(b'\xAA\xFF\x03\x00')[1].split(b'\x55\xCC')[0]
-            target1 = b[REF_MIN_TARGET1:REF_MAX_TARGET1]
-            target2 = b[REF_MIN_TARGET2:REF_MAX_TARGET2]
-            target3 = b[REF_MIN_TARGET3:REF_MAX_TARGET3]
-        except Exception as e:
-            logging.error("THRWING EXCEPTION!!!!")
-            logging.error(str(e))
-            return
-        return (target1, target2, target3)
+        logger.info("Setting regional filter with the following config: %s and mode %d" % (str(config), filter_type))
+        self.params.set(PARAM_KEY_REGION_FILTER, self.region_filter_value(config, filter_type))
+        return self.changed_params()
 
+    # Commands writing dirty parameter cache entries, see Radar.flush()
+    def param_commands(self, entries):
+        commands = []
+        if PARAM_KEY_TRACKING in entries:
+            commands.append(TRACKING_FRAMES[entries[PARAM_KEY_TRACKING]])
+        if PARAM_KEY_REGION_FILTER in entries:
+            commands.append(REGION_FILTER_WRITE.wrap(entries[PARAM_KEY_REGION_FILTER]))
+        return commands
 
-    def get_data(self):
-        logging.debug(f"get_data returning {self.last_detection}")
-        with self._lock:
-            if not self.last_detection:
-                logging.warning("Data is empty, have you started the radar yet?")
-            return self.last_detection
+    @classmethod
+    def region_filter_command(cls, config:list, filter_type:int):
+        return REGION_FILTER_WRITE.wrap(cls.region_filter_value(config, filter_type))
 
+    # Filter type and the corners of all 3 regions, unused regions zeroed, as the module stores them
+    @staticmethod
+    def region_filter_value(config:list, filter_type:int):
+        if len(config) > REGION_COUNT:
+            raise Exception(f"At most {REGION_COUNT} regions can be set, got {len(config)}")
+        if filter_type not in REGION_FILTER_TYPE_LOOKUP:
+            raise Exception(f"Unknown filter type {filter_type}, pick one of {list(REGION_FILTER_TYPE_LOOKUP)}")
+        coords = [c for p1, p2 in config for point in (p1, p2) for c in point]
+        coords += [0] * (4 * REGION_COUNT - len(coords))
+        return _REGION_FILTER_LAYOUT.pack(filter_type, *coords)
 
-    def get_radar_data(self):
-        logging.debug("Getting raw dataframe")
+    # Give targets persistent IDs and smoothed positions on every frame from here on.
+    # Zones default to the regions of the module's region filter, pass zones={name: Region}
+    # to use others. Extra arguments (gate, min_hits, max_misses, noise) go to TargetTracker
+    #
+    #   radar.enable_tracking(callback=print)
+    #   radar.tracker.confirmed() -> [Track(1, x=..., y=..., vx=..., vy=...)]
+    def enable_tracking(self, callback=None, zones=None, **kwargs):
+        if zones is None:
+            zones = self.read_region_filter()
+        self.tracker = TargetTracker(zones=zones, callback=callback, **kwargs)
+        return self.tracker
 
-        # target1, target2, target3 = self.get_data_frame()
-        ret = self.get_data_frame()
-        while not ret:
-            logging.debug("Retry get_data_frame")
-            ret = self.get_data_frame()
+    def disable_tracking(self):
+        self.tracker = None
 
-        logging.debug(f"Returning dataframes")
-        ret2 = []
-        for i in range(len(ret)):
-            ret2.append(self.calc_distance(ret[i]))
-        return ret2
+    # Changed when a target appears or disappears or its distance moves by more than threshold mm
+    @staticmethod
+    def frame_changed(previous, data, threshold):
+        for old, new in zip(previous, data):
+            if (old[4] == 0) != (new[4] == 0) or abs(old[4] - new[4]) > threshold:
+                return True
+        return False
 
+    # Split a data frame body into its 3 target blocks
+    def check_frame(self, b):
+        target1 = b[REF_MIN_TARGET1:REF_MAX_TARGET1]
+        target2 = b[REF_MIN_TARGET2:REF_MAX_TARGET2]
+        target3 = b[REF_MIN_TARGET3:REF_MAX_TARGET3]
+        return (target1, target2, target3)
 
 
-    def poll_radar(self):
-        while not self._stop_event.is_set():
-            with self._lock:
-                self.last_detection = self.get_radar_data()
-            time.sleep(0.1)
-
-
+    # Decode the 3 target blocks of a frame
+    @classmethod
+    def decode_frame(cls, ret):
+        return [cls.calc_distance(target) for target in ret]
@@ -1,12 +1,26 @@
+REF_DATA_HEADER = "AAFF0300"
 REF_DATA_CRC = "55CC"
+REF_DATA_PAYLOAD_LEN = 24 # 3 targets of 8 bytes
 
-PARAM_SINGLE_TARGET_TRACKING = "0080"
-PARAM_MULTI_TARGET_TRACKING = "0090"
+PARAM_SINGLE_TARGET_TRACKING = "02008000"
+PARAM_MULTI_TARGET_TRACKING = "02009000"
+TRACKING_QUERY = "02009100"
+TRACKING_SINGLE = 1 # Tracking modes as reported by TRACKING_QUERY
+TRACKING_MULTI = 2
+REF_TRACKING_MODE_IDX = 10
+WORD_SINGLE_TARGET_TRACKING = 0x0080
+WORD_MULTI_TARGET_TRACKING = 0x0090
+WORD_TRACKING_QUERY = 0x0091
 
 # Region messages
 READ_REGION_FILTER = "0200C100"
 WRITE_REGION_FILTER = "1C00C200"
+WORD_READ_REGION_FILTER = 0x00C1
+WORD_WRITE_REGION_FILTER = 0x00C2
 REGION_FILTER_TYPE = 0
+REF_REGION_DATA_HEAD = 10 # Filter type + 3 regions in the read ACK
+REF_REGION_DATA_TAIL = 36
+REGION_COUNT = 3
 
 # Read Parameter Indices
 REF_MIN_TARGET1 = 0
@@ -29,3 +43,17 @@ REGION_FILTER_TYPE_LOOKUP = {
 
 # Validation constants
 REGION_MSG_LENGTH = 60
+
+# Tracker constants
+TRACK_GATE = 600 # mm a detection may be from a track's predicted position to be associated with it
+TRACK_MIN_HITS = 2 # Detections before a track is confirmed and reported
+TRACK_MAX_MISSES = 5 # Frames a track survives without a detection
+TRACK_MEASUREMENT_NOISE = 100 ** 2 # Variance of reported positions, mm^2
+TRACK_PROCESS_NOISE = 1000 ** 2 # Variance of target acceleration, (mm/s^2)^2
+TRACK_INITIAL_VELOCITY_VARIANCE = 1000 ** 2 # (mm/s)^2
+TRACK_OPTIMAL_MAX = 5 # Up to this many tracks/detections association is exhaustive, greedy beyond
+TRACK_ENTER = "enter"
+TRACK_EXIT = "exit"
+
+# Aggregation constants
+AGGREGATE_TARGET_DISTANCE_THRESHOLD = 300 # mm the nearest target has to move to count as a change
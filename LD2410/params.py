@@ -0,0 +1,62 @@
+import threading
+
+
+# Last known device parameters, with the ones changed locally but not yet written marked dirty
+#
+# Keys are chosen by the device class, e.g. ("gate", 3) -> (moving_sens, static_sens).
+# Entries come from device reads (load) or setters (set). set() only marks an entry
+# dirty when it differs from what the device is known to have, so writing the same
+# value twice costs nothing. The device class turns dirty entries into commands, see
+# Radar.flush().
+class ParamCache:
+    def __init__(self):
+        self.values = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    # Store values read from the device. Entries with pending local changes keep them
+    def load(self, values):
+        with self._lock:
+            for key, value in values.items():
+                if key not in self.dirty:
+                    self.values[key] = value
+
+    # Returns True if the value differs from the known one and is now dirty
+    def set(self, key, value):
+        with self._lock:
+            if key not in self.dirty and key in self.values and self.values[key] == value:
+                return False
+            self.values[key] = value
+            self.dirty.add(key)
+            return True
+
+    # Dirty entries as {key: value}, which are clean from now on
+    def take_dirty(self):
+        with self._lock:
+            ret = {key: self.values[key] for key in self.dirty}
+            self.dirty.clear()
+            return ret
+
+    # Put entries back as dirty after a failed write
+    def restore(self, entries):
+        with self._lock:
+            for key, value in entries.items():
+                if key not in self.dirty:
+                    self.values[key] = value
+                    self.dirty.add(key)
+
+    # True if every key is known and none has unwritten changes
+    def complete(self, keys):
+        return all(key in self.values and key not in self.dirty for key in keys)
+
+    # Forget everything, e.g. after the module was restarted or reset
+    def invalidate(self):
+        with self._lock:
+            self.values.clear()
+            self.dirty.clear()
@@ -0,0 +1,301 @@
+from .radar_consts import *
+from .ld2410 import LD2410Frame
+from . import model_class
+from math import sqrt
+from multiprocessing import shared_memory
+import io
+import logging
+import multiprocessing
+import os
+import selectors
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ring layout
+#
+#   header (64 bytes): records written (uint64), capacity, record size (uint32), model code (uint8)
+#   records: sequence number + 1 (uint64, 0 while the record is being written),
+#            timestamp (float64, time.monotonic()), port index (uint16), then the frame fields
+#
+# Each ring has exactly one writer. The writer clears a record's sequence number before
+# rewriting it and sets it again afterwards, so readers detect records that were
+# overwritten while they copied them and count them as dropped.
+_RING_HEADER = struct.Struct('<QIIB')
+_RING_HEADER_SIZE = 64
+_SEQ = struct.Struct('<Q')
+
+MODEL_CODES = {"LD2410": 0, "LD2450": 1}
+_NO_ENERGIES = bytes(9)
+
+
+def _encode_ld2410(frame):
+    if frame.move_energies is None:
+        return (frame.target_type, frame.moving_target_dist, frame.moving_target_energy, frame.static_target_dist,
+                frame.static_target_energy, frame.detection_dist, 0, _NO_ENERGIES, _NO_ENERGIES)
+    return (frame.target_type, frame.moving_target_dist, frame.moving_target_energy, frame.static_target_dist,
+            frame.static_target_energy, frame.detection_dist, 1, frame.move_energies, frame.static_energies)
+
+
+def _decode_ld2410(values):
+    if values[6]:
+        return LD2410Frame(*values[:6], values[7], values[8])
+    return LD2410Frame(*values[:6])
+
+
+def _encode_ld2450(targets):
+    return [value for target in targets for value in target[:4]]
+
+
+def _decode_ld2450(values):
+    targets = []
+    for i in range(0, 12, 4):
+        x, y = values[i], values[i+1]
+        targets.append((x, y, values[i+2], values[i+3], sqrt(x*x + y*y)))
+    return targets
+
+
+# Record layout (after the sequence number) and the functions between it and decoded frames
+_RECORDS = {
+    "LD2410": (struct.Struct('<dHBHBHBHB9s9s'), _encode_ld2410, _decode_ld2410), # Standard fields, energies flag, 9+9 gate energies
+    "LD2450": (struct.Struct('<dH' + 'hhhH' * 3), _encode_ld2450, _decode_ld2450), # x, y, speed, resolution of 3 targets
+}
+
+
+# Fixed size record ring in multiprocessing.shared_memory
+#
+# One process writes decoded frames with write(), any number of processes attach by
+# name and read them with read() without pickling anything. A reader that falls more
+# than capacity records behind loses the oldest ones.
+class FrameRing:
+    def __init__(self, shm, model, capacity, owner=False):
+        self.shm = shm
+        self.name = shm.name
+        self.model = model
+        self.capacity = capacity
+        self.owner = owner
+        self.layout, self._encode, self._decode = _RECORDS[model]
+        self.record_size = (_SEQ.size + self.layout.size + 7) // 8 * 8
+        self._buf = shm.buf
+        self._write_seq = self.head()
+
+    @classmethod
+    def create(cls, model, capacity=PIPELINE_RING_SIZE):
+        layout = _RECORDS[model][0]
+        record_size = (_SEQ.size + layout.size + 7) // 8 * 8
+        shm = shared_memory.SharedMemory(create=True, size=_RING_HEADER_SIZE + capacity * record_size)
+        _RING_HEADER.pack_into(shm.buf, 0, 0, capacity, record_size, MODEL_CODES[model])
+        return cls(shm, model, capacity, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False) # Python 3.13+, the creator cleans up
+        except TypeError:
+            # Older versions track the segment in the (shared) resource tracker of the
+            # process tree, which only unlinks it when the creating process goes away
+            shm = shared_memory.SharedMemory(name=name)
+        _, capacity, _, code = _RING_HEADER.unpack_from(shm.buf, 0)
+        model = {code: model for model, code in MODEL_CODES.items()}[code]
+        return cls(shm, model, capacity)
+
+    # Number of records written so far
+    def head(self):
+        return _SEQ.unpack_from(self._buf, 0)[0]
+
+    def write(self, index, timestamp, data):
+        seq = self._write_seq
+        offset = _RING_HEADER_SIZE + (seq % self.capacity) * self.record_size
+        buf = self._buf
+        _SEQ.pack_into(buf, offset, 0)
+        self.layout.pack_into(buf, offset + _SEQ.size, timestamp, index, *self._encode(data))
+        _SEQ.pack_into(buf, offset, seq + 1)
+        self._write_seq = seq + 1
+        _SEQ.pack_into(buf, 0, seq + 1)
+
+    # Records from cursor on, at most limit of them
+    # Returns (next cursor, [(port index, timestamp, data), ...], records lost to the writer)
+    def read(self, cursor, limit=None):
+        head = self.head()
+        dropped = 0
+        if head - cursor > self.capacity:
+            dropped = head - self.capacity - cursor
+            cursor = head - self.capacity
+        end = head if limit is None else min(head, cursor + limit)
+
+        buf = self._buf
+        layout = self.layout
+        decode = self._decode
+        records = []
+        while cursor < end:
+            offset = _RING_HEADER_SIZE + (cursor % self.capacity) * self.record_size
+            if _SEQ.unpack_from(buf, offset)[0] == cursor + 1:
+                values = layout.unpack_from(buf, offset + _SEQ.size)
+                if _SEQ.unpack_from(buf, offset)[0] == cursor + 1:
+                    records.append((values[1], values[0], decode(values[2:])))
+                    cursor += 1
+                    continue
+            dropped += 1 # Overwritten before or while it was copied
+            cursor += 1
+        return cursor, records, dropped
+
+    def close(self):
+        self._buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Body of a reader process: read ports, decode frames and write them to the ring
+#
+# ports are port names or picklable callables returning an open serial object, e.g.
+# functools.partial(ReplaySerial, path, realtime=False, timeout=0). Returns once
+# stop_event is set, or when every port is a recording that has been read to the end.
+def _reader_main(model, ports, indices, ring_name, baud_rate, stop_event):
+    ring = FrameRing.attach(ring_name)
+    radars = []
+    selector = selectors.DefaultSelector()
+    try:
+        polled = []
+        for index, port in zip(indices, ports):
+            radar = model_class(model)(port() if callable(port) else port, baud_rate=baud_rate, timeout=0)
+            radars.append(radar)
+            try:
+                selector.register(radar.ser.fileno(), selectors.EVENT_READ, (index, radar))
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                polled.append((index, radar)) # No file descriptor, e.g. a recording
+
+        while not stop_event.is_set():
+            ready = polled
+            if selector.get_map():
+                ready = [key.data for key, _ in selector.select(0 if polled else PIPELINE_SELECT_TIMEOUT)] + polled
+            idle = True
+            for index, radar in ready:
+                chunk = radar.read_serial()
+                if not chunk:
+                    continue
+                idle = False
+                for timestamp, data in radar.process_frames(chunk):
+                    ring.write(index, timestamp, data)
+            if idle and polled:
+                if not selector.get_map() and all(radar.ser.at_end() for _, radar in polled
+                                                  if hasattr(radar.ser, "at_end")):
+                    return
+                time.sleep(PIPELINE_POLL_INTERVAL)
+    finally:
+        for radar in radars:
+            radar.ser.close()
+        selector.close()
+        ring.close()
+
+
+# Reads many ports from several processes, sidestepping the GIL
+#
+# The ports are spread over `processes` reader processes (one per CPU by default). Each
+# reads and decodes its ports and writes the frames into its own shared memory
+# FrameRing. Consumers, in this process or others, read the rings through a
+# PipelineConsumer, which only needs pipeline.spec() to attach.
+#
+# Usage:
+#   with RadarPipeline(["/dev/ttyUSB0", "/dev/ttyUSB1"], model="LD2410") as pipeline:
+#       consumer = pipeline.consumer()  # or PipelineConsumer(spec) in another process
+#       while True:
+#           for name, timestamp, data in consumer.poll():
+#               ...
+class RadarPipeline:
+    def __init__(self, ports, model="LD2410", baud_rate=PARAM_DEFAULT_BAUD, processes=None,
+                 ring_size=PIPELINE_RING_SIZE, names=None):
+        if model not in MODELS:
+            raise Exception(f"Unknown model {model}, pick one of {list(MODELS)}")
+        if not ports:
+            raise Exception("A pipeline needs at least one port")
+        self.ports = list(ports)
+        self.names = list(names) if names else [port if isinstance(port, str) else repr(port) for port in self.ports]
+        self.model = model
+        self.baud_rate = baud_rate
+        processes = min(processes or os.cpu_count() or 1, len(self.ports))
+        self.groups = [list(range(i, len(self.ports), processes)) for i in range(processes)]
+        self.rings = [FrameRing.create(model, ring_size) for _ in self.groups]
+        self._stop_event = multiprocessing.Event()
+        self._processes = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self._stop_event.clear()
+        for group, ring in zip(self.groups, self.rings):
+            process = multiprocessing.Process(target=_reader_main, daemon=True,
+                                              args=(self.model, [self.ports[i] for i in group], group, ring.name,
+                                                    self.baud_rate, self._stop_event))
+            process.start()
+            self._processes.append(process)
+        logger.info(f"Pipeline started {len(self._processes)} reader processes for {len(self.ports)} ports")
+
+    # Wait for the reader processes to finish, e.g. after replaying recordings
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process in self._processes:
+            process.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        return not any(process.is_alive() for process in self._processes)
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(PIPELINE_JOIN_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"Reader process {process.pid} did not stop, terminating it")
+                process.terminate()
+                process.join()
+        self._processes = []
+
+    # Stops the readers and frees the rings, consumers must not read them afterwards
+    def close(self):
+        self.stop()
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
+
+    # Everything a consumer process needs to attach, small and picklable
+    def spec(self):
+        return [ring.name for ring in self.rings], self.names
+
+    def consumer(self, from_start=False):
+        return PipelineConsumer(self.spec(), from_start=from_start)
+
+
+# Reads the frames of a RadarPipeline, see RadarPipeline.spec()
+#
+# poll() returns the frames written since the last call as (name, timestamp, data),
+# in order per ring. dropped counts frames the readers overwrote before they were read.
+class PipelineConsumer:
+    def __init__(self, spec, from_start=False):
+        ring_names, self.names = spec
+        self.rings = [FrameRing.attach(name) for name in ring_names]
+        self.cursors = [0 if from_start else ring.head() for ring in self.rings]
+        self.received = 0
+        self.dropped = 0
+
+    def poll(self, limit=None):
+        names = self.names
+        frames = []
+        for i, ring in enumerate(self.rings):
+            self.cursors[i], records, dropped = ring.read(self.cursors[i], limit)
+            self.dropped += dropped
+            frames.extend((names[index], timestamp, data) for index, timestamp, data in records)
+        self.received += len(frames)
+        return frames
+
+    # Frames not read yet, over every ring
+    def backlog(self):
+        return sum(ring.head() - cursor for ring, cursor in zip(self.rings, self.cursors))
+
+    def close(self):
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
@@ -0,0 +1,126 @@
+from .ld2410_consts import *
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+GATE_COUNT = GATE_MAX + 1
+
+
+# A presence state transition
+class PresenceEvent:
+    __slots__ = ("kind", "timestamp", "zone", "previous_zone")
+
+    def __init__(self, kind, timestamp, zone, previous_zone=None):
+        self.kind = kind # PRESENCE_ENTER, PRESENCE_LEAVE or PRESENCE_ZONE_CHANGE
+        self.timestamp = timestamp
+        self.zone = zone # Zone of the nearest active gate, None on leave
+        self.previous_zone = previous_zone
+
+    def __repr__(self):
+        return f"PresenceEvent({self.kind!r}, {self.timestamp}, zone={self.zone!r}, previous_zone={self.previous_zone!r})"
+
+
+# Incremental presence detection over LD2410 frames
+#
+# Every gate keeps an exponentially smoothed moving and static energy. A gate turns
+# active when either smoothed energy reaches its threshold and inactive again once both
+# have fallen hysteresis below it. Presence is entered as soon as any gate is active
+# and left after hold_time seconds without one. Each update is O(gates).
+#
+# zones maps a zone name to the gates it covers, e.g. {"desk": range(0, 3), "door": range(3, 9)}.
+# The zone of a frame is that of the nearest active gate, without zones it is the gate number.
+#
+# Frames without gate energies (normal mode) fall back to the module's own target type,
+# with the zone taken from the gate at the detection distance.
+#
+# update() returns the events a frame caused, usually none, and calls callback(event)
+# for each of them.
+class PresenceEngine:
+    def __init__(self, move_thresholds, static_thresholds, max_moving_gate=GATE_MAX, max_static_gate=GATE_MAX,
+                 hold_time=PRESENCE_HOLD_TIME, hysteresis=PRESENCE_HYSTERESIS, smoothing=PRESENCE_SMOOTHING,
+                 zones=None, callback=None):
+        if len(move_thresholds) != GATE_COUNT or len(static_thresholds) != GATE_COUNT:
+            raise Exception(f"Expected {GATE_COUNT} moving and static gate thresholds")
+        if not 0 < smoothing <= 1:
+            raise Exception(f"Smoothing must be in (0, 1], got {smoothing}")
+        self.move_thresholds = list(move_thresholds)
+        self.static_thresholds = list(static_thresholds)
+        self.max_moving_gate = max_moving_gate
+        self.max_static_gate = max_static_gate
+        self.hold_time = hold_time
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.callback = callback
+
+        self.zone_lookup = list(range(GATE_COUNT))
+        if zones:
+            self.zone_lookup = [None] * GATE_COUNT
+            for name, gates in zones.items():
+                for gate in gates:
+                    self.zone_lookup[gate] = name
+
+        self.move_ema = [0.0] * GATE_COUNT
+        self.static_ema = [0.0] * GATE_COUNT
+        self.active = [False] * GATE_COUNT
+        self.present = False
+        self.zone = None
+        self.last_active_time = None
+        self._lock = threading.Lock()
+
+    # Seed the thresholds from LD2410.read_detection_params(), the module's empty
+    # timeout becomes the hold time unless one is given
+    @classmethod
+    def from_detection_params(cls, params, **kwargs):
+        (max_moving_gate, max_static_gate, empty_timeout), move_sens, static_sens = params
+        kwargs.setdefault("hold_time", empty_timeout)
+        return cls(move_sens, static_sens, max_moving_gate, max_static_gate, **kwargs)
+
+    # Nearest active gate, None when no gate is active
+    def _update_gates(self, frame):
+        alpha = self.smoothing
+        move_ema = self.move_ema
+        static_ema = self.static_ema
+        active = self.active
+        nearest = None
+        for gate in range(GATE_COUNT):
+            m = move_ema[gate] = move_ema[gate] + alpha * (frame.move_energies[gate] - move_ema[gate])
+            s = static_ema[gate] = static_ema[gate] + alpha * (frame.static_energies[gate] - static_ema[gate])
+            move_on = gate <= self.max_moving_gate and m >= self.move_thresholds[gate] - (self.hysteresis if active[gate] else 0)
+            static_on = gate <= self.max_static_gate and s >= self.static_thresholds[gate] - (self.hysteresis if active[gate] else 0)
+            active[gate] = move_on or static_on
+            if active[gate] and nearest is None:
+                nearest = gate
+        return nearest
+
+    def update(self, timestamp, frame):
+        with self._lock:
+            if frame.move_energies is not None:
+                nearest = self._update_gates(frame)
+            elif frame.target_type:
+                nearest = min(frame.detection_dist // GATE_RESOLUTION, GATE_MAX)
+            else:
+                nearest = None
+
+            events = []
+            if nearest is not None:
+                self.last_active_time = timestamp
+                zone = self.zone_lookup[nearest]
+                if not self.present:
+                    self.present = True
+                    events.append(PresenceEvent(PRESENCE_ENTER, timestamp, zone))
+                elif zone != self.zone:
+                    events.append(PresenceEvent(PRESENCE_ZONE_CHANGE, timestamp, zone, self.zone))
+                self.zone = zone
+            elif self.present and timestamp - self.last_active_time >= self.hold_time:
+                self.present = False
+                events.append(PresenceEvent(PRESENCE_LEAVE, timestamp, None, self.zone))
+                self.zone = None
+
+        if self.callback is not None:
+            for event in events:
+                try:
+                    self.callback(event)
+                except Exception:
+                    logger.exception("Presence callback failed")
+        return events
@@ -1,89 +1,295 @@
 from .radar_consts import *
-from collections import deque
-import serial
+from .frame_parser import FrameParser
+from .recording import Recorder, ReplaySerial
+from .baud import cache_baud_rate, detect_baud_rate
+from .params import ParamCache
+from .stats import RadarStats
+from .subscription import *
+from .commands import *
+from .export import FrameExporter
+from .aggregate import FrameAggregator
+from contextlib import contextmanager
 import struct
 import threading
 import time
 import logging
 
-class Queue:
-    def __init__(self, max_size):
-        self.queue = deque(maxlen=max_size)
-    
-    def add(self, element):
-        self.queue.append(element)
-    
-    def byte_str(self):
-        return b"".join(list(self.queue))
+logger = logging.getLogger(__name__)
 
+_CMD_HEADER = bytes.fromhex(CMD_HEADER)
+_CMD_MFR = bytes.fromhex(CMD_MFR)
+_UINT32 = struct.Struct('<I')
 
 class Radar():
-    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=logging.DEBUG) -> None:
+    model = None # Model name, set by the device classes
+
+    # baud_rate is a PARAM_BAUD_* value, or BAUD_AUTO to detect it (see baud.py)
+    def __init__(self, port, baud_rate=PARAM_DEFAULT_BAUD, timeout=1, verbosity=None) -> None:
         self.port = port
         self.baudrate = baud_rate
         self.timeout = timeout
         self.eng_mode = False
         self.read_fail_count = 0
-        
+        self.parser = None # FrameParser for the data frames, set by the device class
+        self.external_reader = False # Set while something else (e.g. RadarHub) reads the port
+        self.auto_reconnect = True # Reopen the port when it fails while polling, see reconnect()
+
+        # Command channel
+        self.ack_parser = FrameParser(CMD_HEADER, CMD_MFR)
+        self.cmd_timeout = CMD_TIMEOUT
+        self.cmd_retries = CMD_RETRIES
+        self._ack_words = None # Command words of the ACKs being waited for, in order
+        self._acks = []
+        self._ack_event = threading.Event()
+        self._in_config = False
+
+        # Device parameters, see flush()
+        self.params = ParamCache()
+        self.write_through = True # Setters write straight away, False collects changes until flush()
+
         # threading data variables
-        self.last_detection = None
-        self._lock = threading.Lock()
+        # The latest frame is published as one (seq, timestamp, data) tuple. Swapping the
+        # reference is atomic, so readers never wait on the polling thread
+        self._latest = (0, None, None)
+        self._lock = threading.RLock() # Serialises commands and config sessions
         self._worker_thread = None
         self._stop_event = threading.Event()
+        self._first_frame = threading.Event()
+        self.history = None # Optional FrameHistory of recent frames
+        self.presence = None # Optional PresenceEngine fed with every frame
+        self.tracker = None # Optional TargetTracker fed with every frame
+        self._subscribers = () # Replaced, never mutated, so publish() can iterate without a lock
+        self._subscribers_lock = threading.Lock()
+        self.metrics = None # RadarStats while stats are enabled, see enable_stats()
+        self.trace_every = 0 # Log 1 in trace_every frames, see trace_frames()
+        self._trace_countdown = 0
+
+        # Logging is left to the host application to configure. verbosity, if given, sets
+        # the level of the package logger ("LD2410") and with it every radar's
+        if verbosity is not None:
+            logging.getLogger(__package__).setLevel(verbosity)
 
-        logging.basicConfig(level=verbosity)
+        self.recorder = None # Recorder capturing raw reads, see start_recording()
+        self._export = None # (Subscription, FrameExporter) while exporting, see start_export()
+        self._aggregation = None # (Subscription, FrameAggregator) while aggregating, see start_aggregation()
+        if self.baudrate == BAUD_AUTO:
+            if not isinstance(port, str) or port.endswith(RECORDING_EXTENSION):
+                raise Exception(f"BAUD_AUTO needs a serial port name, not {port!r}")
+            self.baudrate = detect_baud_rate(port)
+        self.ser = self.open_serial()
+        logger.info(f"Serial port initialised at {port}, with baud rate {BAUD_LOOKUP[self.baudrate]}")
 
-        self.ser = serial.Serial(port, BAUD_LOOKUP[baud_rate], timeout=timeout)
-        logging.info(f"Serial port initialised at {port}, with baud rate {BAUD_LOOKUP[baud_rate]}")
+    # Open the port. A path ending in .ldrec replays that recording in real time and
+    # anything that is not a string is used as the serial object as is (e.g. a ReplaySerial)
+    def open_serial(self):
+        if not isinstance(self.port, str):
+            return self.port
+        if self.port.endswith(RECORDING_EXTENSION):
+            return ReplaySerial(self.port, timeout=self.timeout)
+        # pyserial is only imported once a real port is opened, so decoding and replay work without it
+        import serial
+        return serial.Serial(self.port, BAUD_LOOKUP[self.baudrate], timeout=self.timeout)
 
     # Helper functions
+
+    # Full command frame for a command given as an encoded frame (see commands.py) or,
+    # as it used to be, a hex string of length, command word and value
     @staticmethod
     def frame_wrapper(command):
-        return bytes.fromhex(CMD_HEADER + command + CMD_MFR)
+        return command_frame(command)
 
     # Convert a decimal integer to a 4 byte little endian string
     @staticmethod
     def int_to_4b(num):
-        hex_string = bytearray.fromhex(struct.pack('>I', num).hex())
-        hex_string.reverse()
-        return bytes(hex_string).hex()
+        return _UINT32.pack(num).hex()
+
+    # Command word the ACK for a wrapped command will carry
+    @staticmethod
+    def ack_word(command_bytes):
+        return (command_bytes[REF_CMD_WORD_IDX] | command_bytes[REF_CMD_WORD_IDX+1] << 8) | ACK_FLAG
+
+    # Wrap an ACK frame body back into the full frame, which the REF_ indices refer to
+    @staticmethod
+    def ack_frame(body):
+        return _CMD_HEADER + body + _CMD_MFR
+
+    # Raise if the module reported the command as failed
+    @staticmethod
+    def check_ack(ret_bytes):
+        status = ret_bytes[REF_ACK_STATUS_IDX] | ret_bytes[REF_ACK_STATUS_IDX+1] << 8
+        if status != ACK_SUCCESS:
+            raise Exception(f"Radar rejected the command, received {ret_bytes.hex(' ')}")
 
     # Base functions
 
+    # Hand ACK frames from a chunk of serial data to a waiting send_frames()
+    #
+    # Only the ACK expected next is kept, so late ACKs from an earlier attempt are dropped.
+    # send_frames() swaps _ack_words from another thread, so it is read once
+    def feed_ack(self, chunk):
+        self.ack_parser.feed(chunk)
+        words = self._ack_words
+        acks = self._acks
+        for body in self.ack_parser.frames():
+            ret_bytes = self.ack_frame(body)
+            if words is not None and len(acks) < len(words) and self.ack_word(ret_bytes) == words[len(acks)]:
+                acks.append(ret_bytes)
+                self._ack_event.set()
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Ignoring unexpected ACK {ret_bytes.hex(' ')}")
+
+    # Wait until count ACKs have arrived or timeout seconds have passed
+    def wait_acks(self, count, timeout):
+        deadline = time.monotonic() + timeout
+        if self.external_reader or (self._worker_thread and self._worker_thread.is_alive()
+                                    and self._worker_thread is not threading.current_thread()):
+            # The polling thread or hub is reading the port and will pass the ACKs on
+            while True:
+                self._ack_event.clear()
+                remaining = deadline - time.monotonic()
+                if len(self._acks) >= count or remaining <= 0:
+                    break
+                self._ack_event.wait(remaining)
+            return self._acks[:count]
+
+        # Keep single reads from blocking for the whole port timeout
+        port_timeout = self.ser.timeout
+        self.ser.timeout = timeout
+        try:
+            while len(self._acks) < count and time.monotonic() < deadline:
+                chunk = self.read_serial()
+                if chunk:
+                    # Data frames arriving in between are decoded as usual
+                    self.process_bytes(chunk)
+        finally:
+            self.ser.timeout = port_timeout
+        return self._acks[:count]
+
+    # Sends several commands with a single write and returns their ACK frames in order
+    #
+    # ACKs are matched on command word (sent word | 0x0100) and status. The whole batch is
+    # resent up to cmd_retries times if its ACKs do not all arrive within cmd_timeout
+    # seconds per command
+    def send_frames(self, commands):
+        # Wrap up the commands
+        frames = [self.frame_wrapper(command) for command in commands]
+        ack_words = [self.ack_word(frame) for frame in frames]
+        batch = b"".join(frames)
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        metrics = self.metrics
+        for attempt in range(self.cmd_retries + 1):
+            if metrics is not None:
+                if attempt:
+                    metrics.command_retries += 1
+                sent = time.perf_counter()
+            self._acks = []
+            self._ack_words = tuple(ack_words) # Set after _acks, feed_ack() reads them the other way round
+            try:
+                if debug:
+                    logger.debug(f"Sending data:  {batch.hex(' ')}")
+                self.ser.write(batch)
+                acks = self.wait_acks(len(frames), self.cmd_timeout * len(frames))
+            except OSError as e: # serial.SerialException is an OSError
+                logger.debug(e)
+                if metrics is not None:
+                    metrics.serial_exceptions += 1
+                acks = []
+            finally:
+                self._ack_words = None
+
+            if len(acks) == len(frames):
+                if metrics is not None:
+                    metrics.command_round_trip.observe(time.perf_counter() - sent)
+                for ret_bytes in acks: # In command order, feed_ack() only keeps the one expected next
+                    if debug:
+                        logger.debug(f"Received data: {ret_bytes.hex(' ')}")
+                    self.check_ack(ret_bytes)
+                return acks # Returns the responses given by the radar module
+
+            logger.debug(f"Received {len(acks)} of {len(frames)} ACKs (attempt {attempt + 1})")
+
+        raise Exception(f"No ACK received for commands {[frame.hex(' ') for frame in frames]} after {self.cmd_retries + 1} attempts")
+
     # Sends a dataframe encoded as bytes enclosed within a format specific header
-    # Returns the acknowledged data received from the radar
+    # Returns the ACK frame received from the radar
     def send_frame(self, command):
-        while True:
+        return self.send_frames([command])[0]
+
+    # Send a command in config mode and return its ACK frame
+    # Set end_config=False for commands after which the module stops answering (restart)
+    def send_command(self, command, end_config=True):
+        return self.send_batch([command], end_config)[0]
+
+    # Send commands in config mode and return their ACK frames
+    #
+    # Outside a config_session() the config enable and disable frames go out in the same
+    # write as the commands, so a whole batch costs one write and one wait for ACKs
+    def send_batch(self, commands, end_config=True):
+        with self._lock:
+            if self._in_config:
+                # Already in config mode through config_session()
+                return self.send_frames(commands)
+
+            frames = [FRAME_CONFIG_ENABLE] + list(commands)
+            if end_config:
+                frames.append(FRAME_CONFIG_DISABLE)
+            return self.send_frames(frames)[1:len(commands)+1]
+
+    # Keep the module in config mode for every command sent inside the block
+    #
+    #   with radar.config_session():
+    #       radar.edit_gate_sensitivity(3, 50, 40)
+    #       radar.edit_gate_sensitivity(4, 50, 40)
+    @contextmanager
+    def config_session(self):
+        with self._lock:
+            if self._in_config:
+                yield self
+                return
+
+            self.send_frame(FRAME_CONFIG_ENABLE)
+            self._in_config = True
             try:
-                # Wrap up the command 
-                command_bytes = self.frame_wrapper(command)
-                
-                self.ser.write(command_bytes)
-                ret_bytes = self.ser.read(MAX_BUFFER_SIZE)
-                
-                logging.debug(f"Sending data:  {command_bytes.hex(' ')}")
-                logging.debug(f"Received data: {ret_bytes.hex(' ')}")
-    
-                return ret_bytes # Returns the response given by the radar module
-            
-            except Exception as e:
-                logging.debug(e)
-    
-    def send_command(self, command):
-        # Enable config mode
-        self.send_frame(CMD_CONFIG_ENABLE)
-        # Send command
-        ret_bytes = self.send_frame(command)
-        # Disable config mode
-        self.send_frame(CMD_CONFIG_DISABLE)
+                yield self
+            finally:
+                self._in_config = False
+                self.send_frame(FRAME_CONFIG_DISABLE)
+
+    # Write every parameter changed since the last flush, in one config session and one batch
+    # Only entries that differ from what the device is known to have are sent. Returns the ACKs
+    def flush(self):
+        dirty = self.params.take_dirty()
+        if not dirty:
+            return []
+        try:
+            return self.send_batch(self.param_commands(dirty))
+        except Exception:
+            self.params.restore(dirty)
+            raise
 
-        return ret_bytes
+    # Setters call this after updating self.params
+    # Returns the ACK of the write, or None when it was deferred or nothing changed
+    def changed_params(self):
+        if not self.write_through:
+            return None
+        acks = self.flush()
+        return acks[-1] if acks else None
+
+    # Commands writing the given {key: value} cache entries
+    # To be implemented in inherited class
+    def param_commands(self, entries):
+        raise Exception("Not implemented!")
 
     # Read Firmware Version
     def read_firmware_version(self):
-        logging.info("Reading firmware version")
-        ret = self.send_command(CMD_FIRMWARE_READ)
+        logger.info("Reading firmware version")
+        ret = self.send_command(FRAME_FIRMWARE_READ)
+        return self.parse_firmware_version(ret)
 
+    # Turn the firmware read ACK into a version string
+    @staticmethod
+    def parse_firmware_version(ret):
         # Need to flip from little endian to big endian
         fw_major = bytes(reversed(ret[REF_FW_MAJOR_HEAD:REF_FW_MAJOR_TAIL]))
         fw_minor = bytes(reversed(ret[REF_FW_MINOR_HEAD:REF_FW_MINOR_TAIL]))
@@ -98,81 +304,392 @@ class Radar():
 
     # Check consts.py to find the right settings
     def set_baud_rate(self, baud_rate, reconnect=True):
-        logging.info(f"Setting baud rate to {BAUD_LOOKUP[baud_rate]}")
+        logger.info(f"Setting baud rate to {BAUD_LOOKUP[baud_rate]}")
         if baud_rate not in PARAM_ACCEPTABLE_BAUDS:
             raise Exception(f"{baud_rate} is not a valid setting. Consult consts.py to find an appropriate setting.")
         
-        self.send_command(CMD_BAUD_RATE_SET + baud_rate)
+        self.send_command(BAUD_RATE_SET.encode(int.from_bytes(bytes.fromhex(baud_rate), 'little')))
         
         if reconnect:
-            logging.info("Baud rate set command issued. Calling restart.")
+            logger.info("Baud rate set command issued. Calling restart.")
             # Restart the driver with the new baudrate
-            self.restart_module(BAUD_LOOKUP[baud_rate])
+            self.restart_module(baud_rate)
 
     def factory_reset(self, reconnect=True):
-        logging.warning("Module will now be factory reset")
-        self.send_command(CMD_FACTORY_RESET)
+        logger.warning("Module will now be factory reset")
+        self.send_command(FRAME_FACTORY_RESET)
+        self.params.invalidate()
         if reconnect:
-            self.restart_module(BAUD_LOOKUP[PARAM_DEFAULT_BAUD])
+            self.restart_module(PARAM_DEFAULT_BAUD)
 
-    def restart_module(self, new_baud=None):
-        logging.info("Restarting module")
-        if new_baud:
-            self.baudrate = new_baud
+    # Restart the module and wait (up to timeout seconds) for it to send data again
+    # new_baud is the PARAM_BAUD_* rate the module comes back at, if it was changed
+    def restart_module(self, new_baud=None, timeout=RESTART_TIMEOUT):
+        logger.info("Restarting module")
+        if isinstance(new_baud, int):
+            # Older callers passed the baud rate itself
+            new_baud = {baud: param for param, baud in BAUD_LOOKUP.items()}[new_baud]
 
-        self.send_command(CMD_RESTART)
-        self.ser.close()
-        self.ser = self.ser = serial.Serial(self.port, BAUD_LOOKUP[self.baudrate], timeout=self.timeout)
-        self.eng_mode = False
+        self.send_command(FRAME_RESTART, end_config=False)
+        self.params.invalidate()
+        with self._lock:
+            if new_baud:
+                self.baudrate = new_baud
+                if isinstance(self.port, str):
+                    cache_baud_rate(self.port, new_baud)
+            # Switch the open port over instead of closing and reopening it
+            self.ser.baudrate = BAUD_LOOKUP[self.baudrate]
+            self.ser.reset_input_buffer()
+            self.eng_mode = False
+            if self.parser:
+                self.parser.reset()
+
+        if not self.wait_for_frame(timeout):
+            logger.warning(f"No data received within {timeout}s of restarting the module")
+
+    # Wait until the module sends a data frame, e.g. after a restart or reconnect
+    def wait_for_frame(self, timeout=RESTART_TIMEOUT):
+        self._first_frame.clear()
+        if self.external_reader or (self._worker_thread and self._worker_thread.is_alive()
+                                    and self._worker_thread is not threading.current_thread()):
+            return self._first_frame.wait(timeout)
 
-        time.sleep(1)
+        deadline = time.monotonic() + timeout
+        port_timeout = self.ser.timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.ser.timeout = remaining
+                ret = self.read_frame()
+                if ret is not None:
+                    self.publish(self.parse_frame(ret))
+                    return True
+        finally:
+            self.ser.timeout = port_timeout
+
+    # Reopen the port after it failed, e.g. a USB adapter that dropped off the bus
+    #
+    # Attempts start right away and back off exponentially from RECONNECT_BACKOFF_MIN
+    # to RECONNECT_BACKOFF_MAX seconds. Gives up after timeout seconds (None keeps
+    # trying until stop()). failed is the serial object that failed, if someone else
+    # has already replaced it there is nothing to do.
+    def reconnect(self, failed=None, timeout=None):
+        if not isinstance(self.port, str):
+            return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = RECONNECT_BACKOFF_MIN
+        while not self._stop_event.is_set():
+            with self._lock:
+                if failed is not None and self.ser is not failed and self.ser.is_open:
+                    return True
+                try:
+                    self.ser.close()
+                except Exception:
+                    pass
+                try:
+                    self.ser = self.open_serial()
+                except OSError as e:
+                    logger.debug(f"Reopening {self.port} failed: {e}")
+                else:
+                    if self.parser:
+                        self.parser.reset()
+                    self.ack_parser.reset()
+                    logger.info(f"Reconnected to {self.port}")
+                    return True
+            if deadline is not None and time.monotonic() + delay > deadline:
+                return False
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, RECONNECT_BACKOFF_MAX)
+        return False
 
     # Enable Bluetooth
     def bt_enable(self):
-        logging.info("Enabling Bluetooth")
-        self.send_command(CMD_BT_ENABLE)
+        logger.info("Enabling Bluetooth")
+        self.send_command(FRAME_BT_ENABLE)
 
     # Disable Bluetooth
     def bt_disable(self):
-        logging.info("Disabling Bluetooth")
-        self.send_command(CMD_BT_DISABLE)
+        logger.info("Disabling Bluetooth")
+        self.send_command(FRAME_BT_DISABLE)
 
     # Get Bluetooth MAC Address
     # Returns a string in the format of xx:xx:xx:xx:xx:xx
     def bt_query_mac(self):
-        logging.info("Getting Bluetooth Address")
-        ret = self.send_command(CMD_BT_MAC_QUERY)
-        mac = ret[REF_BT_ADDR_HEAD:REF_BT_ADDR_TAIL].hex(":") 
-        logging.debug(f"Bluetooth address is {mac}")
+        logger.info("Getting Bluetooth Address")
+        ret = self.send_command(FRAME_BT_MAC_QUERY)
+        mac = self.parse_bt_mac(ret)
+        logger.debug(f"Bluetooth address is {mac}")
         return mac
+
+    @staticmethod
+    def parse_bt_mac(ret):
+        return ret[REF_BT_ADDR_HEAD:REF_BT_ADDR_TAIL].hex(":")
     
+    # Read whatever the serial port has buffered. When nothing is waiting, this
+    # blocks for a single byte (up to the timeout) so frames are handled as they arrive
+    def read_serial(self):
+        chunk = self.ser.read(self.ser.in_waiting or 1)
+        if self.metrics is not None:
+            self.metrics.bytes_read += len(chunk)
+        if self.recorder is not None:
+            self.recorder.write(chunk)
+        return chunk
+
+    # Capture every raw read to a recording file, see recording.py
+    def start_recording(self, path, compress=False):
+        logger.info(f"Recording serial data to {path}")
+        self.recorder = Recorder(path, compress=compress)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            recorder.close()
+
+    # Write every decoded frame to column files (Parquet, Arrow, .npy or CSV), see export.py
+    # The writes happen on a thread of their own, extra arguments go to FrameExporter
+    #
+    #   radar.start_export("frames.parquet", chunk_rows=50000)
+    def start_export(self, path, **kwargs):
+        self.stop_export()
+        exporter = FrameExporter(path, model=self.model, **kwargs)
+        self._export = (self.subscribe(exporter.on_frame, queue_size=EXPORT_QUEUE_SIZE), exporter)
+        return exporter
+
+    # Writes the frames still buffered and closes the export
+    def stop_export(self):
+        if self._export is not None:
+            (subscription, exporter), self._export = self._export, None
+            self.unsubscribe(subscription, wait=True)
+            exporter.close()
+
+    # Reduce the frames to FrameSummary objects at an adaptive rate, see aggregate.py
+    # callback(summary) runs on a thread of its own, extra arguments go to FrameAggregator
+    #
+    #   radar.start_aggregation(lambda summary: uplink.send(summary.pack()), heartbeat=60)
+    def start_aggregation(self, callback, **kwargs):
+        self.stop_aggregation()
+        aggregator = FrameAggregator(model=self.model, callback=callback, **kwargs)
+        self._aggregation = (self.subscribe(aggregator.on_frame, queue_size=AGGREGATE_QUEUE_SIZE), aggregator)
+        return aggregator
+
+    # Summarises the open window and stops aggregating
+    def stop_aggregation(self):
+        if self._aggregation is not None:
+            (subscription, aggregator), self._aggregation = self._aggregation, None
+            self.unsubscribe(subscription, wait=True)
+            aggregator.flush()
+
+    # Returns the body of the next complete data frame, or None if the read timed out
+    def read_frame(self):
+        frame = self.parser.next_frame()
+        while frame is None:
+            ser = self.ser
+            try:
+                chunk = self.read_serial()
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.serial_exceptions += 1
+                # A port closed under a read can also fail with a TypeError, pyserial clears
+                # its fd before is_open
+                lost = isinstance(e, OSError) or not ser.is_open or getattr(ser, "fd", 0) is None
+                if lost and self.auto_reconnect and self._worker_thread is threading.current_thread():
+                    logger.warning(f"Lost {self.port} ({e}), reconnecting")
+                    self.reconnect(failed=ser)
+                    return None
+                self.read_fail_count += 1
+                logger.debug("Serial failed to read data. Trying again")
+                if self.read_fail_count > 32 and not lost:
+                    logger.warning("Serial failed to read data many times in a row. Please check if the baud rate is correct. Hint: open the radar with baud_rate=BAUD_AUTO to detect it")
+                return None
+
+            if not chunk:
+                return None
+            if self._ack_words is not None:
+                self.feed_ack(chunk)
+            self.parser.feed(chunk)
+            frame = self.parser.next_frame()
+
+        self.read_fail_count = 0
+        return frame
+
+    # Validate a frame body from the parser and return it in the form decode_frame() expects
+    # To be implemented in inherited class
+    def check_frame(self, ret):
+        return ret
+
+    # Start counting bytes, frames, failures and latencies, see stats()
+    # Off by default, a disabled radar only pays for an `is not None` check per frame
+    def enable_stats(self):
+        if self.metrics is None:
+            self.metrics = RadarStats(self.parser)
+
+    def disable_stats(self):
+        self.metrics = None
+
+    # Counters and latency histograms since enable_stats(), None while disabled
+    #
+    #   {"bytes_read": ..., "frames_decoded": ..., "crc_failures": ..., "resyncs": ...,
+    #    "serial_exceptions": ..., "command_retries": ...,
+    #    "parse_time": {...}, "frame_gap": {...}, "command_round_trip": {...}}
+    #
+    # Histograms hold count, sum, p50, p99 (bucket upper bounds, seconds) and the
+    # cumulative (upper bound, count) buckets. See stats.to_prometheus() for exporting
+    def stats(self):
+        if self.metrics is None:
+            return None
+        return self.metrics.as_dict(self.parser)
+
+    # Log every `every`-th frame body and its decoded data at INFO level, 0 turns tracing off
+    # Frames in between cost one countdown step, so tracing can stay on in production
+    def trace_frames(self, every=100):
+        self.trace_every = every
+        self._trace_countdown = 0
+
+    # Check and decode a frame body, timing it when stats are enabled
+    def parse_frame(self, ret):
+        if self.metrics is None:
+            data = self.decode_frame(self.check_frame(ret))
+        else:
+            start = time.perf_counter()
+            data = self.decode_frame(self.check_frame(ret))
+            self.metrics.parse_time.observe(time.perf_counter() - start)
+
+        if self.trace_every:
+            self._trace_countdown -= 1
+            if self._trace_countdown <= 0:
+                self._trace_countdown = self.trace_every
+                logger.info(f"Frame trace {self.port}: {bytes(ret).hex(' ')} -> {data}")
+        return data
+
     # Get Radar Frame
     def get_data_frame(self):
-        logging.debug("Getting raw dataframe")
+        ret = self.read_frame()
+        if ret is None:
+            return None
+        return self.check_frame(ret)
+
+    # Feed raw serial data from an external reader (e.g. RadarHub) and return the frames it completed
+    def process_bytes(self, chunk):
+        return [data for _, data in self.process_frames(chunk)]
+
+    # Same as process_bytes(), but yields (timestamp, data) with each frame's own publish time
+    # The generator has to be run to the end for every frame to be published
+    def process_frames(self, chunk):
+        if self._ack_words is not None:
+            self.feed_ack(chunk)
+        if self.parser is None:
+            return
+        self.parser.feed(chunk)
+        for ret in self.parser.frames():
+            data = self.parse_frame(ret)
+            yield self.publish(data), data
+
+    # Decode a frame returned by get_data_frame()
+    # To be implemented in inherited class
+    def decode_frame(self, ret):
         raise Exception("Not implemented!")
 
+    # Blocks until a frame has been read and decoded
+    def get_radar_data(self):
+        ret = self.get_data_frame()
+        while not ret:
+            ret = self.get_data_frame()
+        return self.decode_frame(ret)
+
+    # Make a decoded frame the latest detection, returns the timestamp it was given
+    def publish(self, data):
+        timestamp = time.monotonic()
+        self._latest = (self._latest[0] + 1, timestamp, data)
+        if self.metrics is not None:
+            self.metrics.frame_published(timestamp)
+        for subscription in self._subscribers:
+            subscription.offer(self._latest)
+        if self.history is not None:
+            self.history.append(timestamp, data)
+        if self.presence is not None:
+            self.presence.update(timestamp, data)
+        if self.tracker is not None:
+            self.tracker.update(timestamp, data)
+        if not self._first_frame.is_set():
+            self._first_frame.set()
+        return timestamp
 
+    # Push every decoded frame to a callback or queue instead of polling get_data()
+    #
+    # target is a callable, called as callback(seq, timestamp, data) from a delivery
+    # thread, or a queue.Queue that receives (seq, timestamp, data) tuples. policy says
+    # what happens when the consumer falls behind: POLICY_LATEST keeps only the newest
+    # frame, POLICY_DROP_OLDEST keeps the newest queue_size frames and POLICY_BLOCK
+    # makes the radar wait for the consumer (beware of serial buffer overruns).
+    #
+    # change_only=True only delivers frames that differ from the last delivered one
+    # according to frame_changed(), e.g. target type or a distance moving by more than
+    # threshold. heartbeat re-sends an unchanged frame every heartbeat seconds.
+    #
+    #   sub = radar.subscribe(print, change_only=True, heartbeat=60)
+    #   ...
+    #   radar.unsubscribe(sub)
+    def subscribe(self, target, policy=POLICY_DROP_OLDEST, queue_size=SUBSCRIBE_QUEUE_SIZE,
+                  change_only=False, threshold=SUBSCRIBE_DISTANCE_THRESHOLD, heartbeat=None):
+        subscription = Subscription(target, policy, queue_size, change_only, self.frame_changed, threshold, heartbeat)
+        with self._subscribers_lock:
+            self._subscribers += (subscription,)
+        return subscription
+
+    # wait=True lets a callback subscription finish the frames still queued for it
+    def unsubscribe(self, subscription, wait=False):
+        with self._subscribers_lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        subscription.close(wait)
+
+    # Whether data differs enough from previous to be delivered by a change_only subscription
+    # Overridden by the device classes with a field aware comparison
+    @staticmethod
+    def frame_changed(previous, data, threshold):
+        return previous != data
+
+    @property
+    def last_detection(self):
+        return self._latest[2]
+
+    # Latest decoded frame, returned immediately without touching the serial port
     def get_data(self):
-        raise Exception("Not implemented")
+        data = self._latest[2]
+        if data is None:
+            logger.warning("Data is empty, have you started the radar yet?")
+        return data
 
-    # To be implemented in inherited class
-    def poll_radar(self):
-        raise Exception("Not Implemented!")
-        pass
+    # Returns (seq, timestamp, data) for the latest frame
+    # seq increases by one per decoded frame, so callers can tell new data from repeated data.
+    # timestamp is the time.monotonic() value when the frame was decoded
+    def get_frame(self):
+        return self._latest
 
+    # Background polling loop, reads and publishes frames as fast as the module sends them
+    def poll_radar(self):
+        while not self._stop_event.is_set():
+            ret = self.read_frame()
+            if ret is not None:
+                self.publish(self.parse_frame(ret))
 
-    def start(self):
-        logging.info("Radar polling started")
+    # Start polling in the background. Returns as soon as the first frame arrives,
+    # or after timeout seconds if the module stays silent
+    def start(self, timeout=START_TIMEOUT):
+        logger.info("Radar polling started")
+        self._stop_event.clear()
+        self._first_frame.clear()
         self._worker_thread = threading.Thread(target=self.poll_radar)
         self._worker_thread.start()
-        self._stop_event.clear()
-        time.sleep(1) # Allow for a 1s init time
+        if not self._first_frame.wait(timeout):
+            logger.warning(f"No data received within {timeout}s of starting the radar")
 
 
     def stop(self):
-        if not self._stop_event.is_set():
-            logging.info("Radar polling stopped")
+        if self._worker_thread and self._worker_thread.is_alive():
+            logger.info("Radar polling stopped")
             self._stop_event.set()
             self._worker_thread.join()
         else:
-            logging.debug("Calling stop() but radar isn't running. This is normal.")
+            logger.debug("Calling stop() but radar isn't running. This is normal.")
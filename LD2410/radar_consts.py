@@ -18,8 +18,28 @@ CMD_BT_ENABLE = "0400A4000100"
 CMD_BT_DISABLE = "0400A4000000"
 CMD_BT_MAC_QUERY = "0400A5000100"
 
+# Command words. The driver encodes frames from these (see commands.py), the hex
+# strings above are kept for send_command() callers
+WORD_CONFIG_ENABLE = 0x00FF
+WORD_CONFIG_DISABLE = 0x00FE
+WORD_PARAM_EDIT = 0x0060
+WORD_PARAM_READ = 0x0061
+WORD_ENG_MODE_ENABLE = 0x0062
+WORD_ENG_MODE_DISABLE = 0x0063
+WORD_GATE_SENS_EDIT = 0x0064
+WORD_FIRMWARE_READ = 0x00A0
+WORD_BAUD_RATE_SET = 0x00A1
+WORD_FACTORY_RESET = 0x00A2
+WORD_RESTART = 0x00A3
+WORD_BT_SET = 0x00A4
+WORD_BT_MAC_QUERY = 0x00A5
+CONFIG_PROTOCOL_VERSION = 1 # Value of the config enable command
+BT_ON = 1
+BT_OFF = 0
+
 # Read constants
 REF_READ_HEADER = "F4F3F2F1"
+REF_READ_TAIL = "F8F7F6F5"
 REF_PACKET_CRC = "5500"
 
 REF_NORMAL_PACKET_LEN = 15
@@ -71,6 +91,81 @@ BAUD_LOOKUP = {PARAM_BAUD_9600  : 9600,
 
 # Ack Constants
 ACK_CONFIG_ENABLE = "0800FF01000001004000"
+ACK_FLAG = 0x0100 # ACK command word = command word | 0x0100
+ACK_SUCCESS = 0
+REF_CMD_WORD_IDX = 6
+REF_ACK_STATUS_IDX = 8
+
+# Command channel
+CMD_TIMEOUT = 0.3 # Seconds to wait for each ACK
+CMD_RETRIES = 2 # Resends before a command is given up on
+
+# Polling Constants
+START_TIMEOUT = 2 # Max seconds start() waits for the first frame
+FRAME_QUEUE_SIZE = 64 # Frames buffered per async frames() consumer
+ASYNC_EXECUTOR_READ_TIMEOUT = 0.1 # Read timeout when async reads fall back to a thread
+HUB_SELECT_TIMEOUT = 0.1 # Max seconds RadarHub waits in select() before checking for stop()
+HUB_RATE_WINDOW = 1 # Seconds over which RadarHub measures frame rates
+
+# Recording Constants
+RECORDING_EXTENSION = ".ldrec"
+RECORDING_CHUNK_SIZE = 65536 # Bytes buffered before a chunk is written
+RECORDING_FLUSH_INTERVAL = 1 # Max seconds between chunk writes
 
 # Validation Constants
 MAX_BUFFER_SIZE = 64 # 32 byte buffer read
+REF_MAX_PAYLOAD_LEN = 64 # Anything larger in a length field is a false header match
+
+# Model Constants
+MODELS = ("LD2410", "LD2450") # Driver class names, LD2410.model_class() returns the class
+
+# Stats Constants
+STATS_LATENCY_BUCKETS = tuple(1e-6 * 2 ** i for i in range(21)) # 1us to ~1s histogram buckets
+STATS_GAP_BUCKETS = tuple(1e-3 * 2 ** i for i in range(14)) # 1ms to ~8s histogram buckets
+
+# Subscription Constants
+SUBSCRIBE_QUEUE_SIZE = 64 # Frames buffered per subscriber by the bounded policies
+SUBSCRIBE_DISTANCE_THRESHOLD = 10 # Distance change (cm on LD2410, mm on LD2450) that counts as a change
+
+# Baud Detection Constants
+BAUD_AUTO = "auto" # Pass as baud_rate to detect the module's baud rate on open
+# Most likely rates first: factory default, then the rates people usually switch to
+AUTOBAUD_ORDER = [PARAM_BAUD_256000, PARAM_BAUD_115200, PARAM_BAUD_460800, PARAM_BAUD_230400,
+                  PARAM_BAUD_57600, PARAM_BAUD_38400, PARAM_BAUD_19200, PARAM_BAUD_9600]
+AUTOBAUD_SNIFF_TIME = 0.25 # Seconds to listen for data frames at each rate (modules send at ~10Hz)
+AUTOBAUD_ACK_TIMEOUT = 0.1 # Seconds to wait for the config ACK when nothing was heard
+
+# Reconnect Constants
+RESTART_TIMEOUT = 2 # Max seconds to wait for data after a module restart
+RECONNECT_BACKOFF_MIN = 0.05 # First delay between reopen attempts, doubled after each failure
+RECONNECT_BACKOFF_MAX = 2
+
+# Fleet Constants
+FLEET_DEVICE_TIMEOUT = 10 # Max seconds one device may take before it is reported as timed out
+
+# Pipeline Constants
+PIPELINE_RING_SIZE = 4096 # Records per shared memory ring, about 7 minutes of one module at 10Hz
+PIPELINE_SELECT_TIMEOUT = 0.1 # Max seconds a reader process waits for its ports before checking for stop()
+PIPELINE_POLL_INTERVAL = 0.001 # Sleep between reads of ports that cannot be selected on (recordings)
+PIPELINE_JOIN_TIMEOUT = 2 # Seconds stop() waits for a reader process before terminating it
+
+# Export Constants
+EXPORT_PARQUET = "parquet" # Needs pyarrow
+EXPORT_ARROW = "arrow" # Arrow IPC stream, needs pyarrow
+EXPORT_NPY = "npy" # Directory of .npy chunks, needs numpy
+EXPORT_CSV = "csv"
+EXPORT_FORMATS = (EXPORT_PARQUET, EXPORT_ARROW, EXPORT_NPY, EXPORT_CSV)
+EXPORT_CHUNK_ROWS = 10000 # Frames buffered before a chunk is written
+EXPORT_FLUSH_INTERVAL = 10 # Max seconds between chunk writes
+EXPORT_QUEUE_SIZE = 1024 # Frames queued for the export thread by Radar.start_export()
+
+# Aggregation Constants
+AGGREGATE_WINDOW = 1 # Seconds per summary while the scene changes, 0 summarises every frame
+AGGREGATE_HEARTBEAT = 30 # Seconds per summary while the scene is static
+AGGREGATE_ACTIVE_HOLD = 5 # Seconds the full rate is kept after the last change
+AGGREGATE_QUEUE_SIZE = 1024 # Frames queued for the aggregation thread by Radar.start_aggregation()
+SUMMARY_CHANGE = "change" # Presence appeared or disappeared
+SUMMARY_WINDOW = "window"
+SUMMARY_HEARTBEAT = "heartbeat"
+SUMMARY_FLUSH = "flush" # Partial window written out by flush()
+SUMMARY_REASONS = (SUMMARY_CHANGE, SUMMARY_WINDOW, SUMMARY_HEARTBEAT, SUMMARY_FLUSH)
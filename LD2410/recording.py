@@ -0,0 +1,190 @@
+from .radar_consts import *
+from collections import deque
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+# File layout
+#
+#   header: magic "LDREC", version, flags (bit 0 = chunks are zlib compressed)
+#   chunk:  stored length (uint32), then the (possibly compressed) records
+#   record: timestamp (float64, time.time()), data length (uint32), then the data
+#
+# Each record is one serial read. Chunks are only ever appended, so a capture cut off
+# by a crash loses at most the chunk that was still being buffered.
+_FILE_HEADER = struct.Struct('<5sBB')
+_CHUNK_HEADER = struct.Struct('<I')
+_RECORD_HEADER = struct.Struct('<dI')
+
+RECORDING_MAGIC = b"LDREC"
+RECORDING_VERSION = 1
+RECORDING_FLAG_ZLIB = 0x01
+
+
+# Appends raw serial reads to a recording file
+#
+# Usage:
+#   radar.start_recording("capture.ldrec", compress=True)
+#   ...
+#   radar.stop_recording()
+class Recorder:
+    def __init__(self, path, compress=False, chunk_size=RECORDING_CHUNK_SIZE, flush_interval=RECORDING_FLUSH_INTERVAL):
+        self.path = path
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+
+        flags = RECORDING_FLAG_ZLIB if compress else 0
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                magic, version, existing_flags = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+            if magic != RECORDING_MAGIC or existing_flags != flags:
+                raise Exception(f"{path} is not a recording with matching settings, refusing to append to it")
+            self._file = open(path, "ab")
+        else:
+            self._file = open(path, "wb")
+            self._file.write(_FILE_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, flags))
+
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, data, timestamp=None):
+        if not data:
+            return
+        with self._lock:
+            self._buffer += _RECORD_HEADER.pack(time.time() if timestamp is None else timestamp, len(data))
+            self._buffer += data
+            if len(self._buffer) >= self.chunk_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            chunk = zlib.compress(self._buffer) if self.compress else self._buffer
+            self._file.write(_CHUNK_HEADER.pack(len(chunk)))
+            self._file.write(chunk)
+            self._file.flush()
+            self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+
+# Iterate over (timestamp, data) records of a mapped recording
+# Uncompressed data is a memoryview straight into the mapping
+def iter_records(buf):
+    magic, version, flags = _FILE_HEADER.unpack_from(buf)
+    if magic != RECORDING_MAGIC:
+        raise Exception("Not a radar recording")
+    view = memoryview(buf)
+    pos = _FILE_HEADER.size
+    while pos + _CHUNK_HEADER.size <= len(buf):
+        (length,) = _CHUNK_HEADER.unpack_from(buf, pos)
+        pos += _CHUNK_HEADER.size
+        if pos + length > len(buf):
+            break # Truncated final chunk
+        chunk = view[pos:pos + length]
+        if flags & RECORDING_FLAG_ZLIB:
+            chunk = memoryview(zlib.decompress(chunk))
+        pos += length
+
+        offset = 0
+        while offset < len(chunk):
+            timestamp, size = _RECORD_HEADER.unpack_from(chunk, offset)
+            offset += _RECORD_HEADER.size
+            yield timestamp, chunk[offset:offset + size]
+            offset += size
+
+
+# Drop-in replacement for serial.Serial that plays back a recording
+#
+# With realtime=True data becomes readable with the original timing (scaled by speed),
+# otherwise everything is available immediately for as-fast-as-possible replay.
+# Writes are accepted and discarded. Radar(port="capture.ldrec") replays in real time,
+# Radar(port=ReplaySerial("capture.ldrec", realtime=False)) as fast as possible.
+class ReplaySerial:
+    def __init__(self, path, timeout=1, realtime=True, speed=1.0, baudrate=None):
+        self.port = path
+        self.timeout = timeout
+        self.realtime = realtime
+        self.speed = speed
+        self.baudrate = baudrate
+        self.is_open = True
+
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._records = iter_records(self._mmap)
+        self._next = next(self._records, None)
+        self._buffer = bytearray()
+        self._start = None
+        self._first_timestamp = self._next[0] if self._next else 0
+
+    # Monotonic time at which a record is due
+    def _due(self, timestamp):
+        return self._start + (timestamp - self._first_timestamp) / self.speed
+
+    # Move every record that is due into the read buffer
+    def _pump(self):
+        if self._start is None:
+            self._start = time.monotonic()
+        now = time.monotonic()
+        while self._next is not None and (not self.realtime or self._due(self._next[0]) <= now):
+            self._buffer += self._next[1]
+            self._next = next(self._records, None)
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._buffer)
+
+    # Same contract as serial.Serial.read(): up to size bytes, waiting at most timeout seconds
+    def read(self, size=1):
+        self._pump()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(self._buffer) < size:
+            now = time.monotonic()
+            if self._next is None:
+                # End of the recording, behave like a silent port
+                if not self._buffer and deadline is not None:
+                    time.sleep(max(0, deadline - now))
+                break
+            due = self._due(self._next[0])
+            if deadline is not None and due > deadline:
+                time.sleep(max(0, deadline - now))
+                break
+            time.sleep(max(0, due - now))
+            self._pump()
+
+        ret = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return ret
+
+    def write(self, data):
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._pump()
+        self._buffer.clear()
+
+    # True once the whole recording has been read
+    def at_end(self):
+        return self._next is None and not self._buffer
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self._records.close()
+            self._next = None
+            self._buffer = bytearray()
+            self._mmap.close()
+            self._file.close()
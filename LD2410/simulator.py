@@ -0,0 +1,251 @@
+from .radar_consts import *
+from .ld2410_consts import *
+from .ld2450_consts import *
+from .frame_parser import FrameParser
+from array import array
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_CMD_HEADER = bytes.fromhex(CMD_HEADER)
+_CMD_MFR = bytes.fromhex(CMD_MFR)
+_LD2410_HEADER = bytes.fromhex(REF_READ_HEADER)
+_LD2410_TAIL = bytes.fromhex(REF_READ_TAIL)
+_LD2450_HEADER = bytes.fromhex(REF_DATA_HEADER)
+_LD2450_TAIL = bytes.fromhex(REF_DATA_CRC)
+
+SIM_FIRMWARE = (0x0001, 0x0102, 0x22081616) # Firmware type, major, minor
+SIM_MAC = bytes.fromhex("8f272eb80f65")
+
+
+# Encode a signed LD2450 coordinate as sign-magnitude (bit 15 set = positive)
+def to_sign_magnitude(value):
+    return 0x8000 | value if value >= 0 else -value
+
+
+# In-process LD2410/LD2450 on a pseudo terminal
+#
+# The simulator owns the master end of a pty pair and the driver opens the slave
+# end, `sim.port`, like any serial port. Data frames are sent at `rate` Hz (never
+# faster than baud_rate allows) and config commands are answered with protocol
+# correct ACKs.
+#
+# Faults can be injected: `corruption` and `truncation` are the probabilities that a
+# data frame gets a flipped byte or loses its end, `latency` delays every ACK by
+# that many seconds.
+#
+# Every frame carries a 16 bit counter (LD2410: moving target distance, LD2450:
+# target 1 distance resolution) and its send time is kept in `emit_times`, so
+# end-to-end latency can be measured.
+#
+# Usage:
+#   sim = RadarSimulator("LD2410", rate=100, eng_mode=True)
+#   sim.start()
+#   radar = LD2410(sim.port)
+class RadarSimulator:
+    def __init__(self, model="LD2410", rate=10, baud_rate=PARAM_DEFAULT_BAUD, eng_mode=False,
+                 corruption=0.0, truncation=0.0, latency=0.0, seed=None):
+        if model not in ("LD2410", "LD2450"):
+            raise Exception(f"Unknown model {model}, pick LD2410 or LD2450")
+        self.model = model
+        self.rate = rate
+        self.baud_rate = baud_rate
+        self.eng_mode = eng_mode
+        self.corruption = corruption
+        self.truncation = truncation
+        self.latency = latency
+        self.random = random.Random(seed)
+
+        # Device state
+        self.config_mode = False
+        self.frame_count = 0
+        self.command_count = 0
+        self.dropped_bytes = 0
+        self.emit_times = array('d', bytes(8 * 65536))
+        self.factory_reset()
+
+        import tty # POSIX only, so the package still imports on Windows
+        self._master, slave = os.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        os.set_blocking(self._master, False)
+        self._commands = FrameParser(CMD_HEADER, CMD_MFR)
+        self._stop_event = threading.Event()
+        self._worker_thread = None
+
+    def factory_reset(self):
+        self.max_moving_gate = 8
+        self.max_static_gate = 8
+        self.empty_timeout = 5
+        self.moving_sens = [50, 50, 40, 30, 20, 15, 15, 15, 15]
+        self.static_sens = [0, 0, 40, 40, 30, 30, 20, 20, 20]
+        self.bluetooth = True
+        self.multi_target = True
+        self.region_type = 0
+        self.regions = bytes(24)
+
+    # Seconds per frame at the configured rate and baud rate (10 bits per byte on the wire)
+    def frame_interval(self):
+        frame_len = len(self.data_frame(0))
+        return max(1 / self.rate, frame_len * 10 / BAUD_LOOKUP[self.baud_rate])
+
+    def data_frame(self, counter):
+        t = counter / 50
+        if self.model == "LD2450":
+            x = int(1000 * ((t % 4) / 2 - 1))
+            target = struct.pack('<4H', to_sign_magnitude(x), to_sign_magnitude(1500), to_sign_magnitude(-10), counter)
+            return _LD2450_HEADER + target + bytes(16) + _LD2450_TAIL
+
+        energies = b""
+        data_type = 0x02
+        if self.eng_mode:
+            data_type = 0x01
+            energies = bytes([self.max_moving_gate, self.max_static_gate]) \
+                     + bytes((counter + gate * 11) % 100 for gate in range(18)) + bytes(2)
+        payload = bytes([data_type, 0xAA, 3]) + struct.pack('<HBHBH', counter, 60, 150, 40, 150) \
+                + energies + b'\x55\x00'
+        return _LD2410_HEADER + struct.pack('<H', len(payload)) + payload + _LD2410_TAIL
+
+    def _write(self, data):
+        try:
+            written = os.write(self._master, data)
+        except BlockingIOError:
+            written = 0
+        # A reader that falls behind loses data, like a UART overrun
+        self.dropped_bytes += len(data) - written
+
+    def _emit(self):
+        counter = self.frame_count & 0xFFFF
+        frame = self.data_frame(counter)
+        if self.truncation and self.random.random() < self.truncation:
+            frame = frame[:self.random.randrange(1, len(frame))]
+        elif self.corruption and self.random.random() < self.corruption:
+            corrupt = bytearray(frame)
+            corrupt[self.random.randrange(len(corrupt))] ^= 0xFF
+            frame = bytes(corrupt)
+        self.emit_times[counter] = time.monotonic()
+        self._write(frame)
+        self.frame_count += 1
+
+    def _ack(self, word, status=0, data=b""):
+        payload = struct.pack('<HH', word | ACK_FLAG, status) + data
+        if self.latency:
+            time.sleep(self.latency)
+        self._write(_CMD_HEADER + struct.pack('<H', len(payload)) + payload + _CMD_MFR)
+
+    # Answer one command frame body (length field included)
+    def handle_command(self, body):
+        self.command_count += 1
+        word, = struct.unpack_from('<H', body, 2)
+        value = body[4:]
+
+        if word == WORD_CONFIG_ENABLE:
+            self.config_mode = True
+            return self._ack(word, data=struct.pack('<HH', 1, MAX_BUFFER_SIZE))
+        if not self.config_mode:
+            # Commands outside config mode are ignored by the module
+            return None
+        if word == WORD_CONFIG_DISABLE:
+            self.config_mode = False
+            return self._ack(word)
+        if word == WORD_FIRMWARE_READ:
+            return self._ack(word, data=struct.pack('<HHI', *SIM_FIRMWARE))
+        if word == WORD_BAUD_RATE_SET:
+            self.baud_rate = value[:2].hex().upper()
+            return self._ack(word)
+        if word == WORD_FACTORY_RESET:
+            self.factory_reset()
+            return self._ack(word)
+        if word == WORD_RESTART:
+            self._ack(word)
+            self.config_mode = False
+            self.eng_mode = False
+            return None
+        if word == WORD_BT_SET:
+            self.bluetooth = bool(value[0])
+            return self._ack(word)
+        if word == WORD_BT_MAC_QUERY:
+            return self._ack(word, data=SIM_MAC)
+
+        if self.model == "LD2410":
+            if word == WORD_PARAM_READ:
+                return self._ack(word, data=bytes([0xAA, GATE_MAX, self.max_moving_gate, self.max_static_gate])
+                                 + bytes(self.moving_sens) + bytes(self.static_sens)
+                                 + struct.pack('<H', self.empty_timeout))
+            if word == WORD_PARAM_EDIT:
+                _, self.max_moving_gate, _, self.max_static_gate, _, self.empty_timeout = struct.unpack_from('<HIHIHI', value)
+                return self._ack(word)
+            if word == WORD_GATE_SENS_EDIT:
+                _, gate, _, moving, _, static = struct.unpack_from('<HIHIHI', value)
+                gates = range(GATE_MAX + 1) if gate == GATE_ALL else [gate]
+                for g in gates:
+                    self.moving_sens[g] = moving
+                    self.static_sens[g] = static
+                return self._ack(word)
+            if word == WORD_ENG_MODE_ENABLE:
+                self.eng_mode = True
+                return self._ack(word)
+            if word == WORD_ENG_MODE_DISABLE:
+                self.eng_mode = False
+                return self._ack(word)
+        else:
+            if word in (WORD_SINGLE_TARGET_TRACKING, WORD_MULTI_TARGET_TRACKING):
+                self.multi_target = word == WORD_MULTI_TARGET_TRACKING
+                return self._ack(word)
+            if word == WORD_TRACKING_QUERY:
+                return self._ack(word, data=struct.pack('<H', 2 if self.multi_target else 1))
+            if word == WORD_READ_REGION_FILTER:
+                return self._ack(word, data=struct.pack('<H', self.region_type) + self.regions)
+            if word == WORD_WRITE_REGION_FILTER:
+                self.region_type, = struct.unpack_from('<H', value)
+                self.regions = bytes(value[2:26])
+                return self._ack(word)
+
+        return self._ack(word, status=1)
+
+    def run(self):
+        interval = self.frame_interval()
+        next_emit = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            readable, _, _ = select.select([self._master], [], [], max(0, next_emit - now))
+            if readable:
+                try:
+                    data = os.read(self._master, 4096)
+                except (BlockingIOError, OSError):
+                    data = b""
+                self._commands.feed(data)
+                for body in self._commands.frames():
+                    self.handle_command(body)
+                    interval = self.frame_interval()
+
+            now = time.monotonic()
+            # Emit every frame that is due, in one go when running faster than the scheduler
+            while next_emit <= now and not self.config_mode:
+                self._emit()
+                next_emit += interval
+            if self.config_mode or next_emit < now - 1:
+                next_emit = now
+
+    def start(self):
+        logger.info(f"{self.model} simulator running on {self.port}")
+        self._stop_event.clear()
+        self._worker_thread = threading.Thread(target=self.run, daemon=True)
+        self._worker_thread.start()
+
+    def stop(self):
+        if self._worker_thread and self._worker_thread.is_alive():
+            self._stop_event.set()
+            self._worker_thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
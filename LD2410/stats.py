@@ -0,0 +1,114 @@
+from .radar_consts import *
+from bisect import bisect_left
+
+
+# Fixed bucket histogram, buckets are upper bounds in seconds
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds=STATS_LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Upper bound of the bucket holding the p-th percentile
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def as_dict(self):
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            cumulative.append((bound, seen))
+        cumulative.append((float("inf"), self.count))
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative,
+                "p50": self.percentile(50), "p99": self.percentile(99)}
+
+
+# Hot path counters and histograms of one radar, see Radar.enable_stats()
+#
+# parser is the radar's FrameParser. Its resync and tail counters run for the life of
+# the radar, so they are reported relative to their values here
+class RadarStats:
+    def __init__(self, parser=None):
+        self.resync_base = parser.resync_count if parser is not None else 0
+        self.tail_fail_base = parser.tail_fail_count if parser is not None else 0
+        self.bytes_read = 0
+        self.frames_decoded = 0
+        self.crc_failures = 0
+        self.serial_exceptions = 0
+        self.command_retries = 0
+        self.parse_time = Histogram()
+        self.frame_gap = Histogram(STATS_GAP_BUCKETS)
+        self.command_round_trip = Histogram()
+        self.last_frame_time = None
+
+    def frame_published(self, timestamp):
+        self.frames_decoded += 1
+        if self.last_frame_time is not None:
+            self.frame_gap.observe(timestamp - self.last_frame_time)
+        self.last_frame_time = timestamp
+
+    # parser is the FrameParser given to __init__, whose resync and tail counters are included
+    def as_dict(self, parser=None):
+        ret = {"bytes_read": self.bytes_read,
+               "frames_decoded": self.frames_decoded,
+               "crc_failures": self.crc_failures,
+               "resyncs": 0,
+               "serial_exceptions": self.serial_exceptions,
+               "command_retries": self.command_retries,
+               "parse_time": self.parse_time.as_dict(),
+               "frame_gap": self.frame_gap.as_dict(),
+               "command_round_trip": self.command_round_trip.as_dict()}
+        if parser is not None:
+            ret["crc_failures"] += parser.tail_fail_count - self.tail_fail_base
+            ret["resyncs"] = parser.resync_count - self.resync_base
+        return ret
+
+
+def _labels(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+# Prometheus text exposition of radar.stats() for each radar with stats enabled
+#
+#   print(to_prometheus([radar1, radar2]))
+def to_prometheus(radars, prefix="ld2410"):
+    samples = {}
+    for radar in radars:
+        stats = radar.stats()
+        if stats is None:
+            continue
+        labels = {"port": radar.port}
+        for name, value in stats.items():
+            if isinstance(value, dict):
+                rows = samples.setdefault((f"{prefix}_{name}_seconds", "histogram"), [])
+                for bound, count in value["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    rows.append(f"{prefix}_{name}_seconds_bucket{{{_labels(dict(labels, le=le))}}} {count}")
+                rows.append(f"{prefix}_{name}_seconds_sum{{{_labels(labels)}}} {value['sum']}")
+                rows.append(f"{prefix}_{name}_seconds_count{{{_labels(labels)}}} {value['count']}")
+            else:
+                rows = samples.setdefault((f"{prefix}_{name}_total", "counter"), [])
+                rows.append(f"{prefix}_{name}_total{{{_labels(labels)}}} {value}")
+
+    lines = []
+    for (name, kind), rows in samples.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(rows)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+from .radar_consts import *
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Backpressure policies
+POLICY_LATEST = "latest" # Only the newest frame is kept for the consumer
+POLICY_DROP_OLDEST = "drop_oldest" # Bounded queue, the oldest frame is dropped when full
+POLICY_BLOCK = "block" # Bounded queue, the radar waits for the consumer when full
+POLICIES = (POLICY_LATEST, POLICY_DROP_OLDEST, POLICY_BLOCK)
+
+
+# One consumer of a radar's frames, see Radar.subscribe()
+#
+# Frames are delivered as (seq, timestamp, data), the same tuple get_frame() returns.
+# A queue target receives the tuples directly. A callback target is called as
+# callback(seq, timestamp, data) from a delivery thread of its own, so a slow
+# callback never stalls the serial reads (unless the policy is POLICY_BLOCK).
+#
+# With change_only=True a frame is only delivered when changed(previous, data, threshold)
+# says it differs from the last delivered one, plus once every `heartbeat` seconds
+# if that is set.
+class Subscription:
+    def __init__(self, target, policy=POLICY_DROP_OLDEST, queue_size=SUBSCRIBE_QUEUE_SIZE,
+                 change_only=False, changed=None, threshold=0, heartbeat=None):
+        if policy not in POLICIES:
+            raise Exception(f"Unknown policy {policy}, pick one of {POLICIES}")
+        if change_only and changed is None:
+            raise Exception("change_only needs a changed(previous, data, threshold) function")
+        self.policy = policy
+        self.change_only = change_only
+        self.changed = changed
+        self.threshold = threshold
+        self.heartbeat = heartbeat
+        self.delivered = 0
+        self.dropped = 0
+        self.suppressed = 0 # Frames skipped by change_only
+
+        self._last_data = None
+        self._last_time = None
+        self._closed = False
+        self._worker_thread = None
+
+        if callable(target):
+            self.callback = target
+            self.queue = queue.Queue(1 if policy == POLICY_LATEST else queue_size)
+            self._worker_thread = threading.Thread(target=self._deliver, daemon=True)
+            self._worker_thread.start()
+        else:
+            self.callback = None
+            self.queue = target
+
+    # Called by the radar with every published frame
+    def offer(self, frame):
+        if self._closed:
+            return
+        if self.change_only:
+            seq, timestamp, data = frame
+            if self._last_time is not None and not self.changed(self._last_data, data, self.threshold) \
+                    and (self.heartbeat is None or timestamp - self._last_time < self.heartbeat):
+                self.suppressed += 1
+                return
+            self._last_data = data
+            self._last_time = timestamp
+        self._put(frame)
+        self.delivered += 1
+
+    def _put(self, item):
+        if self.policy == POLICY_BLOCK:
+            self.queue.put(item)
+            return
+        if self.policy == POLICY_LATEST:
+            # Anything still waiting is stale now
+            self._drain()
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _drain(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+                self.dropped += 1
+        except queue.Empty:
+            pass
+
+    def _deliver(self):
+        while True:
+            item = self.queue.get()
+            if item is None or self._closed:
+                return
+            try:
+                self.callback(*item)
+            except Exception:
+                logger.exception("Subscriber callback failed")
+
+    # Stop delivering. A callback's delivery thread exits without running the frames still
+    # queued, unless wait=True, which delivers them first
+    def close(self, wait=False):
+        if wait and self._worker_thread is not None and self._worker_thread is not threading.current_thread():
+            self.queue.put(None) # Queued behind the frames still waiting
+            self._worker_thread.join()
+            self._closed = True
+            return
+        self._closed = True
+        if self._worker_thread is not None:
+            while True:
+                self._drain()
+                try:
+                    self.queue.put_nowait(None)
+                    break
+                except queue.Full:
+                    pass # A frame being offered concurrently got in first
+            if self._worker_thread is not threading.current_thread():
+                self._worker_thread.join()
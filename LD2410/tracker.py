@@ -0,0 +1,223 @@
+from .ld2450_consts import *
+from itertools import permutations
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# One tracked target
+#
+# Position (x, y) in mm and velocity (vx, vy) in mm/s are the Kalman filtered estimates.
+# Both axes follow the same constant velocity model with the same noise, so they share
+# one 2x2 covariance (p11, p12, p22).
+class Track:
+    __slots__ = ("id", "x", "y", "vx", "vy", "p11", "p12", "p22", "hits", "misses", "last_time", "zones")
+
+    def __init__(self, track_id, x, y, timestamp, measurement_noise=TRACK_MEASUREMENT_NOISE,
+                 velocity_variance=TRACK_INITIAL_VELOCITY_VARIANCE):
+        self.id = track_id
+        self.x = x
+        self.y = y
+        self.vx = 0.0
+        self.vy = 0.0
+        self.p11 = measurement_noise
+        self.p12 = 0.0
+        self.p22 = velocity_variance
+        self.hits = 1
+        self.misses = 0
+        self.last_time = timestamp
+        self.zones = set() # Zones the track is currently in
+
+    # Predicted position at timestamp, without changing the track
+    def predict_position(self, timestamp):
+        dt = timestamp - self.last_time
+        return self.x + self.vx * dt, self.y + self.vy * dt
+
+    # Move the state and covariance forward to timestamp
+    def predict(self, timestamp, process_noise):
+        dt = timestamp - self.last_time
+        if dt <= 0:
+            return
+        dt2 = dt * dt
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.p11 += 2 * dt * self.p12 + dt2 * self.p22 + process_noise * dt2 * dt2 / 4
+        self.p12 += dt * self.p22 + process_noise * dt2 * dt / 2
+        self.p22 += process_noise * dt2
+        self.last_time = timestamp
+
+    # Correct the predicted state with a measured position
+    def correct(self, x, y, measurement_noise):
+        s = self.p11 + measurement_noise
+        k1 = self.p11 / s
+        k2 = self.p12 / s
+        dx = x - self.x
+        dy = y - self.y
+        self.x += k1 * dx
+        self.y += k1 * dy
+        self.vx += k2 * dx
+        self.vy += k2 * dy
+        self.p22 -= k2 * self.p12
+        self.p11 *= 1 - k1
+        self.p12 *= 1 - k1
+        self.hits += 1
+        self.misses = 0
+
+    def __repr__(self):
+        return f"Track({self.id}, x={self.x:.0f}, y={self.y:.0f}, vx={self.vx:.0f}, vy={self.vy:.0f})"
+
+
+# A target entering or leaving a zone
+class TrackEvent:
+    __slots__ = ("kind", "timestamp", "track_id", "zone", "x", "y")
+
+    def __init__(self, kind, timestamp, track_id, zone, x, y):
+        self.kind = kind # TRACK_ENTER or TRACK_EXIT
+        self.timestamp = timestamp
+        self.track_id = track_id
+        self.zone = zone
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f"TrackEvent({self.kind!r}, {self.timestamp}, track={self.track_id}, zone={self.zone!r}, x={self.x:.0f}, y={self.y:.0f})"
+
+
+# Lowest cost assignment of detections to tracks
+#
+# cost[t][d] is the distance from track t to detection d, None where it is outside the
+# gate. Returns (track index, detection index) pairs. Small problems (the LD2450 reports
+# at most 3 targets) are solved exhaustively, which gives the same result as the
+# Hungarian method, larger ones greedily by nearest neighbour.
+def associate(cost, n_detections, gate, optimal_max=TRACK_OPTIMAL_MAX):
+    n_tracks = len(cost)
+    if not n_tracks or not n_detections:
+        return []
+
+    if max(n_tracks, n_detections) > optimal_max:
+        pairs = sorted((c, t, d) for t, row in enumerate(cost) for d, c in enumerate(row) if c is not None)
+        used_tracks = set()
+        used_detections = set()
+        ret = []
+        for c, t, d in pairs:
+            if t not in used_tracks and d not in used_detections:
+                used_tracks.add(t)
+                used_detections.add(d)
+                ret.append((t, d))
+        return ret
+
+    # Pad to a square problem, an unassigned track or detection costs the gate distance
+    size = max(n_tracks, n_detections)
+    best = None
+    best_cost = None
+    for assignment in permutations(range(size), n_tracks):
+        total = 0
+        for t, d in enumerate(assignment):
+            c = cost[t][d] if d < n_detections else None
+            total += gate if c is None else c
+        if best_cost is None or total < best_cost:
+            best_cost = total
+            best = assignment
+    return [(t, d) for t, d in enumerate(best) if d < n_detections and cost[t][d] is not None]
+
+
+# Gives LD2450 targets persistent IDs across frames
+#
+# Each frame the existing tracks are predicted to the frame time, matched to the
+# reported targets (at most TRACK_GATE mm away) and corrected with a Kalman filter.
+# Unmatched targets start new tracks, which are reported once they were seen
+# min_hits times. Tracks without a match for more than max_misses frames are dropped.
+#
+# zones maps a zone name to a Region (ld2450.Region), or is a RegionFilter whose
+# non-empty regions become zones 0, 1 and 2. A confirmed track moving into or out of a zone
+# causes a TrackEvent. update() returns the events a frame caused and calls
+# callback(event) for each of them. The per-frame work only depends on the (at most 3)
+# targets in the frame.
+#
+# Usage:
+#   tracker = TargetTracker(zones=radar.read_region_filter(), callback=print)
+#   tracker.update(timestamp, radar.get_radar_data())
+#   tracker.confirmed() -> [Track(1, x=..., y=..., vx=..., vy=...)]
+class TargetTracker:
+    def __init__(self, zones=None, callback=None, gate=TRACK_GATE, min_hits=TRACK_MIN_HITS,
+                 max_misses=TRACK_MAX_MISSES, measurement_noise=TRACK_MEASUREMENT_NOISE,
+                 process_noise=TRACK_PROCESS_NOISE):
+        if zones is not None and not isinstance(zones, dict):
+            zones = {i: region for i, region in enumerate(zones.regions) if not region.is_empty()}
+        self.zones = zones or {}
+        self.callback = callback
+        self.gate = gate
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.measurement_noise = measurement_noise
+        self.process_noise = process_noise
+
+        self.tracks = []
+        self.next_id = 1
+        self._lock = threading.Lock()
+
+    # Tracks seen often enough to be reported
+    def confirmed(self):
+        return [track for track in self.tracks if track.hits >= self.min_hits and not track.misses]
+
+    def _zone_events(self, track, timestamp, zones, events):
+        for zone in track.zones - zones:
+            events.append(TrackEvent(TRACK_EXIT, timestamp, track.id, zone, track.x, track.y))
+        for zone in zones - track.zones:
+            events.append(TrackEvent(TRACK_ENTER, timestamp, track.id, zone, track.x, track.y))
+        track.zones = zones
+
+    # targets is a decoded LD2450 frame: 3 (x, y, speed, resolution, distance) tuples
+    def update(self, timestamp, targets):
+        detections = [(t[0], t[1]) for t in targets if t[4]]
+        events = []
+        with self._lock:
+            gate = self.gate
+            cost = []
+            for track in self.tracks:
+                px, py = track.predict_position(timestamp)
+                row = []
+                for x, y in detections:
+                    d = ((x - px) ** 2 + (y - py) ** 2) ** 0.5
+                    row.append(d if d <= gate else None)
+                cost.append(row)
+
+            matched_tracks = set()
+            matched_detections = set()
+            for t, d in associate(cost, len(detections), gate):
+                track = self.tracks[t]
+                track.predict(timestamp, self.process_noise)
+                track.correct(*detections[d], self.measurement_noise)
+                matched_tracks.add(t)
+                matched_detections.add(d)
+
+            survivors = []
+            for t, track in enumerate(self.tracks):
+                if t not in matched_tracks:
+                    track.misses += 1
+                    if track.misses > self.max_misses:
+                        # Lost, leave every zone it was in
+                        self._zone_events(track, timestamp, set(), events)
+                        continue
+                survivors.append(track)
+            for d, (x, y) in enumerate(detections):
+                if d not in matched_detections:
+                    survivors.append(Track(self.next_id, x, y, timestamp, self.measurement_noise))
+                    self.next_id += 1
+            self.tracks = survivors
+
+            if self.zones:
+                for track in self.tracks:
+                    if track.hits >= self.min_hits and not track.misses:
+                        inside = set(name for name, region in self.zones.items() if region.contains(track.x, track.y))
+                        if inside != track.zones:
+                            self._zone_events(track, timestamp, inside, events)
+
+        if self.callback is not None:
+            for event in events:
+                try:
+                    self.callback(event)
+                except Exception:
+                    logger.exception("Tracker callback failed")
+        return events
@@ -0,0 +1,531 @@
+from LD2410.frame_parser import FrameParser
+from LD2410.ld2410 import LD2410, LD2410Frame
+from LD2410.ld2450 import LD2450
+from LD2410.recording import Recorder, ReplaySerial
+from LD2410.pipeline import RadarPipeline, PipelineConsumer
+from LD2410.export import FrameExporter
+from LD2410.aggregate import FrameAggregator, FrameSummary
+from LD2410.simulator import RadarSimulator
+from LD2410.tracker import TargetTracker
+from LD2410.commands import *
+from LD2410.radar_consts import *
+from LD2410.ld2410_consts import *
+from LD2410.ld2450_consts import *
+from array import array
+from collections import deque
+from functools import partial
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+# Serial stand-in that plays back a byte stream, handing out at most chunk_size
+# bytes per read to mimic what a UART delivers between polls
+class StreamSerial:
+    def __init__(self, data, chunk_size=64):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk_size, len(self.data) - self.pos)
+
+    def read(self, size=1):
+        ret = self.data[self.pos:self.pos + size]
+        self.pos += len(ret)
+        return ret
+
+
+# Build a byte stream of LD2410 frames with some line noise in between
+def make_ld2410_stream(frames, eng_mode=True, noise=0.05):
+    rnd = random.Random(0)
+    header = bytes.fromhex(REF_READ_HEADER)
+    tail = bytes.fromhex(REF_READ_TAIL)
+    out = bytearray()
+    for i in range(frames):
+        if eng_mode:
+            payload = bytes([0x01, 0xAA, 3]) + struct.pack('<HBHBH', i & 0xFFFF, 50, 120, 40, 130) \
+                    + bytes([8, 8]) + bytes(rnd.randrange(100) for _ in range(18)) + bytes(2) + b'\x55\x00'
+        else:
+            payload = bytes([0x02, 0xAA, 3]) + struct.pack('<HBHBH', i & 0xFFFF, 50, 120, 40, 130) + b'\x55\x00'
+        out += header + struct.pack('<H', len(payload)) + payload + tail
+        if rnd.random() < noise:
+            out += bytes(rnd.randrange(256) for _ in range(rnd.randrange(1, 8)))
+    return bytes(out)
+
+
+# Build a byte stream of LD2450 frames
+def make_ld2450_stream(frames):
+    header = bytes.fromhex(REF_DATA_HEADER)
+    tail = bytes.fromhex(REF_DATA_CRC)
+    out = bytearray()
+    for i in range(frames):
+        targets = struct.pack('<HHHH', 0x8000 | (i % 500), 0x8000 | 1000, 0x8000 | 10, 320) + bytes(16)
+        out += header + targets + tail
+    return bytes(out)
+
+
+# The pre-FrameParser LD2410 read loop, kept as the baseline
+def legacy_ld2410_frames(ser, eng_mode):
+    read_len = REF_ENG_MODE_PACKET_LEN if eng_mode else REF_NORMAL_PACKET_LEN
+    count = 0
+    while True:
+        buffer = deque(maxlen=4)
+        while b"".join(list(buffer)) != bytes.fromhex(REF_READ_HEADER):
+            b = ser.read()
+            if not b:
+                return count
+            buffer.append(b)
+        if len(ser.read(read_len)) == read_len:
+            count += 1
+
+
+# The pre-struct LD2410 decoder, kept as the baseline
+def legacy_ld2410_decode(ret):
+    move_energies = None
+    static_energies = None
+    target_type = ret[REF_TARGET_TYPE]
+    moving_target_dist = int(bytes(reversed(ret[REF_TARGET_MOVE_DIST_HEAD:REF_TARGET_MOVE_DIST_TAIL+1])).hex(), 16)
+    moving_target_energy = ret[REF_TARGET_MOVE_ENERGY]
+    static_target_dist = int(bytes(reversed(ret[REF_TARGET_STATIC_DIST_HEAD:REF_TARGET_STATIC_DIST_TAIL+1])).hex(), 16)
+    static_target_energy = ret[REF_TARGET_STATIC_ENERGY]
+    detection_dist = ret[REF_DETECT_DIST]
+    standard_frame = [target_type, moving_target_dist, moving_target_energy, static_target_dist, static_target_energy, detection_dist]
+    f"Returning dataframes {standard_frame}, {move_energies}, {static_energies}"
+    if ret[REF_ENG_CHECK_IDX] == REF_ENG_CHECK:
+        move_energies = [int(byte) for byte in ret[REF_MOVING_GATE_ENERGY_0:REF_MOVING_GATE_ENERGY_8+1]]
+        static_energies = [int(byte) for byte in ret[REF_STATIC_GATE_ENERGY_0:REF_STATIC_GATE_ENERGY_8+1]]
+    return standard_frame, move_energies, static_energies
+
+
+def ld2410_bodies(count, eng_mode):
+    parser = FrameParser(REF_READ_HEADER, REF_READ_TAIL)
+    parser.feed(make_ld2410_stream(count, eng_mode=eng_mode, noise=0))
+    return list(parser.frames())
+
+
+def decode_all(decode, bodies):
+    for body in bodies:
+        decode(body)
+    return len(bodies)
+
+
+def parser_frames(ser, parser):
+    count = 0
+    while True:
+        chunk = ser.read(ser.in_waiting or 1)
+        if not chunk:
+            return count
+        parser.feed(chunk)
+        for _ in parser.frames():
+            count += 1
+
+
+def run(name, func, size):
+    start = time.perf_counter()
+    frames = func()
+    elapsed = time.perf_counter() - start
+    line = f"{name:<24} {frames:>8} frames  {frames / elapsed:>12,.0f} frames/s"
+    if size:
+        line += f"  {size / elapsed / 1e6:>8.2f} MB/s"
+    print(line)
+
+
+def bench_parser(args):
+    if args.file:
+        with open(args.file, "rb") as f:
+            stream = f.read()
+    else:
+        stream = make_ld2410_stream(args.frames, eng_mode=True)
+    run("legacy LD2410", lambda: legacy_ld2410_frames(StreamSerial(stream), True), len(stream))
+    run("FrameParser LD2410", lambda: parser_frames(StreamSerial(stream), FrameParser(REF_READ_HEADER, REF_READ_TAIL)), len(stream))
+
+    stream = make_ld2450_stream(args.frames)
+    run("FrameParser LD2450", lambda: parser_frames(StreamSerial(stream), FrameParser(REF_DATA_HEADER, REF_DATA_CRC, payload_len=REF_DATA_PAYLOAD_LEN)), len(stream))
+
+
+def bench_decode(args):
+    for eng_mode in (False, True):
+        bodies = ld2410_bodies(args.frames, eng_mode)
+        mode = "engineering" if eng_mode else "normal"
+        run(f"legacy {mode}", lambda: decode_all(legacy_ld2410_decode, bodies), 0)
+        run(f"struct {mode}", lambda: decode_all(LD2410.decode_frame, bodies), 0)
+
+
+def replay_frames(radar):
+    count = 0
+    while True:
+        ret = radar.read_frame()
+        if ret is not None:
+            radar.parse_frame(ret)
+            count += 1
+        elif radar.ser.at_end():
+            return count
+
+
+def bench_replay(args):
+    cls = LD2450 if args.ld2450 else LD2410
+    for stats in (False, True):
+        radar = cls(ReplaySerial(args.file, realtime=False, timeout=0), verbosity=logging.WARNING)
+        if stats:
+            radar.enable_stats()
+        run(f"replay {cls.__name__}{' +stats' if stats else ''}", lambda: replay_frames(radar), os.path.getsize(args.file))
+        radar.ser.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else float("nan")
+
+
+# Frames/s and emission -> get_data() latency against the pty simulator
+def bench_sim(args):
+    baud_rate = {baud: param for param, baud in BAUD_LOOKUP.items()}[args.baud]
+    sim = RadarSimulator(args.model, rate=args.rate, baud_rate=baud_rate, eng_mode=args.eng,
+                         corruption=args.corruption, truncation=args.truncation, seed=0)
+    latencies = array('d')
+
+    # Frames become visible to get_data() when they are published
+    class TimedRadar(LD2450 if args.model == "LD2450" else LD2410):
+        def publish(self, data):
+            super().publish(data)
+            counter = data[0][3] if args.model == "LD2450" else data.moving_target_dist
+            latency = self._latest[1] - sim.emit_times[counter]
+            if 0 <= latency < 1: # Corrupted counters match the wrong emission
+                latencies.append(latency)
+
+    sim.start()
+    radar = TimedRadar(sim.port, baud_rate=baud_rate, verbosity=logging.WARNING)
+    radar.start()
+    start_count = sim.frame_count
+    start_seq = radar.get_frame()[0]
+    latencies_start = len(latencies)
+    time.sleep(args.duration)
+    sent = sim.frame_count - start_count
+    received = radar.get_frame()[0] - start_seq
+    radar.stop()
+    sim.close()
+
+    measured = [v * 1000 for v in latencies[latencies_start:]]
+    print(f"{args.model} at {args.rate} Hz for {args.duration}s: sent {sent / args.duration:,.0f} frames/s, "
+          f"received {received / args.duration:,.0f} frames/s")
+    print(f"latency p50 {percentile(measured, 50):.3f} ms  p99 {percentile(measured, 99):.3f} ms  "
+          f"max {max(measured, default=float('nan')):.3f} ms  resyncs {radar.parser.resync_count}")
+
+
+# Decoded LD2450 frames of 3 targets walking around a room, with position noise and
+# slots that occasionally come back empty
+def make_ld2450_scene(frames, interval, noise=50, dropout=0.05):
+    walkers = [[random.uniform(-2000, 2000), random.uniform(500, 5000),
+                random.uniform(-800, 800), random.uniform(-800, 800)] for _ in range(3)]
+    scene = []
+    for _ in range(frames):
+        targets = []
+        for w in walkers:
+            w[0] += w[2] * interval
+            w[1] += w[3] * interval
+            if not -3000 < w[0] < 3000:
+                w[2] = -w[2]
+            if not 300 < w[1] < 6000:
+                w[3] = -w[3]
+            if random.random() < dropout:
+                targets.append((0, 0, 0, 0, 0))
+                continue
+            x = int(w[0] + random.gauss(0, noise))
+            y = int(w[1] + random.gauss(0, noise))
+            targets.append((x, y, 0, 360, (x*x + y*y) ** 0.5))
+        random.shuffle(targets) # Slots are not stable on the module either
+        scene.append(targets)
+    return scene
+
+
+def bench_tracker(args):
+    interval = 1 / args.rate
+    scenes = [make_ld2450_scene(args.frames, interval) for _ in range(args.sensors)]
+    trackers = [TargetTracker() for _ in range(args.sensors)]
+
+    start = time.perf_counter()
+    for i in range(args.frames):
+        timestamp = i * interval
+        for tracker, scene in zip(trackers, scenes):
+            tracker.update(timestamp, scene[i])
+    elapsed = time.perf_counter() - start
+
+    total = args.frames * args.sensors
+    ids = sum(tracker.next_id - 1 for tracker in trackers) / args.sensors
+    print(f"{args.sensors} sensors x {args.frames} frames: {total / elapsed:,.0f} frames/s, "
+          f"{elapsed / total * 1e6:.1f} us/frame, {total / elapsed / args.rate:,.0f} sensors in real time at {args.rate:g} Hz")
+    print(f"track IDs per sensor {ids:.1f} (3 targets)")
+
+
+# Consumer process of the pipeline benchmark, reads every ring until the readers are done
+def pipeline_consumer(spec, done, results):
+    consumer = PipelineConsumer(spec, from_start=True)
+    while True:
+        finished = done.is_set()
+        if not consumer.poll() and finished:
+            break
+    results.put((consumer.received, consumer.dropped))
+    consumer.close()
+
+
+def bench_pipeline(args):
+    path = os.path.abspath(f"pipeline-bench-{os.getpid()}{RECORDING_EXTENSION}")
+    stream = make_ld2410_stream(args.frames, eng_mode=True)
+    recorder = Recorder(path)
+    for i in range(0, len(stream), 4096):
+        recorder.write(stream[i:i+4096])
+    recorder.close()
+    logging.getLogger("LD2410").setLevel(logging.ERROR)
+
+    counts = []
+    count = 1
+    while count < args.max_processes:
+        counts.append(count)
+        count *= 2
+    counts.append(args.max_processes)
+
+    print(f"{args.ports} replayed ports x {args.frames} frames, {os.cpu_count()} CPUs")
+    try:
+        base = None
+        for processes in counts:
+            ports = [partial(ReplaySerial, path, realtime=False, timeout=0)] * args.ports
+            pipeline = RadarPipeline(ports, processes=processes, ring_size=args.ring_size)
+            done = multiprocessing.Event()
+            results = multiprocessing.Queue()
+            consumer = multiprocessing.Process(target=pipeline_consumer, args=(pipeline.spec(), done, results))
+            consumer.start()
+
+            start = time.perf_counter()
+            pipeline.start()
+            pipeline.join()
+            elapsed = time.perf_counter() - start
+            written = sum(ring.head() for ring in pipeline.rings)
+            done.set()
+            received, dropped = results.get()
+            consumer.join()
+            pipeline.close()
+
+            rate = written / elapsed
+            base = base or rate
+            print(f"{processes:>3} reader processes  {rate:>12,.0f} frames/s  x{rate / base:4.2f}  "
+                  f"consumed {received}, dropped {dropped}")
+    finally:
+        os.remove(path)
+
+
+# Peak traced memory in MB and frames/s of func(frames)
+def measure(func, frames):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(frames)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6, len(frames) / elapsed
+
+
+def bench_export(args):
+    frames = [LD2410.decode_frame(body) for body in ld2410_bodies(args.frames, eng_mode=True)]
+
+    def as_dicts(frames):
+        rows = []
+        for i, frame in enumerate(frames):
+            standard, move_energies, static_energies = frame.as_tuple()
+            rows.append({"timestamp": float(i), "standard": standard, "move_energies": move_energies,
+                         "static_energies": static_energies})
+        return rows
+
+    peak, rate = measure(as_dicts, frames)
+    print(f"{'dicts in memory':<20} {rate:>10,.0f} frames/s  peak {peak:8.1f} MB")
+    with tempfile.TemporaryDirectory() as directory:
+        for format in args.formats:
+            def export(frames):
+                with FrameExporter(os.path.join(directory, f"frames.{format}"), format=format,
+                                   chunk_rows=args.chunk_rows) as exporter:
+                    for i, frame in enumerate(frames):
+                        exporter.append(float(i), frame)
+            try:
+                peak, rate = measure(export, frames)
+            except Exception as e:
+                print(f"{format:<20} skipped: {e}")
+                continue
+            print(f"{format:<20} {rate:>10,.0f} frames/s  peak {peak:8.1f} MB")
+
+
+# An hour-like LD2410 scene: the room stays empty, someone walks in, sits still and leaves again
+def make_ld2410_scene(frames, interval, visits=4):
+    rnd = random.Random(0)
+    period = frames // visits
+    scene = []
+    for i in range(frames):
+        phase = (i % period) / period
+        if phase < 0.3 or phase >= 0.8:
+            target_type, dist = 0, 0
+        elif phase < 0.35:
+            target_type, dist = 1, int(600 - (phase - 0.3) / 0.05 * 450) # Walking in
+        elif phase < 0.75:
+            target_type, dist = 2 if rnd.random() < 0.9 else 3, 150 + rnd.randrange(-10, 11) # Sitting
+        else:
+            target_type, dist = 1, int(150 + (phase - 0.75) / 0.05 * 450) # Leaving
+        gate = min(dist // 75, GATE_MAX)
+        move = bytes(min(100, rnd.randrange(0, 15) + (60 if target_type & 1 and g == gate else 0)) for g in range(9))
+        static = bytes(min(100, rnd.randrange(0, 15) + (50 if target_type & 2 and g == gate else 0)) for g in range(9))
+        scene.append(LD2410Frame(target_type, dist, move[gate], dist, static[gate], dist, move, static))
+    return scene
+
+
+# Frames of a window that fall outside the bounds of its (packed and unpacked) summary
+def summary_violations(summary, frames):
+    violations = 0
+    for frame in frames:
+        if frame.target_type and not summary.nearest_dist <= frame.detection_dist <= summary.farthest_dist:
+            violations += 1
+        for energies, means, errors in ((frame.move_energies, summary.move_energy_mean, summary.move_energy_error),
+                                        (frame.static_energies, summary.static_energy_mean, summary.static_energy_error)):
+            violations += sum(abs(energy - mean) > error for energy, mean, error in zip(energies, means, errors))
+    return violations
+
+
+def bench_aggregate(args):
+    interval = 1 / args.rate
+    scene = make_ld2410_scene(args.frames, interval)
+    frame_size = len(make_ld2410_stream(1, eng_mode=True, noise=0))
+
+    aggregator = FrameAggregator(window=args.window, heartbeat=args.heartbeat, active_hold=args.active_hold)
+    summaries = []
+    window = []
+    violations = 0
+    start = time.perf_counter()
+    for i, frame in enumerate(scene):
+        window.append(frame)
+        summary = aggregator.update(i * interval, frame)
+        if summary is not None:
+            summaries.append(summary)
+            if args.check:
+                violations += summary_violations(summary, window)
+                violations += summary_violations(FrameSummary.unpack(summary.pack()), window)
+            window = []
+    elapsed = time.perf_counter() - start
+
+    packed = sum(len(summary.pack()) for summary in summaries)
+    reasons = {reason: sum(summary.reason == reason for summary in summaries) for reason in SUMMARY_REASONS}
+    errors = [error for summary in summaries for error in summary.move_energy_error + summary.static_energy_error]
+    print(f"{args.frames} frames ({args.frames * interval / 60:.0f} min at {args.rate:g} Hz): "
+          f"{args.frames / elapsed:,.0f} frames/s, {elapsed / args.frames * 1e6:.1f} us/frame")
+    print(f"{len(summaries)} summaries ({', '.join(f'{count} {reason}' for reason, count in reasons.items() if count)}), "
+          f"{args.frames / max(1, len(summaries)):.0f} frames per summary")
+    print(f"uplink {packed:,} bytes against {args.frames * frame_size:,} raw, {args.frames * frame_size / max(1, packed):.0f}x smaller")
+    print(f"energy error bound mean {sum(errors) / max(1, len(errors)):.1f}, max {max(errors, default=0):.1f}")
+    if args.check:
+        print(f"frames outside their summary bounds: {violations}")
+        if violations:
+            sys.exit(1)
+
+
+# Times the struct encoder against the hex string reference encoder in tests/test_commands.py,
+# on that module's test cases. Those tests check that both give the same bytes
+def bench_encoder(args):
+    from tests import test_commands as ref # Imports pytest, like the test suite
+    logging.getLogger("LD2410").setLevel(logging.ERROR) # Gate 0/1 warnings
+    bauds = [(b, int.from_bytes(bytes.fromhex(b), 'little')) for b in PARAM_ACCEPTABLE_BAUDS]
+    cases = [
+        ("gate sensitivity", [(partial(ref.legacy_gate_sensitivity, *a), partial(LD2410.gate_sensitivity_command, *a))
+                              for a in ref.SENSITIVITIES]),
+        ("detection params", [(partial(ref.legacy_detection_params, *a), partial(LD2410.detection_params_command, *a))
+                              for a in ref.DETECTION_PARAMS_VALUES]),
+        ("region filter", [(partial(ref.legacy_region_filter, *a), partial(LD2450.region_filter_command, *a))
+                           for a in ref.REGION_FILTERS]),
+        ("baud rate", [(partial(ref.legacy_frame_wrapper, CMD_BAUD_RATE_SET + b), partial(BAUD_RATE_SET.encode, value))
+                       for b, value in bauds]),
+        ("constant frames", [(partial(ref.legacy_frame_wrapper, c), partial(command_frame, c)) for c, _ in ref.CONSTANT_FRAMES]),
+    ]
+    for name, calls in cases:
+        calls = calls * max(1, args.commands // len(calls))
+        legacy_time = min(timeit_calls([legacy for legacy, _ in calls]) for _ in range(3))
+        new_time = min(timeit_calls([new for _, new in calls]) for _ in range(3))
+        print(f"{name:<18} {len(calls):>7} commands  legacy {legacy_time / len(calls) * 1e6:6.2f} us  "
+              f"struct {new_time / len(calls) * 1e6:6.2f} us")
+
+
+def timeit_calls(calls):
+    start = time.perf_counter()
+    for call in calls:
+        call()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LD2410/LD2450 driver benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("parser", help="Frame parser throughput on a recorded or synthetic byte stream")
+    p.add_argument("--file", help="Raw serial capture to parse instead of a synthetic stream")
+    p.add_argument("--frames", type=int, default=50000)
+    p.set_defaults(func=bench_parser)
+
+    p = sub.add_parser("decode", help="LD2410 frame decoding, legacy vs struct based")
+    p.add_argument("--frames", type=int, default=200000)
+    p.set_defaults(func=bench_decode)
+
+    p = sub.add_parser("replay", help="Full driver read path over a .ldrec recording, as fast as possible")
+    p.add_argument("file")
+    p.add_argument("--ld2450", action="store_true", help="The recording is from an LD2450")
+    p.set_defaults(func=bench_replay)
+
+    p = sub.add_parser("sim", help="End-to-end frames/s and latency against the pty simulator")
+    p.add_argument("--model", choices=("LD2410", "LD2450"), default="LD2410")
+    p.add_argument("--rate", type=float, default=1000, help="Frames per second to emit")
+    p.add_argument("--baud", type=int, default=460800, choices=list(BAUD_LOOKUP.values()))
+    p.add_argument("--eng", action="store_true", help="Emit engineering mode frames")
+    p.add_argument("--corruption", type=float, default=0.0)
+    p.add_argument("--truncation", type=float, default=0.0)
+    p.add_argument("--duration", type=float, default=3)
+    p.set_defaults(func=bench_sim)
+
+    p = sub.add_parser("tracker", help="LD2450 multi-target tracker throughput over simulated sensors")
+    p.add_argument("--sensors", type=int, default=50)
+    p.add_argument("--frames", type=int, default=2000, help="Frames per sensor")
+    p.add_argument("--rate", type=float, default=10, help="Frames per second of one sensor")
+    p.set_defaults(func=bench_tracker)
+
+    p = sub.add_parser("pipeline", help="Multiprocess pipeline throughput as reader processes are added")
+    p.add_argument("--ports", type=int, default=8, help="Replayed ports, spread over the reader processes")
+    p.add_argument("--frames", type=int, default=20000, help="Frames per port")
+    p.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--ring-size", type=int, default=65536)
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("export", help="Columnar export throughput and peak memory against per-frame dicts")
+    p.add_argument("--frames", type=int, default=200000)
+    p.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    p.add_argument("--formats", nargs="+", default=list(EXPORT_FORMATS), choices=EXPORT_FORMATS)
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("aggregate", help="Adaptive aggregation: summaries, uplink bytes and error bounds over a synthetic scene")
+    p.add_argument("--frames", type=int, default=36000)
+    p.add_argument("--rate", type=float, default=10, help="Frames per second")
+    p.add_argument("--window", type=float, default=AGGREGATE_WINDOW)
+    p.add_argument("--heartbeat", type=float, default=AGGREGATE_HEARTBEAT)
+    p.add_argument("--active-hold", type=float, default=AGGREGATE_ACTIVE_HOLD)
+    p.add_argument("--no-check", dest="check", action="store_false", help="Skip checking every frame against its summary")
+    p.set_defaults(func=bench_aggregate)
+
+    p = sub.add_parser("encoder", help="Binary command encoder against the hex string encoder of the tests")
+    p.add_argument("--commands", type=int, default=20000, help="Commands per command type, the test cases repeated")
+    p.set_defaults(func=bench_encoder)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
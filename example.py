@@ -5,6 +5,7 @@ import time
 
 
 def main():
+    logging.basicConfig() # The driver logs through the "LD2410" logger, verbosity below sets its level
     radar = LD2450("/dev/ttyUSB0", PARAM_BAUD_256000, verbosity=logging.DEBUG) # Set desired level of verbosity [DEBUG, INFO, WARNING]
     
     # Get Radar Firmware version
@@ -35,6 +36,11 @@ def main():
     for _ in range(3):
         print(radar.get_data()) # The right 2 arrays will be blank since we are polling in standard mode
         time.sleep(1)
+
+    # Or have every frame pushed to you, here only when a target appears, leaves or moves by more than 100mm
+    subscription = radar.subscribe(lambda seq, timestamp, data: print(seq, data), change_only=True, threshold=100)
+    time.sleep(3)
+    radar.unsubscribe(subscription)
     # Get data in engineering mode
 
     # radar.enable_engineering_mode()
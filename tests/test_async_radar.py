@@ -0,0 +1,31 @@
+import asyncio
+import os
+
+import pytest
+
+
+# The simulator's end of the pseudo terminal goes away, as when a USB adapter is unplugged
+async def unplug_while_reading():
+    from LD2410 import AsyncLD2410
+    from LD2410.simulator import RadarSimulator
+    sim = RadarSimulator("LD2410", rate=50)
+    sim.start()
+    async with AsyncLD2410(sim.port) as radar:
+        radar.enable_stats()
+        frames = 0
+        with pytest.raises(OSError):
+            async for _ in radar.frames():
+                frames += 1
+                if frames == 3:
+                    sim.stop()
+                    os.close(sim._master)
+        await asyncio.sleep(0.1) # The loop must not keep calling the reader
+        assert radar.metrics.serial_exceptions == 1
+        with pytest.raises(OSError):
+            await radar.read_firmware_version()
+    os.close(sim._slave)
+
+
+def test_frames_raise_when_the_port_dies():
+    pytest.importorskip("termios") # The simulator needs a pseudo terminal
+    asyncio.run(asyncio.wait_for(unplug_while_reading(), 10))
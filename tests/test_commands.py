@@ -0,0 +1,124 @@
+import random
+import struct
+
+import pytest
+
+from LD2410.commands import *
+from LD2410.ld2410 import LD2410
+from LD2410.ld2450 import LD2450
+from LD2410.radar_consts import *
+from LD2410.ld2410_consts import *
+from LD2410.ld2450_consts import *
+
+
+# The hex string command encoder the drivers used before commands.py, kept as the reference
+def legacy_frame_wrapper(command):
+    return bytes.fromhex(CMD_HEADER + command + CMD_MFR)
+
+
+def legacy_int_to_4b(num):
+    hex_string = bytearray.fromhex(struct.pack('>I', num).hex())
+    hex_string.reverse()
+    return bytes(hex_string).hex()
+
+
+def legacy_gate_sensitivity(gate, moving_sens, static_sens):
+    return legacy_frame_wrapper(CMD_GATE_SENS_EDIT + PARAM_GATE_SELECT + legacy_int_to_4b(gate)
+                                + PARAM_MOVING_GATE_WORD + legacy_int_to_4b(moving_sens)
+                                + PARAM_STATIC_GATE_WORD + legacy_int_to_4b(static_sens))
+
+
+def legacy_detection_params(moving_max_gate, static_max_gate, timeout):
+    return legacy_frame_wrapper(CMD_PARAM_EDIT + PARAM_MAX_MOVING_GATE + legacy_int_to_4b(moving_max_gate)
+                                + PARAM_MAX_STATIC_GATE + legacy_int_to_4b(static_max_gate)
+                                + PARAM_EMPTY_DURATION + legacy_int_to_4b(timeout))
+
+
+def legacy_region_filter(config, filter_type):
+    command = WRITE_REGION_FILTER + REGION_FILTER_TYPE_LOOKUP[filter_type]
+    for p1, p2 in config:
+        for x, y in p1, p2:
+            command += x.to_bytes(2, byteorder='little', signed=True).hex()
+            command += y.to_bytes(2, byteorder='little', signed=True).hex()
+    if len(command) < REGION_MSG_LENGTH:
+        command += (REGION_MSG_LENGTH - len(command))*'0'
+    return legacy_frame_wrapper(command)
+
+
+rnd = random.Random(0)
+
+
+def random_corner():
+    return rnd.randint(-32767, 32767), rnd.randint(-32767, 32767)
+
+
+SENSITIVITIES = [(gate, rnd.randint(SENS_MIN, SENS_MAX), 0 if gate in STATIC_FIXED_GATES else rnd.randint(SENS_MIN, SENS_MAX))
+                 for gate in [rnd.randint(GATE_MIN, GATE_MAX) for _ in range(50)]] \
+              + [(GATE_ALL, 50, 50), (GATE_MAX, SENS_MAX, SENS_MAX), (GATE_MIN, 0, 0)]
+DETECTION_PARAMS_VALUES = [(rnd.randint(GATE_MIN, GATE_MAX), rnd.randint(GATE_MIN, GATE_MAX), rnd.randint(TIMEOUT_MIN, TIMEOUT_MAX))
+                           for _ in range(50)] + [(GATE_MAX, GATE_MAX, TIMEOUT_MAX), (0, 0, 0)]
+REGION_FILTERS = [([(random_corner(), random_corner()) for _ in range(rnd.randint(0, REGION_COUNT))],
+                   rnd.choice(list(REGION_FILTER_TYPE_LOOKUP))) for _ in range(20)] \
+               + [([((-32767, -32767), (32767, 32767))] * REGION_COUNT, PARAM_FILTER_FILTER), ([], PARAM_FILTER_OFF)]
+
+# Every constant frame with the hex string it replaced
+CONSTANT_FRAMES = [
+    (CMD_CONFIG_ENABLE, FRAME_CONFIG_ENABLE), (CMD_CONFIG_DISABLE, FRAME_CONFIG_DISABLE),
+    (CMD_PARAM_READ, FRAME_PARAM_READ), (CMD_ENG_MODE_ENABLE, FRAME_ENG_MODE_ENABLE),
+    (CMD_ENG_MODE_DISABLE, FRAME_ENG_MODE_DISABLE), (CMD_FIRMWARE_READ, FRAME_FIRMWARE_READ),
+    (CMD_FACTORY_RESET, FRAME_FACTORY_RESET), (CMD_RESTART, FRAME_RESTART),
+    (CMD_BT_ENABLE, FRAME_BT_ENABLE), (CMD_BT_DISABLE, FRAME_BT_DISABLE),
+    (CMD_BT_MAC_QUERY, FRAME_BT_MAC_QUERY), (PARAM_SINGLE_TARGET_TRACKING, FRAME_SINGLE_TARGET_TRACKING),
+    (PARAM_MULTI_TARGET_TRACKING, FRAME_MULTI_TARGET_TRACKING), (TRACKING_QUERY, FRAME_TRACKING_QUERY),
+    (READ_REGION_FILTER, FRAME_READ_REGION_FILTER),
+]
+
+
+@pytest.fixture(autouse=True)
+def quiet_gate_warnings(caplog):
+    caplog.set_level("ERROR", logger="LD2410") # Gate 1/2 static sensitivity warnings
+
+
+@pytest.mark.parametrize("values", SENSITIVITIES)
+def test_gate_sensitivity(values):
+    assert LD2410.gate_sensitivity_command(*values) == legacy_gate_sensitivity(*values)
+    assert GATE_SENSITIVITY.encode(PARAM_WORD_GATE, values[0], PARAM_WORD_MOVING, values[1],
+                                   PARAM_WORD_STATIC, values[2]) == legacy_gate_sensitivity(*values)
+
+
+@pytest.mark.parametrize("values", DETECTION_PARAMS_VALUES)
+def test_detection_params(values):
+    assert LD2410.detection_params_command(*values) == legacy_detection_params(*values)
+    assert DETECTION_PARAMS.encode(PARAM_WORD_MAX_MOVING_GATE, values[0], PARAM_WORD_MAX_STATIC_GATE, values[1],
+                                   PARAM_WORD_EMPTY_DURATION, values[2]) == legacy_detection_params(*values)
+
+
+@pytest.mark.parametrize("config, filter_type", REGION_FILTERS)
+def test_region_filter_write(config, filter_type):
+    assert LD2450.region_filter_command(config, filter_type) == legacy_region_filter(config, filter_type)
+    value = LD2450.region_filter_value(config, filter_type)
+    assert REGION_FILTER_WRITE.wrap(value) == legacy_region_filter(config, filter_type)
+
+
+@pytest.mark.parametrize("baud", PARAM_ACCEPTABLE_BAUDS)
+def test_baud_rate_set(baud):
+    value = int.from_bytes(bytes.fromhex(baud), 'little')
+    assert BAUD_RATE_SET.encode(value) == legacy_frame_wrapper(CMD_BAUD_RATE_SET + baud)
+
+
+@pytest.mark.parametrize("command, frame", CONSTANT_FRAMES)
+def test_constant_frames(command, frame):
+    assert frame == legacy_frame_wrapper(command)
+    assert command_frame(command) == frame
+    assert command_frame(frame) is frame
+
+
+@pytest.mark.parametrize("mode, frame", sorted(TRACKING_FRAMES.items()))
+def test_tracking_frames(mode, frame):
+    command = PARAM_SINGLE_TARGET_TRACKING if mode == TRACKING_SINGLE else PARAM_MULTI_TARGET_TRACKING
+    assert frame == legacy_frame_wrapper(command)
+
+
+def test_wrap_checks_value_size():
+    with pytest.raises(Exception):
+        REGION_FILTER_WRITE.wrap(bytes(REGION_FILTER_WRITE.layout.size - 1))
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from LD2410.fleet import main, run_fleet
+
+PROFILE = {"moving_sens": 40, "static_sens": [0, 0, 40, 40, 30, 30, 20, 20, 20]}
+
+
+@pytest.mark.parametrize("baud", ["fast", "1000"])
+def test_bad_baud_is_a_usage_error(baud, capsys):
+    with pytest.raises(SystemExit) as exit:
+        main(["inventory", "/dev/null", "--baud", baud])
+    assert exit.value.code == 2
+    assert "--baud must be one of" in capsys.readouterr().err
+
+
+def test_profile_for_ld2450_is_a_usage_error(tmp_path, capsys):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(PROFILE))
+    with pytest.raises(SystemExit) as exit:
+        main(["apply", "/dev/null", "--model", "LD2450", "--profile", str(path)])
+    assert exit.value.code == 2
+    assert "only applies to the LD2410" in capsys.readouterr().err
+
+
+def test_run_fleet_rejects_ld2450_profile_once():
+    with pytest.raises(Exception, match="only apply to the LD2410"):
+        run_fleet(["/dev/null"], "LD2450", profile=PROFILE)
@@ -0,0 +1,28 @@
+import pytest
+
+from LD2410 import LD2410, RadarHub
+
+
+def test_failing_callback_does_not_stop_the_hub(caplog):
+    pytest.importorskip("termios") # The simulator needs a pseudo terminal
+    from LD2410.simulator import RadarSimulator
+    sims = [RadarSimulator("LD2410", rate=100) for _ in range(2)]
+    received = []
+
+    def broken(name, data):
+        raise ValueError("broken callback")
+
+    hub = RadarHub()
+    for sim in sims:
+        sim.start()
+    hub.register(LD2410(sims[0].port), name="broken", callback=broken)
+    hub.register(LD2410(sims[1].port), name="working", callback=lambda name, data: received.append(name))
+    try:
+        while len(received) < 5:
+            hub.run_once()
+    finally:
+        for name in list(hub.devices):
+            hub.unregister(name).radar.ser.close()
+        for sim in sims:
+            sim.stop()
+    assert "Hub callback for broken failed" in caplog.text
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each import must not load. A decode-only user must never pay for pyserial or NumPy
+IMPORT_CHECKS = [
+    ("LD2410", ("serial", "numpy", "LD2410.radar", "LD2410.ld2410", "LD2410.ld2450")),
+    ("LD2410.ld2410", ("serial", "numpy")),
+    ("LD2410.ld2450", ("serial", "numpy")),
+]
+
+
+# Run code in a fresh interpreter with -X importtime
+# Returns its stdout and the names of the modules imported after the '--' marker
+def run_fresh(code):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import sys; sys.stderr.write('--\\n'); " + code],
+                            capture_output=True, text=True, cwd=ROOT, check=True)
+    lines = result.stderr.split("--\n", 1)[1].splitlines()
+    imported = {line.split("|")[2].strip() for line in lines if line.startswith("import time:")}
+    return result.stdout, imported
+
+
+@pytest.mark.parametrize("module, forbidden", IMPORT_CHECKS)
+def test_import_is_lazy(module, forbidden):
+    stdout, imported = run_fresh(f"import {module}; print(' '.join(sys.modules))")
+    loaded = stdout.split()
+    for name in forbidden:
+        assert name not in loaded, f"import {module} loads {name}"
+        assert name not in imported
+
+
+# The drivers are loaded, the optional asyncio, hub, pipeline and simulator modules are not
+def test_star_import_skips_optional_modules():
+    stdout, _ = run_fresh("from LD2410 import *; print(' '.join(sys.modules))")
+    imported = stdout.split()
+    assert "LD2410.ld2410" in imported
+    for name in ("asyncio", "multiprocessing", "selectors", "tty", "LD2410.async_radar", "LD2410.hub",
+                 "LD2410.pipeline", "LD2410.simulator"):
+        assert name not in imported, f"from LD2410 import * loads {name}"
+
+
+# As on Windows, which has no termios
+def test_star_import_without_termios():
+    stdout, _ = run_fresh("sys.modules['termios'] = None; from LD2410 import *; print(LD2410.__name__)")
+    assert stdout.strip() == "LD2410"
+
+
+def test_decoding_needs_no_pyserial():
+    stdout, _ = run_fresh("from LD2410 import LD2410; "
+                          "LD2410.decode_frame(bytes.fromhex('0d0002aa03780032780028780055')); "
+                          "print('serial' in sys.modules)")
+    assert stdout.strip() == "False"
+
+
+def test_numpy_only_on_decode_targets():
+    pytest.importorskip("numpy")
+    stdout, _ = run_fresh("from LD2410.ld2450 import decode_targets; "
+                          "before = 'numpy' in sys.modules; decode_targets(bytes(24)); "
+                          "print(before, 'numpy' in sys.modules)")
+    assert stdout.split() == ["False", "True"]
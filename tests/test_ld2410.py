@@ -0,0 +1,40 @@
+import pytest
+
+from LD2410.ld2410 import LD2410
+from LD2410.ld2410_consts import *
+
+FACTORY_PROFILE = {"moving_max_gate": 8, "static_max_gate": 8, "timeout": 5,
+                   "moving_sens": [50, 50, 40, 30, 20, 15, 15, 15, 15],
+                   "static_sens": [0, 0, 40, 40, 30, 30, 20, 20, 20]}
+
+
+@pytest.fixture
+def radar(caplog):
+    pytest.importorskip("termios") # The simulator needs a pseudo terminal
+    caplog.set_level("ERROR", logger="LD2410") # Gate 0/1 static sensitivity warnings
+    from LD2410.simulator import RadarSimulator
+    sim = RadarSimulator("LD2410", rate=50)
+    sim.start()
+    radar = LD2410(sim.port)
+    radar.sim = sim
+    yield radar
+    radar.ser.close()
+    sim.stop()
+
+
+def test_apply_config_read_back_profile(radar):
+    thresholds, move_sens, static_sens = radar.read_detection_params()
+    profile = {"moving_max_gate": thresholds[0], "static_max_gate": thresholds[1], "timeout": thresholds[2],
+               "moving_sens": move_sens, "static_sens": static_sens}
+    assert profile == FACTORY_PROFILE
+    commands = radar.sim.command_count
+    radar.apply_config(profile)
+    assert radar.sim.command_count == commands # Nothing changed, nothing written
+
+
+def test_apply_config_validates_changed_gates(radar):
+    static_sens = FACTORY_PROFILE["static_sens"][:2] + [SENS_MAX] * 7
+    assert radar.apply_config({"moving_sens": 40, "static_sens": static_sens})[2] == static_sens
+    with pytest.raises(Exception):
+        radar.apply_config({"moving_sens": 40, "static_sens": [40] + static_sens[1:]})
+    assert not radar.params.dirty
@@ -0,0 +1,152 @@
+import struct
+
+import pytest
+
+from LD2410.commands import *
+from LD2410.frame_parser import FrameParser
+from LD2410.ld2450 import LD2450, Region, RegionFilter
+from LD2410.radar_consts import *
+from LD2410.ld2450_consts import *
+
+# Filter type, then x1, y1, x2, y2 of 3 regions, as the module sends and takes them
+REGION_FILTER = struct.Struct('<H12h')
+
+
+def ack(word, data=b""):
+    payload = struct.pack('<HH', word | ACK_FLAG, ACK_SUCCESS) + data
+    return bytes.fromhex(CMD_HEADER) + struct.pack('<H', len(payload)) + payload + bytes.fromhex(CMD_MFR)
+
+
+def data_frame(*targets):
+    body = b"".join(struct.pack('<4H', *target) for target in targets)
+    return bytes.fromhex(REF_DATA_HEADER) + body + bytes.fromhex(REF_DATA_CRC)
+
+
+@pytest.fixture
+def radar():
+    pytest.importorskip("termios") # The simulator needs a pseudo terminal
+    from LD2410.simulator import RadarSimulator
+    sim = RadarSimulator("LD2450", rate=50)
+    sim.start()
+    radar = LD2450(sim.port)
+    radar.sim = sim
+    yield radar
+    radar.ser.close()
+    sim.stop()
+
+
+def test_region_filter_from_bytes():
+    data = REGION_FILTER.pack(PARAM_FILTER_DETECT, -1000, 200, 1000, 2500, 0, 0, 0, 0, -32767, -1, 32767, 1)
+    region_filter = RegionFilter.from_bytes(data)
+    assert region_filter.filter_type == PARAM_FILTER_DETECT
+    # The unused middle slot is left out
+    assert region_filter.regions == [Region(-1000, 200, 1000, 2500), Region(-32767, -1, 32767, 1)]
+
+
+def test_region_filter_from_bytes_off():
+    region_filter = RegionFilter.from_bytes(bytes(REGION_FILTER.size))
+    assert region_filter.filter_type == PARAM_FILTER_OFF
+    assert region_filter.regions == []
+
+
+def test_parse_region_filter_ack():
+    data = REGION_FILTER.pack(PARAM_FILTER_FILTER, 10, 20, 30, 40, *[0] * 8)
+    region_filter = LD2450.parse_region_filter(ack(WORD_READ_REGION_FILTER, data))
+    assert region_filter == RegionFilter(PARAM_FILTER_FILTER, [Region(10, 20, 30, 40)])
+
+
+@pytest.mark.parametrize("mode", [TRACKING_SINGLE, TRACKING_MULTI])
+def test_parse_tracking_mode(mode):
+    assert LD2450.parse_tracking_mode(ack(WORD_TRACKING_QUERY, struct.pack('<H', mode))) == mode
+
+
+@pytest.mark.parametrize("config, filter_type", [
+    ([], PARAM_FILTER_OFF),
+    ([[(-100, 100), (100, 300)]], PARAM_FILTER_DETECT),
+    ([[(-32767, -32767), (32767, 32767)]] * REGION_COUNT, PARAM_FILTER_FILTER),
+])
+def test_region_filter_value_round_trip(config, filter_type):
+    value = LD2450.region_filter_value(config, filter_type)
+    assert len(value) == REGION_FILTER.size
+    region_filter = RegionFilter.from_bytes(value)
+    assert region_filter.as_config() == (config, filter_type)
+    assert LD2450.region_filter_value(*region_filter.as_config()) == value
+
+
+def test_region_filter_value_rejects_bad_input():
+    with pytest.raises(Exception):
+        LD2450.region_filter_value([[(0, 0), (1, 1)]] * (REGION_COUNT + 1), PARAM_FILTER_DETECT)
+    with pytest.raises(Exception):
+        LD2450.region_filter_value([], 7)
+
+
+@pytest.mark.parametrize("command, frame", [
+    (PARAM_SINGLE_TARGET_TRACKING, FRAME_SINGLE_TARGET_TRACKING),
+    (PARAM_MULTI_TARGET_TRACKING, FRAME_MULTI_TARGET_TRACKING),
+    (TRACKING_QUERY, FRAME_TRACKING_QUERY),
+])
+def test_tracking_command_length_field(command, frame):
+    body = bytes.fromhex(command)
+    # The length field counts the command word and value that follow it
+    assert struct.unpack_from('<H', body)[0] == len(body) - 2
+    assert command_frame(command) == frame
+
+
+def test_frame_reader_payload_with_tail_bytes():
+    # 0x55 0xCC inside a target block must not end the frame
+    targets = [(0x8000 | 0xCC55, 0x8000 | 0x55CC, 0x55CC, 0xCC55), (0, 0, 0, 0), (0x8000 | 100, 0x8000 | 200, 0, 360)]
+    stream = b"\x00\x55\xcc" + data_frame(*targets) + ack(WORD_TRACKING_QUERY, b"\x01\x00") + data_frame(*targets)
+    parser = FrameParser(REF_DATA_HEADER, REF_DATA_CRC, payload_len=REF_DATA_PAYLOAD_LEN, skip=(CMD_HEADER, CMD_MFR))
+    frames = []
+    for i in range(0, len(stream), 7): # Split frames across reads like a UART does
+        parser.feed(stream[i:i + 7])
+        frames.extend(parser.frames())
+    assert len(frames) == 2
+    decoded = LD2450.decode_frame([frames[0][i:i + 8] for i in range(0, REF_DATA_PAYLOAD_LEN, 8)])
+    assert decoded[0][:4] == (0x4C55, 0x55CC, -0x55CC, 0xCC55)
+    assert decoded[1] == (0, 0, 0, 0, 0.0)
+    assert decoded[2][:4] == (100, 200, 0, 360)
+    assert parser.tail_fail_count == 0
+    assert parser.resync_count == 1 # The leading noise, not the ACK
+
+
+@pytest.mark.parametrize("command, mode", [
+    (PARAM_SINGLE_TARGET_TRACKING, TRACKING_SINGLE),
+    (PARAM_MULTI_TARGET_TRACKING, TRACKING_MULTI),
+])
+def test_tracking_commands_against_simulator(radar, command, mode):
+    radar.send_command(command) # Raises if the module does not ACK it
+    assert radar.sim.multi_target == (mode == TRACKING_MULTI)
+    assert radar.read_tracking_mode(refresh=True) == mode
+
+
+def test_tracking_mode_setters_against_simulator(radar):
+    radar.set_single_target_tracking()
+    assert radar.read_tracking_mode(refresh=True) == TRACKING_SINGLE
+    radar.set_multi_target_tracking()
+    assert radar.read_tracking_mode(refresh=True) == TRACKING_MULTI
+
+
+def test_region_filter_against_simulator(radar):
+    assert radar.read_region_filter() == RegionFilter(PARAM_FILTER_OFF, [])
+    config = [[(-1500, 0), (1500, 2000)], [(-200, 3000), (200, 3500)]]
+    radar.set_region_filter(config, PARAM_FILTER_DETECT)
+    region_filter = radar.read_region_filter(refresh=True)
+    assert region_filter == RegionFilter(PARAM_FILTER_DETECT, [Region(-1500, 0, 1500, 2000), Region(-200, 3000, 200, 3500)])
+    assert region_filter.as_config() == (config, PARAM_FILTER_DETECT)
+    # Writing the filter back unchanged sends nothing
+    commands = radar.sim.command_count
+    assert radar.set_region_filter(*region_filter.as_config()) is None
+    assert radar.sim.command_count == commands
+
+
+def test_frames_against_simulator(radar):
+    frames = []
+    while len(frames) < 5:
+        chunk = radar.read_serial()
+        frames.extend(radar.process_bytes(chunk))
+    for targets in frames:
+        x, y, speed, resolution, distance = targets[0]
+        assert y == 1500 and speed == -10
+        assert distance == pytest.approx((x * x + y * y) ** 0.5)
+        assert targets[1] == targets[2] == (0, 0, 0, 0, 0.0)
@@ -0,0 +1,27 @@
+import pytest
+
+from LD2410 import LD2410
+from LD2410.radar_consts import *
+
+
+# A port half way through close(): pyserial has dropped the fd but is_open is still set
+class ClosingSerial:
+    is_open = True
+    fd = None
+    in_waiting = 0
+
+    def read(self, size):
+        raise TypeError("'NoneType' object cannot be interpreted as an integer")
+
+
+@pytest.mark.parametrize("port", [ClosingSerial(), "capture" + RECORDING_EXTENSION])
+def test_baud_auto_needs_a_port_name(port):
+    with pytest.raises(Exception, match="BAUD_AUTO"):
+        LD2410(port, baud_rate=BAUD_AUTO)
+
+
+def test_lost_port_is_not_blamed_on_the_baud_rate(caplog):
+    radar = LD2410(ClosingSerial())
+    for _ in range(64):
+        assert radar.read_frame() is None
+    assert "baud rate" not in caplog.text
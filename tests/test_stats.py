@@ -0,0 +1,28 @@
+from LD2410 import LD2410
+from LD2410.radar_consts import *
+
+FRAME = bytes.fromhex("f4f3f2f10d0002aa03780032780028780055" + "00f8f7f6f5")
+
+
+# A port that never has data, frames are fed with process_bytes()
+class IdleSerial:
+    is_open = True
+    in_waiting = 0
+
+    def read(self, size):
+        return b""
+
+    def write(self, data):
+        return len(data)
+
+
+def test_parser_counters_count_from_enable_stats():
+    radar = LD2410(IdleSerial())
+    radar.process_bytes(b"\x01\x02" + FRAME + b"\x03" + FRAME)
+    assert radar.parser.resync_count == 2
+    radar.enable_stats()
+    assert radar.stats()["resyncs"] == 0
+    radar.process_bytes(b"\x04" + FRAME)
+    stats = radar.stats()
+    assert stats["resyncs"] == 1
+    assert stats["frames_decoded"] == 1